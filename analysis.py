@@ -0,0 +1,320 @@
+# Step-level analysis of benchmark results
+import os
+import re
+from glob import glob
+import numpy as np
+import pandas as pd
+from downsample import read_csv_chunks
+
+# Components of the client-observed latency, in the order a request traverses them.
+# "Client + network" is whatever the client measured on top of envoy and the server-side
+# components: gRPC serialization, the network path and the response return.
+LATENCY_COMPONENTS = [
+    ("client_network_us", "Client + network"),
+    ("envoy_us", "Envoy proxy"),
+    ("triton_overhead_us", "Triton overhead"),
+    ("triton_queue_us", "Triton queue"),
+    ("triton_compute_us", "Triton compute"),
+]
+
+# Price of one GPU-hour, for the cost per million inferences
+GPU_HOUR_COST = 2.50
+
+REP_FILE_PREFIXES = {
+    "results": "results",
+    "live": "live_metrics",
+    "steps": "steps",
+    "faults": "faults",
+    "windows": "windows",
+    "triton": "triton_metrics",
+}
+
+def find_repetitions(seq_dir):
+    """
+    Group the per-repetition files of a sequence directory by repetition index.
+    Returns: {rep: {"results": path, "live": path, "steps": path, ...}} for every kind of
+    REP_FILE_PREFIXES (missing files are omitted)
+    """
+    reps = {}
+    for kind, prefix in REP_FILE_PREFIXES.items():
+        for path in glob(os.path.join(seq_dir, f"{prefix}_rep*.csv")):
+            m = re.match(rf"{prefix}_rep(\d+)\.csv$", os.path.basename(path))
+            if m:
+                reps.setdefault(int(m.group(1)), {})[kind] = path
+    return dict(sorted(reps.items()))
+
+def align_live_to_steps(df_live, df_steps):
+    """
+    Attribute every live-metrics sample to the step whose [start, end] window contains it.
+    Uses an as-of join on the step start times, so the cost is dominated by the sort (O(n log n)).
+    Samples taken between steps (service recreation, scaling) get step=NaN.
+    """
+    live = df_live.copy()
+    live["timestamp"] = pd.to_datetime(live["timestamp"])
+    live = live.sort_values("timestamp")
+    steps = df_steps[["step", "start", "end"]].copy()
+    steps["start"] = pd.to_datetime(steps["start"])
+    steps["end"] = pd.to_datetime(steps["end"])
+    steps = steps.sort_values("start")
+    merged = pd.merge_asof(live, steps, left_on="timestamp", right_on="start", direction="backward")
+    outside = merged["end"].isna() | (merged["timestamp"] > merged["end"])
+    merged.loc[outside, "step"] = float("nan")
+    return merged.drop(columns=["start", "end"])
+
+def holding_times(timestamps, start=None, end=None):
+    """
+    Seconds each sample of a series holds: until the next sample, the last one until `end` and
+    the first one from `start` when given (a step's bounds), otherwise the last has no duration.
+    """
+    timestamps = pd.to_datetime(pd.Series(timestamps)).reset_index(drop=True)
+    if not len(timestamps):
+        return np.array([])
+    seconds = (timestamps - timestamps.iloc[0]).dt.total_seconds().to_numpy()
+    first = 0.0 if start is None else min((pd.to_datetime(start) - timestamps.iloc[0]).total_seconds(), 0.0)
+    last = seconds[-1] if end is None else max((pd.to_datetime(end) - timestamps.iloc[0]).total_seconds(), seconds[-1])
+    return np.diff(np.concatenate([[first], seconds[1:], [last]]))
+
+def time_integral(timestamps, values, start=None, end=None) -> float:
+    """Integral over time (value x seconds) of a sampled series, each sample held as in holding_times."""
+    durations = holding_times(timestamps, start, end)
+    return float(np.nansum(np.asarray(values, dtype=float) * durations)) if len(durations) else 0.0
+
+# Live-metrics columns summarized per step, as <column>_avg (and _std for the first two)
+LIVE_STEP_COLUMNS = ["gpu_util", "envoy_overhead", "total_latency", "running_servers"]
+
+class StepLiveStats:
+    """
+    Per-step statistics of live samples fed in chunks (see downsample.read_csv_chunks), so a
+    live-metrics file of any length is summarized in constant memory. Means and standard
+    deviations are merged chunk by chunk (Chan et al.), and the time-weighted running_servers
+    carries each step's last sample over to the next chunk, held until the step end as in
+    holding_times.
+    """
+    def __init__(self, df_steps):
+        steps = df_steps[["step", "start", "end"]].copy()
+        steps["start"] = pd.to_datetime(steps["start"])
+        steps["end"] = pd.to_datetime(steps["end"])
+        self.steps = steps
+        self.bounds = {int(row.step): (row.start, row.end) for row in steps.itertuples()}
+        self.moments = {}  # (step, column) -> [count, mean, sum of squared deviations]
+        self.samples = {}  # step -> live samples
+        self.servers = {}  # step -> [integral, first timestamp, last timestamp, last running_servers]
+
+    def add(self, chunk):
+        columns = [col for col in LIVE_STEP_COLUMNS if col in chunk.columns]
+        aligned = align_live_to_steps(chunk, self.steps).dropna(subset=["step"])
+        for step, group in aligned.groupby("step"):
+            step = int(step)
+            for col in columns:
+                values = pd.to_numeric(group[col], errors="coerce").dropna().to_numpy(dtype=float)
+                if not len(values):
+                    continue
+                n, mean, m2 = self.moments.get((step, col), (0, 0.0, 0.0))
+                n_b, mean_b = len(values), values.mean()
+                delta = mean_b - mean
+                total = n + n_b
+                self.moments[(step, col)] = (total, mean + delta * n_b / total,
+                                             m2 + ((values - mean_b) ** 2).sum() + delta ** 2 * n * n_b / total)
+            self.samples[step] = self.samples.get(step, 0) + int(group["timestamp"].count())
+            if "running_servers" in columns:
+                self._add_servers(step, group)
+
+    def _add_servers(self, step, group):
+        times = group["timestamp"].reset_index(drop=True)
+        values = pd.to_numeric(group["running_servers"], errors="coerce").to_numpy(dtype=float)
+        state = self.servers.get(step)
+        if state is None:
+            # The first sample holds from the step start
+            start = min(self.bounds[step][0], times.iloc[0])
+            state = [np.nan_to_num(values[0]) * (times.iloc[0] - start).total_seconds(), start, times.iloc[0], values[0]]
+        seconds = np.concatenate([[0.0], (times - state[2]).dt.total_seconds().to_numpy()])
+        held = np.concatenate([[state[3]], values])
+        state[0] += float(np.nansum(held[:-1] * np.diff(seconds)))
+        state[2], state[3] = times.iloc[-1], values[-1]
+        self.servers[step] = state
+
+    def result(self):
+        """One row per step with live samples, in the live columns of summarize_steps."""
+        rows = []
+        for step, n_samples in sorted(self.samples.items()):
+            row = {"step": step, "n_live_samples": n_samples}
+            for col in LIVE_STEP_COLUMNS:
+                n, mean, m2 = self.moments.get((step, col), (0, float("nan"), float("nan")))
+                row[f"{col}_avg"] = mean if n else float("nan")
+                if col in ("gpu_util", "envoy_overhead"):
+                    row[f"{col}_std"] = float(np.sqrt(m2 / (n - 1))) if n > 1 else float("nan")
+            if step in self.servers:
+                integral, first, last, last_value = self.servers[step]
+                end = max(self.bounds[step][1], last)
+                integral += np.nan_to_num(last_value) * (end - last).total_seconds()
+                span = (end - first).total_seconds()
+                row["running_servers_tw"] = integral / span if span > 0 else row["running_servers_avg"]
+            rows.append(row)
+        columns = ["step", "gpu_util_avg", "gpu_util_std", "envoy_overhead_avg", "envoy_overhead_std",
+                   "total_latency_avg", "running_servers_avg", "n_live_samples", "running_servers_tw"]
+        return pd.DataFrame(rows, columns=columns)
+
+def summarize_steps(df_results, df_live, df_steps, live_stats=None):
+    """
+    Build one row per step combining the step parameters, the client results
+    and the live samples that fall inside the step window. live_stats, the result of a
+    StepLiveStats fed the live samples in chunks, replaces df_live for long files.
+    """
+    steps = df_steps.copy()
+    steps["start"] = pd.to_datetime(steps["start"])
+    steps["end"] = pd.to_datetime(steps["end"])
+    steps["duration_s"] = (steps["end"] - steps["start"]).dt.total_seconds()
+
+    client_stats = df_results.groupby("step").agg(
+        batch_size=("batch_size", "max"),
+        throughput_ips=("throughput_ips", "sum"),
+        avg_latency_us=("avg_latency_us", "mean"),
+        p99_latency_us=("p99_latency_us", "mean"),
+        avg_request_latency_us=("avg_request_latency_us", "mean"),
+        overhead_us=("overhead_us", "mean"),
+        queue_us=("queue_us", "mean"),
+        compute_input_us=("compute_input_us", "mean"),
+        compute_infer_us=("compute_infer_us", "mean"),
+        compute_output_us=("compute_output_us", "mean"),
+        n_results=("pod_name", "count"),
+    ).reset_index()
+
+    if "client_saturated" in df_results.columns:
+        # A step is only as trustworthy as its most loaded client
+        clients = df_results.assign(client_saturated=df_results["client_saturated"].astype(str) == "True")
+        saturation = clients.groupby("step").agg(
+            cpu_usage_cores=("cpu_usage_cores", "mean"),
+            cpu_throttled_ratio=("cpu_throttled_ratio", "max"),
+            memory_peak_bytes=("memory_peak_bytes", "max"),
+            n_saturated_clients=("client_saturated", "sum"),
+        ).reset_index()
+        saturation["client_saturated"] = saturation["n_saturated_clients"] > 0
+        client_stats = client_stats.merge(saturation, on="step", how="left")
+
+    if "client_status" in df_results.columns:
+        # Clients without a usable result have no metrics; count them so partial steps stand out
+        clients = df_results.assign(client_ok=df_results["client_status"] == "ok")
+        accounting = clients.groupby("step").agg(
+            n_ok_clients=("client_ok", "sum"),
+            max_client_attempts=("attempts", "max"),
+        ).reset_index()
+        client_stats = client_stats.merge(accounting, on="step", how="left")
+
+    if "throughput_ci_rel" in df_results.columns:
+        # Achieved precision of adaptive steps: the least precise client bounds the step
+        precision = df_results.groupby("step").agg(
+            n_trials=("n_trials", "max"),
+            throughput_ci_rel=("throughput_ci_rel", "max"),
+            p99_ci_rel=("p99_ci_rel", "max"),
+        ).reset_index()
+        client_stats = client_stats.merge(precision, on="step", how="left")
+
+    if live_stats is None and df_live is not None and not df_live.empty:
+        accumulator = StepLiveStats(df_steps)
+        accumulator.add(df_live)
+        live_stats = accumulator.result()
+    if live_stats is not None:
+        steps = steps.merge(live_stats, on="step", how="left")
+
+    summary = steps.merge(client_stats, on="step", how="left")
+    return add_efficiency(summary)
+
+def add_efficiency(df):
+    """
+    GPU-seconds of every step (the time-weighted running_servers over the step, or n_servers
+    without live samples), inferences served by all clients, inferences per GPU-second and the
+    cost per million inferences at GPU_HOUR_COST.
+    """
+    servers = df["n_servers"].astype(float)
+    if "running_servers_tw" in df.columns:
+        servers = df.pop("running_servers_tw").fillna(servers)
+    df["gpu_seconds"] = servers * df["duration_s"]
+    df["inferences"] = df["throughput_ips"] * df["duration_s"]
+    df["inferences_per_gpu_s"] = df["inferences"] / df["gpu_seconds"]
+    df["cost_per_million"] = GPU_HOUR_COST * df["gpu_seconds"] / 3600 / (df["inferences"] / 1e6)
+    return df
+
+def sequence_efficiency(step_summaries):
+    """
+    Cost and latency of every sequence: inferences per GPU-second and cost per million inferences
+    over all its steps, and the mean client p99 latency, as mean and std over repetitions.
+    """
+    reps = step_summaries.groupby(["sequence", "repetition"]).agg(
+        mode=("mode", "first"),
+        n_servers=("n_servers", "max"),
+        gpu_seconds=("gpu_seconds", "sum"),
+        inferences=("inferences", "sum"),
+        p99_latency_us=("p99_latency_us", "mean"),
+    ).reset_index()
+    reps["inferences_per_gpu_s"] = reps["inferences"] / reps["gpu_seconds"]
+    reps["cost_per_million"] = GPU_HOUR_COST * reps["gpu_seconds"] / 3600 / (reps["inferences"] / 1e6)
+    table = reps.groupby("sequence", sort=False).agg(
+        mode=("mode", "first"),
+        n_servers=("n_servers", "max"),
+        n_repetitions=("repetition", "count"),
+        inferences_per_gpu_s=("inferences_per_gpu_s", "mean"),
+        inferences_per_gpu_s_std=("inferences_per_gpu_s", "std"),
+        cost_per_million=("cost_per_million", "mean"),
+        cost_per_million_std=("cost_per_million", "std"),
+        p99_latency_us=("p99_latency_us", "mean"),
+        p99_latency_us_std=("p99_latency_us", "std"),
+    ).reset_index()
+    table["pareto"] = pareto_front(table["cost_per_million"], table["p99_latency_us"])
+    return table
+
+def pareto_front(costs, latencies):
+    """True for the points no other point beats on both cost and latency (lower is better for both)."""
+    costs, latencies = np.asarray(costs, dtype=float), np.asarray(latencies, dtype=float)
+    front = np.ones(len(costs), dtype=bool)
+    for i in range(len(costs)):
+        dominated = (costs <= costs[i]) & (latencies <= latencies[i]) & ((costs < costs[i]) | (latencies < latencies[i]))
+        front[i] = not dominated.any() and not np.isnan(costs[i]) and not np.isnan(latencies[i])
+    return front
+
+def load_step_summaries(seq_dir):
+    """
+    Summarize every repetition of a sequence that recorded step boundaries.
+    Returns a DataFrame with one row per (repetition, step), or None if nothing is available.
+    """
+    summaries = []
+    for rep, files in find_repetitions(seq_dir).items():
+        if "results" not in files or "steps" not in files:
+            continue
+        df_results = pd.read_csv(files["results"])
+        df_steps = pd.read_csv(files["steps"])
+        if df_results.empty or df_steps.empty or "step" not in df_results.columns:
+            continue
+        live_stats = None
+        if "live" in files:
+            # Live metrics grow with the run (days for soak steps); they are read in chunks
+            accumulator = StepLiveStats(df_steps)
+            usecols = lambda col: col == "timestamp" or col in LIVE_STEP_COLUMNS
+            for chunk in read_csv_chunks(files["live"], usecols=usecols):
+                accumulator.add(chunk)
+            live_stats = accumulator.result()
+        summary = summarize_steps(df_results, None, df_steps, live_stats)
+        summary["repetition"] = rep
+        summaries.append(summary)
+    if not summaries:
+        return None
+    return pd.concat(summaries, ignore_index=True)
+
+def latency_breakdown(step_summary):
+    """
+    Split the average client latency of each step into LATENCY_COMPONENTS (microseconds).
+    Server-side fields come from perf_analyzer, the envoy share from the live envoy_overhead
+    samples of the step (milliseconds, absent in bare_triton mode).
+    """
+    df = step_summary.copy()
+    if "envoy_overhead_avg" in df.columns:
+        df["envoy_us"] = pd.to_numeric(df["envoy_overhead_avg"], errors="coerce").fillna(0.0) * 1000.0
+    else:
+        df["envoy_us"] = 0.0
+    df.loc[df["mode"] != "supersonic", "envoy_us"] = 0.0
+    df["triton_overhead_us"] = df["overhead_us"]
+    df["triton_queue_us"] = df["queue_us"]
+    df["triton_compute_us"] = df["compute_input_us"] + df["compute_infer_us"] + df["compute_output_us"]
+    server_us = df["triton_overhead_us"] + df["triton_queue_us"] + df["triton_compute_us"]
+    df["client_network_us"] = (df["avg_latency_us"] - server_us - df["envoy_us"]).clip(lower=0)
+    keys = [col for col in ("sequence", "repetition", "step", "mode", "n_servers", "n_clients") if col in df.columns]
+    return df[keys + ["avg_latency_us"] + [col for col, _ in LATENCY_COMPONENTS]]
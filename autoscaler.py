@@ -0,0 +1,215 @@
+# Autoscaler behaviour of supersonic runs: reaction times, GPU cost against an oracle and SLO violations
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from analysis import find_repetitions, load_step_summaries, time_integral
+from config import (AUTOSCALER_SLO_MS, AUTOSCALER_CLIENTS_PER_SERVER, AUTOSCALER_TARGET_UTIL,
+                    SUPERSONIC_MIN_REPLICAS, SUPERSONIC_MAX_REPLICAS)
+
+AUTOSCALER_CSV = "autoscaler.csv"
+BASELINE_CSV = "autoscaler_vs_bare_triton.csv"
+
+def load_run_steps(run_dir):
+    """Step summaries of every sequence of a run, tagged with their sequence, or None."""
+    frames = []
+    for seq_dir in sorted(os.listdir(run_dir)):
+        if not os.path.isdir(os.path.join(run_dir, seq_dir)):
+            continue
+        summary = load_step_summaries(os.path.join(run_dir, seq_dir))
+        if summary is not None:
+            summary["sequence"] = seq_dir
+            frames.append(summary)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def server_capacity(steps) -> float:
+    """
+    Clients one server sustains within the SLO: AUTOSCALER_CLIENTS_PER_SERVER, else the highest
+    n_clients / n_servers among the bare_triton steps whose client p99 met it. None if unknown.
+    """
+    if AUTOSCALER_CLIENTS_PER_SERVER:
+        return float(AUTOSCALER_CLIENTS_PER_SERVER)
+    if steps is None:
+        return None
+    static = steps[(steps["mode"] == "bare_triton") & (steps["p99_latency_us"] <= AUTOSCALER_SLO_MS * 1000)]
+    if static.empty:
+        return None
+    return float((static["n_clients"] / static["n_servers"]).max())
+
+def oracle_servers(live, capacity):
+    """
+    Servers an ideal autoscaler would run at each live sample, within the KEDA bounds: enough for
+    the running clients at `capacity` clients per server, or, without a capacity, enough to run the
+    observed GPU work at AUTOSCALER_TARGET_UTIL.
+    """
+    if capacity:
+        needed = np.ceil(live["running_clients"].to_numpy(dtype=float) / capacity)
+    else:
+        work = live["running_servers"].to_numpy(dtype=float) * live["gpu_util"].to_numpy(dtype=float)
+        needed = np.ceil(work / AUTOSCALER_TARGET_UTIL - 1e-9)
+    return np.clip(np.nan_to_num(needed, nan=SUPERSONIC_MIN_REPLICAS), SUPERSONIC_MIN_REPLICAS, SUPERSONIC_MAX_REPLICAS)
+
+def reaction_times(seconds, servers, oracle):
+    """
+    Scale-up latencies (from the first sample with fewer servers than the oracle until there are
+    enough) and scale-down latencies (from the first sample with more until there are no more).
+    Episodes still open at the end of the series are not counted.
+    """
+    up, down = [], []
+    up_since = down_since = None
+    for t, n, need in zip(seconds, servers, oracle):
+        if n < need:
+            up_since = t if up_since is None else up_since
+        elif up_since is not None:
+            up.append(t - up_since)
+            up_since = None
+        if n > need:
+            down_since = t if down_since is None else down_since
+        elif down_since is not None:
+            down.append(t - down_since)
+            down_since = None
+    return up, down
+
+def analyze_series(live, capacity) -> dict:
+    """Autoscaler metrics of one live-metrics series (one repetition of a supersonic sequence)."""
+    live = live.dropna(subset=["running_servers"]).copy()
+    live["timestamp"] = pd.to_datetime(live["timestamp"])
+    live = live.sort_values("timestamp")
+    seconds = (live["timestamp"] - live["timestamp"].iloc[0]).dt.total_seconds().to_numpy()
+    servers = live["running_servers"].to_numpy(dtype=float)
+    oracle = oracle_servers(live, capacity)
+    up, down = reaction_times(seconds, servers, oracle)
+    gpu_seconds = time_integral(live["timestamp"], servers)
+    oracle_gpu_seconds = time_integral(live["timestamp"], oracle)
+    latency = pd.to_numeric(live["total_latency"], errors="coerce")
+    return {
+        "duration_s": float(seconds[-1]) if len(seconds) else 0.0,
+        "gpu_seconds": gpu_seconds,
+        "oracle_gpu_seconds": oracle_gpu_seconds,
+        "overprovisioning_ratio": gpu_seconds / oracle_gpu_seconds if oracle_gpu_seconds else float("nan"),
+        "underprovisioned_s": time_integral(live["timestamp"], servers < oracle),
+        "slo_violation_s": time_integral(live["timestamp"], latency > AUTOSCALER_SLO_MS),
+        "n_scale_ups": len(up),
+        "scale_up_median_s": float(np.median(up)) if up else float("nan"),
+        "scale_up_max_s": float(np.max(up)) if up else float("nan"),
+        "n_scale_downs": len(down),
+        "scale_down_median_s": float(np.median(down)) if down else float("nan"),
+        "scale_down_max_s": float(np.max(down)) if down else float("nan"),
+    }
+
+def step_costs(steps):
+    """
+    GPU-seconds, duration, step-level SLO violation time (steps whose client p99 missed the SLO)
+    and client metrics per (sequence, repetition).
+    """
+    steps = steps.copy()
+    steps["slo_violation_s"] = steps["duration_s"].where(steps["p99_latency_us"] > AUTOSCALER_SLO_MS * 1000, 0.0)
+    costs = steps.groupby(["sequence", "repetition"]).agg(
+        mode=("mode", "first"),
+        n_servers=("n_servers", "max"),
+        duration_s=("duration_s", "sum"),
+        gpu_seconds=("gpu_seconds", "sum"),
+        slo_violation_s=("slo_violation_s", "sum"),
+        p99_latency_us=("p99_latency_us", "mean"),
+        throughput_ips=("throughput_ips", "mean"),
+    ).reset_index()
+    costs["mean_servers"] = costs["gpu_seconds"] / costs["duration_s"]
+    return costs
+
+def compare_to_static(costs):
+    """
+    Each supersonic repetition against the bare_triton deployments at equal GPU cost (its mean
+    number of servers, rounded) and against the cheapest one that never missed the SLO.
+    """
+    static = costs[costs["mode"] == "bare_triton"]
+    by_servers = static.groupby("n_servers").agg(
+        duration_s=("duration_s", "mean"),
+        gpu_seconds=("gpu_seconds", "mean"),
+        slo_violation_s=("slo_violation_s", "mean"),
+        p99_latency_us=("p99_latency_us", "mean"),
+        throughput_ips=("throughput_ips", "mean"),
+    )
+    compliant = by_servers[by_servers["slo_violation_s"] == 0]
+    rows = []
+    for _, auto in costs[costs["mode"] == "supersonic"].iterrows():
+        equal = int(np.clip(round(auto["mean_servers"]), SUPERSONIC_MIN_REPLICAS, SUPERSONIC_MAX_REPLICAS))
+        baselines = {"equal_cost": equal}
+        if not compliant.empty:
+            baselines["cheapest_slo_compliant"] = int(compliant.index.min())
+        for baseline, n_servers in baselines.items():
+            if n_servers not in by_servers.index:
+                continue
+            ref = by_servers.loc[n_servers]
+            rows.append({
+                "sequence": auto["sequence"], "repetition": auto["repetition"], "baseline": baseline,
+                "baseline_n_servers": n_servers,
+                "mean_servers": auto["mean_servers"],
+                "gpu_seconds": auto["gpu_seconds"],
+                "baseline_gpu_seconds": ref["gpu_seconds"],
+                "gpu_savings": 1.0 - auto["gpu_seconds"] / ref["gpu_seconds"],
+                "slo_violation_s": auto["slo_violation_s"],
+                "baseline_slo_violation_s": ref["slo_violation_s"],
+                "p99_latency_us": auto["p99_latency_us"],
+                "baseline_p99_latency_us": ref["p99_latency_us"],
+                "throughput_ips": auto["throughput_ips"],
+                "baseline_throughput_ips": ref["throughput_ips"],
+            })
+    return pd.DataFrame(rows)
+
+def analyze_run(run_dir):
+    """(per-repetition autoscaler metrics of the supersonic sequences, comparison with bare_triton)."""
+    steps = load_run_steps(run_dir)
+    capacity = server_capacity(steps)
+    rows = []
+    if steps is not None:
+        for sequence in steps.loc[steps["mode"] == "supersonic", "sequence"].unique():
+            for rep, files in find_repetitions(os.path.join(run_dir, sequence)).items():
+                if "live" not in files:
+                    continue
+                live = pd.read_csv(files["live"])
+                if live.empty:
+                    continue
+                rows.append({"sequence": sequence, "repetition": rep, "clients_per_server": capacity,
+                             **analyze_series(live, capacity)})
+    autoscaler = pd.DataFrame(rows)
+    comparison = compare_to_static(step_costs(steps)) if steps is not None else pd.DataFrame()
+    return autoscaler, comparison
+
+def write_report(run_dir, out_dir):
+    """Write autoscaler.csv and autoscaler_vs_bare_triton.csv; returns False when the run has no supersonic steps."""
+    autoscaler, comparison = analyze_run(run_dir)
+    if autoscaler.empty:
+        return False
+    autoscaler.to_csv(os.path.join(out_dir, AUTOSCALER_CSV), index=False)
+    if not comparison.empty:
+        comparison.to_csv(os.path.join(out_dir, BASELINE_CSV), index=False)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how well the SuperSONIC autoscaler tracked the load of a run")
+    parser.add_argument("run_dir", help="run directory (multiseq_YYYYMMDD_HHMMSS)")
+    parser.add_argument("--output", help="directory for autoscaler.csv and autoscaler_vs_bare_triton.csv")
+    args = parser.parse_args()
+
+    autoscaler, comparison = analyze_run(args.run_dir)
+    if autoscaler.empty:
+        print(f"No supersonic live metrics in {args.run_dir}")
+        sys.exit(1)
+    fmt = lambda x: f"{x:.4g}"
+    capacity = autoscaler["clients_per_server"].iloc[0]
+    oracle = (f"{capacity:g} clients per server" if capacity
+              else f"GPU work at {AUTOSCALER_TARGET_UTIL:.0%} utilization")
+    print(f"Oracle: {oracle}, SLO {AUTOSCALER_SLO_MS} ms")
+    print(autoscaler.drop(columns=["clients_per_server"]).to_string(index=False, float_format=fmt))
+    if comparison.empty:
+        print("\nNo bare_triton sequences with a matching number of servers to compare against")
+    else:
+        print("\nAgainst bare_triton:")
+        print(comparison.to_string(index=False, float_format=fmt))
+    if args.output:
+        autoscaler.to_csv(os.path.join(args.output, AUTOSCALER_CSV), index=False)
+        comparison.to_csv(os.path.join(args.output, BASELINE_CSV), index=False)
+
+if __name__ == "__main__":
+    main()
@@ -2,135 +2,234 @@
 import time
 import pandas as pd
 import csv
+import json
 import os
-from config import COLUMNS, OUTPUT_CSV, LIVE_METRICS_CSV, DEPLOYMENT_NAME
-from kube_utils import set_service_mode, scale_deployment
-from client_job import run_client_job
+import sys
+import argparse
+from config import (RESULTS_ROOT, RUN_INFO_JSON, CONTAINER_IMAGE, COLUMNS, OUTPUT_CSV, LIVE_METRICS_CSV, DEPLOYMENT_NAME, LIVE_METRICS_COLUMNS, STEP_COLUMNS,
+                    METRICS_SOURCE, TRITON_METRICS_COLUMNS, LOADGEN_CONCURRENCY, FAULT_COLUMNS, MIN_CLIENT_COVERAGE,
+                    STEP_MAX_ATTEMPTS, WINDOW_COLUMNS)
+from runner_job import git_revision
+from kube_utils import set_service_mode, scale_deployment, get_deployment_images, runner_startup_times
+from client_job import run_client_job, client_coverage
 from datetime import datetime
 from plotting import plot_results
+from dashboard import LiveDashboard
+import tracing
+import catalog
+import triton_metrics
+import payloads
+import experiment_spec
+import step_order
+import autoscaler
+import faults
+from step_order import step_reset
+from stopping import stopping_config
+from soak import soak_config
+from harness_metrics import start_metrics_server, set_current_step, STEPS_COMPLETED, STEP_RETRIES
 
-def run_experiment_sequences(sequences_dict, repetitions=1, start=0):
+def write_run_info(run_dir, sequences_dict):
+    startup = runner_startup_times()
+    if startup:
+        print(f"Runner startup: {startup}")
+    info = {
+        "started_at": datetime.utcnow().isoformat(),
+        "git_rev": git_revision(),
+        "client_image": CONTAINER_IMAGE,
+        "server_images": get_deployment_images(),
+        "runner_startup": startup,
+        "sequences": sequences_dict,
+    }
+    with open(os.path.join(run_dir, RUN_INFO_JSON), "w") as f:
+        json.dump(info, f, indent=2)
+
+def run_sequence_rep(run_dir, key, rep, experiment_sequence, dashboard=None, optimized=False):
+    """
+    Run one repetition of one sequence and write its results_, live_metrics_, steps_ and windows_repN.csv.
+    optimized: servers are only reset before steps with cold_start (see step_order.py).
+    """
+    seq_dir = os.path.join(run_dir, key)
+    # New file paths (no rep_N subdir)
+    output_csv = os.path.join(seq_dir, f'results_rep{rep}.csv')
+    live_metrics_csv = os.path.join(seq_dir, f'live_metrics_rep{rep}.csv')
+    steps_csv = os.path.join(seq_dir, f'steps_rep{rep}.csv')
+    windows_csv = os.path.join(seq_dir, f'windows_rep{rep}.csv')
+    pd.DataFrame(columns=COLUMNS + ["repetition", "step"]).to_csv(output_csv, index=False)
+    with open(live_metrics_csv, "w", newline="") as live_metrics_file, \
+         open(steps_csv, "w", newline="") as steps_file, \
+         open(windows_csv, "w", newline="") as windows_file:
+        live_metrics_writer = csv.DictWriter(live_metrics_file, fieldnames=LIVE_METRICS_COLUMNS)
+        live_metrics_writer.writeheader()
+        if dashboard is not None:
+            live_metrics_writer = dashboard.wrap(live_metrics_writer)
+        steps_writer = csv.DictWriter(steps_file, fieldnames=STEP_COLUMNS)
+        steps_writer.writeheader()
+        windows_writer = csv.DictWriter(windows_file, fieldnames=WINDOW_COLUMNS)
+        windows_writer.writeheader()
+        if METRICS_SOURCE == "triton":
+            triton_metrics_file = open(os.path.join(seq_dir, f'triton_metrics_rep{rep}.csv'), "w", newline="")
+            triton_writer = csv.DictWriter(triton_metrics_file, fieldnames=TRITON_METRICS_COLUMNS)
+            triton_writer.writeheader()
+            triton_metrics.start_poller(triton_writer)
+        if any(exp.get("faults") for exp in experiment_sequence):
+            faults_file = open(os.path.join(seq_dir, f'faults_rep{rep}.csv'), "w", newline="")
+            faults_writer = csv.DictWriter(faults_file, fieldnames=FAULT_COLUMNS)
+            faults_writer.writeheader()
+        rep_data = []  # List to store data from this repetition
+        for step, exp in enumerate(experiment_sequence):
+            mode = exp["mode"]
+            n_clients = exp["n_clients"]
+            n_servers = exp["n_servers"]
+            reset = step_reset(exp, optimized)
+            request_count = exp.get("request_count", 5000)
+            print(f"[{key}] [Rep={rep}] [Mode={mode}] Running n_servers={n_servers}, n_clients={n_clients}")
+            if dashboard is not None:
+                dashboard.set_step(sequence=key, repetition=rep, step=step, mode=mode,
+                                   n_servers=n_servers, n_clients=n_clients)
+            set_current_step(rep, step, n_clients, n_servers)
+            tracing.set_context(sequence=key, repetition=rep, step=step, mode=mode, n_servers=n_servers,
+                                n_clients=n_clients, request_count=request_count)
+            set_service_mode(mode)
+            scale_deployment(DEPLOYMENT_NAME, "cms", n_servers, mode, reset=reset)
+            payload_dir = payloads.ensure_payload(exp["payload"]) if exp.get("payload") else None
+            stopping = stopping_config(exp.get("stopping"))
+            soak = soak_config(exp.get("soak"))
+            # Steps where too few clients produced a result are run again rather than averaged, except
+            # fault steps: their failing clients are the measurement, and a re-run would inject again
+            max_attempts = 1 if exp.get("faults") else STEP_MAX_ATTEMPTS
+            for attempt in range(1, max_attempts + 1):
+                injector = faults.FaultInjector(exp["faults"], faults.KubeFaultBackend(), step) if exp.get("faults") else None
+                step_start = datetime.utcnow().isoformat()
+                # Fault times count from the start of the load, not from the creation of the client pods
+                on_start = injector.start if injector is not None else None
+                try:
+                    if soak:
+                        # Steady load until soak duration_s; its live metrics, windows and rolling
+                        # summaries go to rotated soak_repN_stepM_* files instead of the repetition's
+                        from loadgen import run_soak_step  # needs tritonclient, only installed for this engine
+                        df_clients = run_soak_step(n_clients, mode, n_servers, soak,
+                                                   os.path.join(seq_dir, f"soak_rep{rep}_step{step}"), dashboard,
+                                                   concurrency=exp.get("concurrency", LOADGEN_CONCURRENCY),
+                                                   rate=exp.get("rate"), payload_dir=payload_dir, on_start=on_start)
+                    elif exp.get("engine", "perf_analyzer") == "python":
+                        # In-process asyncio clients instead of one perf_analyzer pod per client
+                        from loadgen import run_loadgen_step
+                        df_clients = run_loadgen_step(n_clients, mode, n_servers, live_metrics_writer=live_metrics_writer,
+                                                      request_count=request_count,
+                                                      concurrency=exp.get("concurrency", LOADGEN_CONCURRENCY),
+                                                      rate=exp.get("rate"), payload_dir=payload_dir,
+                                                      stopping=stopping, windows_writer=windows_writer,
+                                                      on_start=on_start)
+                    else:
+                        df_clients = run_client_job(n_clients, mode, n_servers, live_metrics_writer=live_metrics_writer,
+                                                    request_count=request_count, payload_dir=payload_dir,
+                                                    stopping=stopping, windows_writer=windows_writer,
+                                                    keep_failed_metrics=bool(exp.get("faults")), on_start=on_start)
+                finally:
+                    # Faults never outlive their step: cordoned nodes and proxy delays are reverted here
+                    fault_events = injector.stop() if injector is not None else []
+                for event in fault_events:
+                    faults_writer.writerow({**event, "attempt": attempt})
+                if fault_events:
+                    faults_file.flush()
+                step_end = datetime.utcnow().isoformat()
+                coverage = client_coverage(df_clients, n_clients)
+                if coverage >= MIN_CLIENT_COVERAGE or attempt == max_attempts:
+                    break
+                STEP_RETRIES.labels(mode).inc()
+                print(f"[{key}] [Rep={rep}] only {coverage:.0%} of the clients produced a result "
+                      f"(minimum {MIN_CLIENT_COVERAGE:.0%}), running the step again ({attempt + 1}/{max_attempts})")
+            if coverage < MIN_CLIENT_COVERAGE:
+                print(f"[{key}] [Rep={rep}] WARNING: step kept with {coverage:.0%} client coverage after {attempt} attempts")
+            if stopping:
+                print(f"[{key}] [Rep={rep}] achieved precision: throughput ±{df_clients['throughput_ci_rel'].max():.1%}, "
+                      f"p99 ±{df_clients['p99_ci_rel'].max():.1%} (target ±{stopping['rel_ci']:.1%})")
+            steps_writer.writerow({
+                "step": step, "mode": mode, "n_clients": n_clients, "n_servers": n_servers,
+                "request_count": request_count, "start": step_start, "end": step_end,
+                "attempts": attempt, "client_coverage": coverage,
+            })
+            steps_file.flush()
+            windows_file.flush()
+            STEPS_COMPLETED.labels(key, mode).inc()
+            df_clients["mode"] = mode
+            df_clients["n_servers"] = n_servers
+            df_clients["repetition"] = rep  # Add repetition number
+            df_clients["step"] = step  # Index of the step within the sequence, matches steps_repN.csv
+            df_clients = df_clients[COLUMNS + ["repetition", "step"]]
+            df_clients.to_csv(output_csv, mode="a", index=False, header=False)
+            rep_data.append(df_clients)
+        if METRICS_SOURCE == "triton":
+            triton_metrics.stop_poller()
+            triton_metrics_file.close()
+        if any(exp.get("faults") for exp in experiment_sequence):
+            faults_file.close()
+        # After this repetition is complete, save its aggregated data
+        if rep_data:
+            combined_df = pd.concat(rep_data, ignore_index=True)
+            # No extra per-rep file needed, as all data is in results_repN.csv
+            print(f"Saved results for sequence {key} repetition {rep} to {output_csv}, {live_metrics_csv} and {steps_csv}")
+
+def run_experiment_sequences(sequences_dict, repetitions=1, start=0, dashboard=None, optimize_order=False):
     """
     sequences_dict: dict of {key: sequence_list}
     repetitions: number of times to repeat each sequence
     start: starting repetition index (default 0)
+    dashboard: optional LiveDashboard that receives every live-metrics sample
+    optimize_order: run the (sequence, repetition) units in the order that minimizes scale transitions
     Returns: (run_dir, list of keys)
     """
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    run_dir = os.path.join('/work/users/dkondra/sonic-benchmark/results', f'multiseq_{timestamp}')
+    run_dir = os.path.join(RESULTS_ROOT, f'multiseq_{timestamp}')
     os.makedirs(run_dir, exist_ok=True)
+    write_run_info(run_dir, sequences_dict)
+    tracing.start_trace(run_dir)
     keys = list(sequences_dict.keys())
     
     # Create a directory for each sequence
     for key in keys:
         seq_dir = os.path.join(run_dir, key)
         os.makedirs(seq_dir, exist_ok=True)
-    
-    for key, experiment_sequence in sequences_dict.items():
-        seq_dir = os.path.join(run_dir, key)
-        # Run the sequence multiple times
-        for rep in range(start, start + repetitions):
-            # New file paths (no rep_N subdir)
-            output_csv = os.path.join(seq_dir, f'results_rep{rep}.csv')
-            live_metrics_csv = os.path.join(seq_dir, f'live_metrics_rep{rep}.csv')
-            pd.DataFrame(columns=COLUMNS).to_csv(output_csv, index=False)
-            with open(live_metrics_csv, "w", newline="") as live_metrics_file:
-                live_metrics_writer = csv.DictWriter(live_metrics_file, fieldnames=[
-                    "timestamp", "running_clients", "running_servers", "envoy_overhead", "gpu_util", "total_latency"
-                ])
-                live_metrics_writer.writeheader()
-                rep_data = []  # List to store data from this repetition
-                for exp in experiment_sequence:
-                    mode = exp["mode"]
-                    n_clients = exp["n_clients"]
-                    n_servers = exp["n_servers"]
-                    restart_servers = exp.get("restart_servers", True)
-                    print(f"[{key}] [Rep={rep}] [Mode={mode}] Running n_servers={n_servers}, n_clients={n_clients}")
-                    set_service_mode(mode)
-                    scale_deployment(DEPLOYMENT_NAME, "cms", n_servers, mode, reset=restart_servers)
-                    request_count = exp.get("request_count", 5000)
-                    df_clients = run_client_job(n_clients, mode, n_servers, live_metrics_writer=live_metrics_writer, request_count=request_count)
-                    df_clients["mode"] = mode
-                    df_clients["n_servers"] = n_servers
-                    df_clients["repetition"] = rep  # Add repetition number
-                    df_clients = df_clients[COLUMNS + ["repetition"]]  # Include repetition in output
-                    df_clients.to_csv(output_csv, mode="a", index=False, header=False)
-                    rep_data.append(df_clients)
-                # After this repetition is complete, save its aggregated data
-                if rep_data:
-                    combined_df = pd.concat(rep_data, ignore_index=True)
-                    # No extra per-rep file needed, as all data is in results_repN.csv
-                    print(f"Saved results for sequence {key} repetition {rep} to {output_csv} and {live_metrics_csv}")
+
+    units = [(key, rep) for key in keys for rep in range(start, start + repetitions)]
+    order_plan = None
+    if optimize_order:
+        model = experiment_spec.PhaseModel(experiment_spec.load_timings())
+        order_plan = step_order.plan_order(units, sequences_dict, model)
+        step_order.save_plan(run_dir, order_plan)
+        step_order.print_plan(order_plan)
+        units = [tuple(unit) for unit in order_plan["order"]]
+    for key, rep in units:
+        run_sequence_rep(run_dir, key, rep, sequences_dict[key], dashboard, optimized=optimize_order)
+    tracing.stop_trace()
+    tracing.report_timings(run_dir)
+    if order_plan is not None:
+        step_order.report_savings(run_dir, order_plan)
+    catalog.index_run(run_dir)
     print(f"Data collection complete. Results saved in {run_dir}")
     return run_dir, keys
 
 if __name__ == "__main__":
-    # Set these constants to control repetitions and starting index
-    REPETITIONS = 1  # Number of repetitions
-    START = 1        # Starting repetition index
+    parser = argparse.ArgumentParser(description="Run the experiment sequences of a spec file")
+    parser.add_argument("--spec", default="experiments/supersonic.yaml", help="YAML or TOML experiment spec")
+    parser.add_argument("--dry-run", action="store_true", help="print the expanded plan and its estimated duration")
+    args = parser.parse_args()
 
-    SEQUENCES = {
-        # "triton_1server": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 1, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 1, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 1, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_2servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 2, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 2, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 2, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_3servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 3, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 3, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 3, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_4servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 4, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 4, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 4, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_5servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 5, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 5, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 5, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_6servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 6, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 6, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 6, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_7servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 7, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 7, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 7, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_8servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 8, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 8, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 8, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_9servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 9, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 9, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 9, "request_count": 10000, "restart_servers": False},
-        # ],
-        # "triton_10servers": [
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 10, "request_count": 10000, "restart_servers": True},
-        #     {"mode": "bare_triton", "n_clients": 10, "n_servers": 10, "request_count": 10000, "restart_servers": False},
-        #     {"mode": "bare_triton", "n_clients": 1, "n_servers": 10, "request_count": 10000, "restart_servers": False},
-        # ],
-        "supersonic": [
-            {"mode": "supersonic", "n_clients": 1, "n_servers": 1, "request_count": 10000, "restart_servers": True},
-            {"mode": "supersonic", "n_clients": 10, "n_servers": 1, "request_count": 10000, "restart_servers": False},
-            {"mode": "supersonic", "n_clients": 1, "n_servers": 1, "request_count": 10000, "restart_servers": False},
-        ],
-    }
-    results_dir, keys = run_experiment_sequences(SEQUENCES, repetitions=REPETITIONS, start=START)
+    spec = experiment_spec.load_spec(experiment_spec.resolve_spec(args.spec))
+    sequences, repetitions, start = experiment_spec.expand_spec(spec)
+    optimize_order = spec.get("optimize_order", False)
+    if args.dry_run:
+        model = experiment_spec.PhaseModel(experiment_spec.load_timings())
+        experiment_spec.print_plan(experiment_spec.plan(sequences, repetitions, model))
+        if optimize_order:
+            units = [(key, rep) for key in sequences for rep in range(start, start + repetitions)]
+            step_order.print_plan(step_order.plan_order(units, sequences, model))
+        sys.exit(0)
+    start_metrics_server()
+    dashboard = LiveDashboard()
+    dashboard.start()
+    results_dir, keys = run_experiment_sequences(sequences, repetitions=repetitions, start=start, dashboard=dashboard,
+                                                 optimize_order=optimize_order)
     plot_results(results_dir, keys)
- 
-    # results_dir = "/work/users/dkondra/sonic-benchmark/results/multiseq_20250611_031705"
-    # results_dir = "results/multiseq_20250611_143922"
-    # results_dir = "results/supersonic-scaling"
-    # keys = ["triton_1server", "triton_2servers", "triton_3servers", "triton_4servers", "triton_5servers", "triton_6servers", "triton_7servers", "triton_8servers", "triton_9servers", "triton_10servers", "supersonic"]
-    # plot_results(results_dir, keys) 
\ No newline at end of file
+    if autoscaler.write_report(results_dir, os.path.join(results_dir, "plots")):
+        print(f"Autoscaler analysis saved in {os.path.join(results_dir, 'plots')}")
@@ -0,0 +1,166 @@
+# SQLite index of all benchmark runs under the results root
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from glob import glob
+import pandas as pd
+from config import RESULTS_ROOT, CATALOG_DB, RUN_INFO_JSON
+from analysis import load_step_summaries
+from plotting import plot_results
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_dir       TEXT PRIMARY KEY,
+    run_name      TEXT,
+    started_at    TEXT,
+    git_rev       TEXT,
+    client_image  TEXT,
+    server_images TEXT,
+    sequences     TEXT,
+    n_steps       INTEGER,
+    indexed_at    TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_dir            TEXT,
+    sequence           TEXT,
+    repetition         INTEGER,
+    step               INTEGER,
+    mode               TEXT,
+    n_servers          INTEGER,
+    n_clients          INTEGER,
+    request_count      INTEGER,
+    batch_size         INTEGER,
+    start              TEXT,
+    end                TEXT,
+    duration_s         REAL,
+    throughput_ips     REAL,
+    avg_latency_us     REAL,
+    p99_latency_us     REAL,
+    gpu_util_avg       REAL,
+    envoy_overhead_avg REAL,
+    PRIMARY KEY (run_dir, sequence, repetition, step)
+);
+CREATE INDEX IF NOT EXISTS steps_params ON steps (mode, n_servers, n_clients, batch_size);
+CREATE INDEX IF NOT EXISTS steps_run ON steps (run_dir);
+"""
+
+STEP_FIELDS = [
+    "sequence", "repetition", "step", "mode", "n_servers", "n_clients", "request_count", "batch_size",
+    "start", "end", "duration_s", "throughput_ips", "avg_latency_us", "p99_latency_us",
+    "gpu_util_avg", "envoy_overhead_avg",
+]
+
+FILTER = re.compile(r"^(\w+)\s*(>=|<=|!=|=|>|<)\s*(.+)$")
+
+def connect(db_path=CATALOG_DB):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def index_run(run_dir, db_path=CATALOG_DB):
+    """(Re)index one run directory: its run_info.json and the summary of every step."""
+    run_dir = os.path.abspath(run_dir)
+    info = {}
+    info_path = os.path.join(run_dir, RUN_INFO_JSON)
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            info = json.load(f)
+
+    summaries = []
+    for seq_dir in sorted(glob(os.path.join(run_dir, "*", ""))):
+        summary = load_step_summaries(seq_dir)
+        if summary is not None:
+            summary["sequence"] = os.path.basename(os.path.dirname(seq_dir))
+            summaries.append(summary)
+    steps = pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame(columns=STEP_FIELDS)
+    steps = steps.reindex(columns=STEP_FIELDS)
+    for col in ("start", "end"):
+        # Missing times stay NULL rather than becoming the strings "nan"/"NaT"
+        steps[col] = steps[col].map(lambda t: str(t) if pd.notna(t) else None)
+
+    conn = connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM steps WHERE run_dir = ?", (run_dir,))
+        conn.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_dir, os.path.basename(run_dir), info.get("started_at"), info.get("git_rev"),
+                info.get("client_image"), json.dumps(info.get("server_images")),
+                json.dumps(info.get("sequences")), len(steps), datetime.utcnow().isoformat(),
+            ),
+        )
+        rows = [(run_dir, *row) for row in steps.astype(object).where(steps.notna(), None).itertuples(index=False)]
+        conn.executemany(f"INSERT INTO steps VALUES ({', '.join('?' * (len(STEP_FIELDS) + 1))})", rows)
+    conn.close()
+    print(f"Indexed {len(steps)} steps of {run_dir} into {db_path}")
+
+def parse_filters(expressions):
+    """Turn ["mode=supersonic", "n_servers>=4"] into a SQL WHERE clause and its parameters."""
+    clauses, params = [], []
+    for expr in expressions:
+        m = FILTER.match(expr)
+        if not m or m.group(1) not in STEP_FIELDS + ["run_dir", "git_rev", "client_image"]:
+            raise ValueError(f"Invalid filter: {expr!r}")
+        column, op, value = m.groups()
+        try:
+            value = float(value) if "." in value else int(value)
+        except ValueError:
+            pass
+        clauses.append(f"{column} {op} ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def query_steps(filters=(), db_path=CATALOG_DB):
+    """Steps matching the filters, joined with their run metadata."""
+    where, params = parse_filters(filters)
+    conn = connect(db_path)
+    df = pd.read_sql_query(
+        "SELECT * FROM steps JOIN runs USING (run_dir)" + where + " ORDER BY started_at, run_dir, sequence, repetition, step",
+        conn, params=params,
+    )
+    conn.close()
+    return df
+
+def query_runs(filters=(), db_path=CATALOG_DB):
+    """Run directories with at least one step matching the filters, oldest first."""
+    df = query_steps(filters, db_path)
+    return list(dict.fromkeys(df["run_dir"]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and query benchmark runs")
+    parser.add_argument("--db", default=CATALOG_DB, help="catalog database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    index_parser = sub.add_parser("index", help="index run directories (default: every run under the results root)")
+    index_parser.add_argument("run_dirs", nargs="*")
+    query_parser = sub.add_parser("query", help="list steps matching filters such as mode=supersonic n_servers>=4")
+    query_parser.add_argument("filters", nargs="*")
+    query_parser.add_argument("--runs", action="store_true", help="print only the matching run directories")
+    plot_parser = sub.add_parser("plot", help="plot the most recent run with steps matching the filters")
+    plot_parser.add_argument("filters", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        for run_dir in args.run_dirs or sorted(glob(os.path.join(RESULTS_ROOT, "multiseq_*"))):
+            index_run(run_dir, args.db)
+    elif args.command == "plot":
+        df = query_steps(args.filters, args.db)
+        if df.empty:
+            print("No matching runs")
+            sys.exit(1)
+        run_dir = df["run_dir"].iloc[-1]
+        plot_results(run_dir, list(dict.fromkeys(df.loc[df["run_dir"] == run_dir, "sequence"])))
+    elif args.runs:
+        print("\n".join(query_runs(args.filters, args.db)))
+    else:
+        df = query_steps(args.filters, args.db)
+        if df.empty:
+            print("No matching steps")
+            sys.exit(1)
+        print(df[["run_name", "git_rev"] + STEP_FIELDS].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # Client job execution and log parsing for the benchmark
+import os
 import time
 import uuid
 import re
@@ -6,12 +7,23 @@ import pandas as pd
 import numpy as np
 from kubernetes import client
 from datetime import datetime
-from config import (NAMESPACE, SUPERSONIC_SERVICE, BARE_TRITON_SERVICE, JOB_BASE_NAME, CONTAINER_IMAGE, CONTAINER_NAME, SERVICE_ACCOUNT_NAME, RESOURCES, METRIC_PATTERNS, COLUMNS)
+from config import (NAMESPACE, SUPERSONIC_SERVICE, BARE_TRITON_SERVICE, JOB_BASE_NAME, CONTAINER_IMAGE, CONTAINER_NAME, SERVICE_ACCOUNT_NAME, RESOURCES, METRIC_PATTERNS, COLUMNS,
+                    CLIENT_THROTTLE_THRESHOLD, CLIENT_CPU_SATURATION, MODEL_NAME, MODEL_BATCH_SIZE, MODEL_INPUTS,
+                    SHARED_VOLUME_CLAIM, SHARED_VOLUME_MOUNT, CLIENT_MAX_RESTARTS, CLIENT_REQUIRED_FIELDS,
+                    CLIENT_ERROR_PATTERN, CLOCK_SYNC_SAMPLES, CLOCK_SYNC_URL, DASHBOARD_PORT)
+from payloads import INPUT_DATA_JSON
+from stopping import PASS_PATTERN, perf_analyzer_flags, parse_passes
 from kube_utils import count_running_pods, count_running_servers
-from metrics import query_envoy_overhead, query_gpu_utilization, query_total_latency
+from client_placement import assign_clients
+from tracing import span, record_span
+from metrics import query_envoy_overhead, query_gpu_utilization, query_total_latency, query_failure_rate
+from faults import active_faults
+from harness_metrics import (instrumented, KUBE_API_SECONDS, POLL_LOOP_SECONDS, LAST_POLL_TIMESTAMP,
+                             LOG_FETCH_SECONDS, LOG_PARSE_SECONDS, CLIENT_FAILURES)
 
-def log_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_clients, running_servers, envoy_overhead, gpu_util, total_latency):
-    timestamp = datetime.utcnow().isoformat()
+def log_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_clients, running_servers, envoy_overhead, gpu_util, total_latency,
+                     failure_rate=None, timestamp=None):
+    timestamp = (timestamp or datetime.utcnow()).isoformat()
     row = {
         "timestamp": timestamp,
         "running_clients": running_clients,
@@ -19,27 +31,200 @@ def log_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_cl
         "envoy_overhead": envoy_overhead,
         "gpu_util": gpu_util,
         "total_latency": total_latency,
+        "failure_rate": failure_rate,
+        "active_faults": active_faults(),
     }
     live_metrics_writer.writerow(row)
 
-def run_client_job(n_clients: int, mode: str, n_servers: int, live_metrics_writer=None, request_count: int = 5000):
-    if mode == "supersonic":
-        endpoint_url = f"{SUPERSONIC_SERVICE}.{NAMESPACE}.svc.cluster.local:8001"
-    else:
-        endpoint_url = f"{BARE_TRITON_SERVICE}.{NAMESPACE}.geddes.rcac.purdue.edu:8001"
+def sample_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_clients, envoy_samples, gpu_samples,
+                        client_failure_rate=None):
+    """
+    One poll of the server-side metrics: appends to the step's envoy/GPU samples and writes a live row.
+    All queries are evaluated at the poll's start, which is also the row's timestamp, however long
+    they take to return. client_failure_rate, when the clients can report it (the loadgen engine),
+    replaces the queried failure rate: requests lost with a killed server are only seen by clients.
+    """
+    at = time.time()
+    sampled_at = datetime.utcfromtimestamp(at)
+    e_sample = query_envoy_overhead(at)
+    if e_sample is not None and e_sample != 0:
+        envoy_samples.append(e_sample)
+    g_sample = query_gpu_utilization(at)
+    if g_sample is not None and g_sample != 0:
+        gpu_samples.append(g_sample)
+    t_sample = query_total_latency(at)
+    f_sample = client_failure_rate if client_failure_rate is not None else query_failure_rate(at)
 
-    job_name = f"{JOB_BASE_NAME}-{str(uuid.uuid4())[:8]}"
+    if live_metrics_writer:
+        running_servers = count_running_servers(NAMESPACE)
+        if mode == "supersonic":
+            if (e_sample is not None and g_sample is not None and t_sample is not None 
+                and running_clients is not None and running_servers is not None):
+                log_live_metrics(
+                    live_metrics_writer, mode, n_clients, n_servers,
+                    running_clients, running_servers, e_sample, g_sample, t_sample, f_sample, sampled_at
+                )
+        else:
+            log_live_metrics(
+                live_metrics_writer, mode, n_clients, n_servers,
+                running_clients, running_servers, e_sample, g_sample, t_sample, f_sample, sampled_at
+            )
+
+def mean_std(samples):
+    if not samples:
+        return None, None
+    return float(np.mean(samples)), float(np.std(samples))
+
+# Prints the pod's cgroup CPU and memory counters as "CGROUP_<tag> <key> <value>" lines (cgroup v2 or v1)
+CGROUP_STATS_SCRIPT = '''
+cgroup_stats() {
+  echo "CGROUP_$1 time $(date +%s.%N)"
+  if [ -f /sys/fs/cgroup/cpu.stat ]; then
+    sed "s/^/CGROUP_$1 /" /sys/fs/cgroup/cpu.stat
+    echo "CGROUP_$1 memory_peak $(cat /sys/fs/cgroup/memory.peak 2>/dev/null || cat /sys/fs/cgroup/memory.current)"
+  else
+    sed "s/^/CGROUP_$1 /" /sys/fs/cgroup/cpu,cpuacct/cpu.stat 2>/dev/null || sed "s/^/CGROUP_$1 /" /sys/fs/cgroup/cpu/cpu.stat
+    echo "CGROUP_$1 usage_usec $(( $(cat /sys/fs/cgroup/cpuacct/cpuacct.usage) / 1000 ))"
+    echo "CGROUP_$1 memory_peak $(cat /sys/fs/cgroup/memory/memory.max_usage_in_bytes)"
+  fi
+}
+'''
+
+def cpu_limit_cores() -> float:
+    cpu = str(RESOURCES.limits["cpu"])
+    return float(cpu[:-1]) / 1000 if cpu.endswith("m") else float(cpu)
+
+def parse_cgroup_stats(log_text: str) -> dict:
+    """
+    CPU usage, throttling and peak memory of a client pod over its perf_analyzer run, from the
+    counters printed before (CGROUP_START) and after (CGROUP_END) it.
+    """
+    stats = {"START": {}, "END": {}}
+    for tag, key, value in re.findall(r"^CGROUP_(START|END) (\w+) ([\d.]+)$", log_text, re.MULTILINE):
+        stats[tag][key] = float(value)
+    start, end = stats["START"], stats["END"]
+    rec = {"cpu_usage_cores": None, "cpu_throttled_ratio": None, "cpu_throttled_s": None,
+           "memory_peak_bytes": end.get("memory_peak"), "client_saturated": None}
+    if "time" not in start or "time" not in end:
+        return rec
+    delta = {key: end[key] - start[key] for key in end if key in start}
+    wall = delta["time"]
+    if "usage_usec" in delta and wall > 0:
+        rec["cpu_usage_cores"] = delta["usage_usec"] / 1e6 / wall
+    if delta.get("nr_periods"):
+        rec["cpu_throttled_ratio"] = delta.get("nr_throttled", 0) / delta["nr_periods"]
+    if "throttled_usec" in delta:
+        rec["cpu_throttled_s"] = delta["throttled_usec"] / 1e6
+    elif "throttled_time" in delta:  # cgroup v1 reports nanoseconds
+        rec["cpu_throttled_s"] = delta["throttled_time"] / 1e9
+    rec["client_saturated"] = bool(
+        (rec["cpu_throttled_ratio"] or 0) > CLIENT_THROTTLE_THRESHOLD
+        or (rec["cpu_usage_cores"] or 0) >= CLIENT_CPU_SATURATION * cpu_limit_cores()
+    )
+    return rec
+
+def clock_sync_script(url: str) -> str:
+    """Shell function printing "CLOCK_SYNC <sent> <runner time> <received>" for CLOCK_SYNC_SAMPLES exchanges with url."""
+    if not url:
+        return "\nclock_sync() { :; }\n"
+    return f'''
+clock_sync() {{
+  for i in $(seq {CLOCK_SYNC_SAMPLES}); do
+    T0=$(date +%s.%N)
+    T=$(curl -sf -m 2 {url}) && echo "CLOCK_SYNC $T0 $T $(date +%s.%N)"
+  done
+}}
+'''
+
+def runner_clock_url() -> str:
+    """The runner's /time endpoint (see dashboard.py) client pods synchronise against, or None outside a runner pod."""
+    if CLOCK_SYNC_URL:
+        return CLOCK_SYNC_URL
+    pod_ip = os.environ.get("POD_IP")
+    return f"http://{pod_ip}:{DASHBOARD_PORT}/time" if pod_ip else None
+
+def parse_clock_offset(log_text: str):
+    """
+    (offset, round trip) in seconds of the runner's clock against the client's, from the CLOCK_SYNC
+    exchange with the shortest round trip. The runner's time is assumed to be read halfway through
+    it, so the offset is exact to within half the round trip. (None, None) without exchanges.
+    """
+    samples = [(float(t1) - float(t0), float(t) - (float(t0) + float(t1)) / 2)
+               for t0, t, t1 in re.findall(r"^CLOCK_SYNC ([\d.]+) ([\d.]+) ([\d.]+)$", log_text, re.MULTILINE)]
+    if not samples:
+        return None, None
+    rtt, offset = min(samples)
+    return offset, rtt
+
+def runner_time(client_time: float, offset: float) -> str:
+    """A client epoch timestamp as an ISO time on the runner's clock (uncorrected without an offset)."""
+    if client_time is None:
+        return None
+    return datetime.utcfromtimestamp(client_time + (offset or 0.0)).isoformat()
+
+# A perf_analyzer window line, followed by the client time it was printed at (see client_script)
+WINDOW_PATTERN = re.compile(PASS_PATTERN.pattern + r".*\nPASS_TIME ([\d.]+)$", re.MULTILINE)
+
+def parse_windows(log_text: str, window_s: float = None) -> list:
+    """
+    Every perf_analyzer measurement window of a client pod, with start and end on the runner's clock.
+    A window ends when its "Pass [n]" line is printed; it started window_s earlier in time_windows
+    mode, else where the previous window ended (the first one at perf_analyzer's launch).
+    """
+    offset, rtt = parse_clock_offset(log_text)
+    launch = re.search(r"^CGROUP_START time ([\d.]+)$", log_text, re.MULTILINE)
+    previous = float(launch.group(1)) if launch else None
+    windows = []
+    for n, throughput, stat, latency, printed in WINDOW_PATTERN.findall(log_text):
+        end = float(printed)
+        start = end - window_s if window_s else previous
+        previous = end
+        windows.append({
+            "window": int(n), "start": runner_time(start, offset), "end": runner_time(end, offset),
+            "throughput_ips": float(throughput), "latency_us": int(latency), "latency_stat": stat.lower(),
+            "clock_offset_s": offset, "clock_rtt_s": rtt,
+        })
+    return windows
 
-    barrier_script = f'''
-echo "Waiting for {n_clients} pods to reach Running..."
+# Label put on every client pod once all clients of a step, across all placements, are Running
+GO_LABEL = "sonic-benchmark-go"
+
+def endpoint_url(mode: str, placement=None) -> str:
+    if placement is not None and mode in placement.endpoints:
+        return placement.endpoints[mode]
+    if mode == "supersonic":
+        return f"{SUPERSONIC_SERVICE}.{NAMESPACE}.svc.cluster.local:8001"
+    return f"{BARE_TRITON_SERVICE}.{NAMESPACE}.geddes.rcac.purdue.edu:8001"
+
+def client_script(job_name: str, namespace: str, n_local: int, endpoint: str, request_count: int, gated: bool,
+                  payload_dir: str = None, stopping: dict = None, clock_url: str = None) -> str:
+    """
+    Barrier + perf_analyzer. Pods wait until all n_local pods of their job are Running (or already
+    done); when the step spans several placements (gated), they instead wait for the runner to put
+    GO_LABEL on them, which it does once every placement is ready and to pods recreated later.
+    With a payload_dir, requests are built from its precomputed inputs instead of random data;
+    with a stopping config, perf_analyzer measures until its results are stable instead of
+    sending request_count requests. perf_analyzer runs verbose, printing a line per measurement
+    window; each is followed by the time it was printed, and the clock is synchronised against
+    clock_url before and after the run.
+    """
+    selector = f"job-name={job_name}" + (f",{GO_LABEL}=true" if gated else "")
+    if payload_dir:
+        shapes = f"--input-data {payload_dir}/{INPUT_DATA_JSON}"
+    else:
+        shapes = " ".join(f"--shape {name}:{','.join(map(str, shape))}" for name, shape in MODEL_INPUTS.items())
+    measurement = perf_analyzer_flags(stopping) if stopping else f"--request-count={request_count}"
+    return CGROUP_STATS_SCRIPT + clock_sync_script(clock_url) + f'''
+echo "Waiting for {n_local} pods to reach Running..."
 TOKEN=$(cat /var/run/secrets/kubernetes.io/serviceaccount/token)
 while true; do
   RESPONSE=$(curl -sSk \
     -H "Authorization: Bearer $TOKEN" \
-    https://kubernetes.default.svc/api/v1/namespaces/{NAMESPACE}/pods?labelSelector=job-name={job_name} \
+    https://kubernetes.default.svc/api/v1/namespaces/{namespace}/pods?labelSelector={selector} \
     || echo '{{"failure":true}}')
-  RUNNING_COUNT=$(echo "$RESPONSE" | grep -oE '"phase"\\s*:\\s*"Running"' | wc -l || echo 0)
-  if [ "$RUNNING_COUNT" -ge "{n_clients}" ]; then
+  # Finished pods count too: a pod recreated after the others are done must not wait for them
+  RUNNING_COUNT=$(echo "$RESPONSE" | grep -oE '"phase"\\s*:\\s*"(Running|Succeeded)"' | wc -l || echo 0)
+  if [ "$RUNNING_COUNT" -ge "{n_local}" ]; then
     break
   fi
   sleep 2
@@ -47,19 +232,68 @@ done
 
 # perf_analyzer -i grpc \
 #   -m deepmet -x 1 \
-#   -u {endpoint_url} \
+#   -u {endpoint} \
 #   --async -p 1 \
 #   -b 20 \
 #   --request-count={request_count} \
 #   --concurrency-range=1 --input-data "random"
 
-perf_analyzer -m particlenet_AK4_PT -i grpc -u {endpoint_url} \
-    --async -p 1 -b 100 --concurrency-range 1 \
-    --shape pf_points__0:2,100 --shape pf_features__1:20,100 --shape pf_mask__2:1,100 --shape sv_points__3:2,10 --shape sv_features__4:11,10 --shape sv_mask__5:1,10 \
-    --request-count={request_count}
+clock_sync
+cgroup_stats START
+stdbuf -oL perf_analyzer -v -m {MODEL_NAME} -i grpc -u {endpoint} \
+    --async -p 1 -b {MODEL_BATCH_SIZE} --concurrency-range 1 \
+    {shapes} \
+    {measurement} 2>&1 | while IFS= read -r line; do
+  echo "$line"
+  case "$line" in *"Pass ["*) echo "PASS_TIME $(date +%s.%N)" ;; esac
+done
+STATUS=${{PIPESTATUS[0]}}
+cgroup_stats END
+clock_sync
+exit $STATUS
 '''
-    container_args = ["-c", barrier_script]
 
+def client_status(log_text: str, rec: dict, exit_code) -> str:
+    """
+    "ok" when perf_analyzer printed every CLIENT_REQUIRED_FIELDS and exited cleanly; otherwise
+    "errored" when it exited non-zero or reported an error, "partial" when its output just stops.
+    Only the output after the barrier is searched for errors, where curl retries cannot match.
+    """
+    complete = all(rec.get(field) is not None for field in CLIENT_REQUIRED_FIELDS)
+    if complete and exit_code in (None, 0):
+        return "ok"
+    run_output = log_text.split("CGROUP_START", 1)[1] if "CGROUP_START" in log_text else ""
+    if exit_code not in (None, 0) or re.search(CLIENT_ERROR_PATTERN, run_output):
+        return "errored"
+    return "partial"
+
+def pod_attempts(pod):
+    """(runs of the client container so far, exit code of the last finished one or None)."""
+    statuses = pod.status.container_statuses or []
+    if not statuses:
+        return 1, None
+    terminated = statuses[0].state.terminated if statuses[0].state else None
+    return statuses[0].restart_count + 1, terminated.exit_code if terminated else None
+
+def job_failed(status) -> bool:
+    return any(c.type == "Failed" and c.status == "True" for c in status.conditions or [])
+
+def client_coverage(df, n_clients: int) -> float:
+    """Share of the requested clients that produced a usable result."""
+    if df.empty or "client_status" not in df.columns:
+        return 0.0
+    return min(1.0, float((df["client_status"] == "ok").sum()) / n_clients)
+
+def build_client_job(job_name: str, placement, n_local: int, script: str, mount_shared: bool = False):
+    volumes, volume_mounts = None, None
+    if mount_shared:
+        # Payloads live on the shared volume; mounted read-only so clients cannot corrupt them
+        volumes = [client.V1Volume(
+            name="shared",
+            persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                claim_name=SHARED_VOLUME_CLAIM, read_only=True),
+        )]
+        volume_mounts = [client.V1VolumeMount(name="shared", mount_path=SHARED_VOLUME_MOUNT, read_only=True)]
     pod_template = client.V1PodTemplateSpec(
         metadata=client.V1ObjectMeta(labels={"job-name": job_name}),
         spec=client.V1PodSpec(
@@ -70,108 +304,192 @@ perf_analyzer -m particlenet_AK4_PT -i grpc -u {endpoint_url} \
                     name=CONTAINER_NAME,
                     image=CONTAINER_IMAGE,
                     command=["/bin/bash"],
-                    args=container_args,
+                    args=["-c", script],
                     resources=RESOURCES,
+                    volume_mounts=volume_mounts,
                 )
             ],
+            volumes=volumes,
+            **placement.scheduling(job_name),
         ),
     )
 
     job_spec = client.V1JobSpec(
-        parallelism=n_clients,
-        completions=n_clients,
-        backoff_limit=1000,
+        parallelism=n_local,
+        completions=n_local,
+        # Container restarts count against the job's backoff limit with restartPolicy OnFailure
+        backoff_limit=CLIENT_MAX_RESTARTS * n_local,
         template=pod_template,
     )
 
-    job = client.V1Job(
+    return client.V1Job(
         api_version="batch/v1",
         kind="Job",
-        metadata=client.V1ObjectMeta(name=job_name, namespace=NAMESPACE),
+        metadata=client.V1ObjectMeta(name=job_name, namespace=placement.namespace),
         spec=job_spec,
     )
 
-    batch_v1 = client.BatchV1Api()
-    core_v1 = client.CoreV1Api()
-    batch_v1.create_namespaced_job(namespace=NAMESPACE, body=job)
+def release_barrier(assignments, job_name: str):
+    """
+    Start perf_analyzer in every placement at once by labelling all client pods. Called again on
+    every poll after that, so a pod the Job recreates later is released too.
+    """
+    for placement, _ in assignments:
+        pods = placement.core_v1.list_namespaced_pod(
+            namespace=placement.namespace, label_selector=f"job-name={job_name}").items
+        for pod in pods:
+            if (pod.metadata.labels or {}).get(GO_LABEL) == "true":
+                continue
+            placement.core_v1.patch_namespaced_pod(
+                name=pod.metadata.name, namespace=placement.namespace,
+                body={"metadata": {"labels": {GO_LABEL: "true"}}},
+            )
+
+@instrumented
+def run_client_job(n_clients: int, mode: str, n_servers: int, live_metrics_writer=None, request_count: int = 5000,
+                   payload_dir: str = None, stopping: dict = None, windows_writer=None,
+                   keep_failed_metrics: bool = False, on_start=None):
+    """
+    Run n_clients perf_analyzer pods for one step and return their results. on_start() is called
+    once all clients are Running and released from the barrier, i.e. when the load starts.
+    """
+    job_name = f"{JOB_BASE_NAME}-{str(uuid.uuid4())[:8]}"
+    # The same job name is used in every placement, so pods of a step share one label selector
+    assignments = assign_clients(n_clients)
+    gated = len(assignments) > 1
+    clock_url = runner_clock_url()
+    for placement, n_local in assignments:
+        # Placements without the shared volume (e.g. other clusters) fall back to random inputs
+        use_payload = payload_dir if placement.shared_volume else None
+        if payload_dir and not use_payload:
+            print(f"Placement {placement.name} has no shared volume, using random inputs instead of {payload_dir}")
+        script = client_script(job_name, placement.namespace, n_local, endpoint_url(mode, placement),
+                               request_count, gated, use_payload, stopping, clock_url)
+        job = build_client_job(job_name, placement, n_local, script, mount_shared=bool(use_payload))
+        with KUBE_API_SECONDS.labels("create_job").time():
+            placement.batch_v1.create_namespaced_job(namespace=placement.namespace, body=job)
+        print(f"[Mode={mode}, n_clients={n_clients}] {n_local} clients in placement {placement.name}")
+    # Phase boundaries as observed by polling: job created -> first client Running
+    # (scheduling) -> all clients Running (barrier) -> job finished (perf_analyzer run)
+    job_created = time.time()
+    first_running = None
+    all_running = None
 
     envoy_samples = []
     gpu_samples   = []
     while True:
-        status = batch_v1.read_namespaced_job(name=job_name, namespace=NAMESPACE).status
-        succeeded = status.succeeded or 0
-        failed    = status.failed    or 0
-        if succeeded == n_clients or failed >= n_clients:
+        poll_start = time.perf_counter()
+        succeeded = 0
+        finished  = 0
+        running_clients = 0
+        for placement, n_local in assignments:
+            with KUBE_API_SECONDS.labels("read_job").time():
+                status = placement.batch_v1.read_namespaced_job(name=job_name, namespace=placement.namespace).status
+            succeeded += status.succeeded or 0
+            if (status.succeeded or 0) >= n_local or job_failed(status):
+                finished += 1
+        if finished == len(assignments):
             break
 
-        e_sample = query_envoy_overhead()
-        if e_sample is not None and e_sample != 0:
-            envoy_samples.append(e_sample)
-        g_sample = query_gpu_utilization()
-        if g_sample is not None and g_sample != 0:
-            gpu_samples.append(g_sample)
-        t_sample = query_total_latency()
-
-        if live_metrics_writer:
-            running_clients = count_running_pods(f"job-name={job_name}", NAMESPACE)
-            running_servers = count_running_servers(NAMESPACE)
-            if mode == "supersonic":
-                if (e_sample is not None and g_sample is not None and t_sample is not None 
-                    and running_clients is not None and running_servers is not None):
-                    log_live_metrics(
-                        live_metrics_writer, mode, n_clients, n_servers,
-                        running_clients, running_servers, e_sample, g_sample, t_sample
-                    )
-            else:
-                log_live_metrics(
-                    live_metrics_writer, mode, n_clients, n_servers,
-                    running_clients, running_servers, e_sample, g_sample, t_sample
-                )
+        for placement, _ in assignments:
+            running_clients += count_running_pods(f"job-name={job_name}", placement.namespace, placement.core_v1)
+        if first_running is None and (running_clients > 0 or succeeded > 0):
+            first_running = time.time()
+        if all_running is None and running_clients + succeeded >= n_clients:
+            all_running = time.time()
+            if gated:
+                release_barrier(assignments, job_name)
+            if on_start is not None:
+                on_start()
+        elif all_running is not None and gated:
+            release_barrier(assignments, job_name)
+
+        sample_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_clients,
+                            envoy_samples, gpu_samples)
 
+        POLL_LOOP_SECONDS.observe(time.perf_counter() - poll_start)
+        LAST_POLL_TIMESTAMP.set_to_current_time()
         time.sleep(5)
 
-    if envoy_samples:
-        envoy_overhead_avg = float(np.mean(envoy_samples))
-        envoy_overhead_std = float(np.std(envoy_samples))
-    else:
-        envoy_overhead_avg = None
-        envoy_overhead_std = None
+    job_finished = time.time()
+    first_running = first_running or job_finished
+    all_running = all_running or job_finished
+    record_span("job_scheduling", job_created, first_running)
+    record_span("barrier", first_running, all_running)
+    record_span("perf_analyzer_run", all_running, job_finished)
 
-    if gpu_samples:
-        gpu_util_avg = float(np.mean(gpu_samples))
-        gpu_util_std = float(np.std(gpu_samples))
-    else:
-        gpu_util_avg = None
-        gpu_util_std = None
+    envoy_overhead_avg, envoy_overhead_std = mean_std(envoy_samples)
+    gpu_util_avg, gpu_util_std = mean_std(gpu_samples)
 
     print(f"[Mode={mode}, n_clients={n_clients}] envoy: avg={envoy_overhead_avg}, std={envoy_overhead_std}")
     print(f"[Mode={mode}, n_clients={n_clients}] gpu_util: avg={gpu_util_avg}, std={gpu_util_std}")
 
-    pods = core_v1.list_namespaced_pod(namespace=NAMESPACE, label_selector=f"job-name={job_name}").items
+    logs_start = time.time()
+    pods = []
+    for placement, _ in assignments:
+        with KUBE_API_SECONDS.labels("list_pods").time():
+            items = placement.core_v1.list_namespaced_pod(
+                namespace=placement.namespace, label_selector=f"job-name={job_name}").items
+        pods.extend((placement, pod) for pod in items)
     records = []
-    for pod in pods:
+    for placement, pod in pods:
         pod_name = pod.metadata.name
-        log_text = core_v1.read_namespaced_pod_log(name=pod_name, namespace=NAMESPACE)
-
-        rec = {"n_clients": n_clients, "pod_name": pod_name}
-        for key, pattern in METRIC_PATTERNS.items():
-            m = re.search(pattern, log_text)
-            if m:
-                val_str = m.group(1)
-                rec[key] = float(val_str) if "." in val_str else int(val_str)
-            else:
-                rec[key] = None
+        rec = {"n_clients": n_clients, "pod_name": pod_name, "placement": placement.name}
+        rec["attempts"], exit_code = pod_attempts(pod)
+        try:
+            with LOG_FETCH_SECONDS.time():
+                log_text = placement.core_v1.read_namespaced_pod_log(name=pod_name, namespace=placement.namespace)
+        except client.exceptions.ApiException as e:
+            print(f"Failed to read the log of {pod_name}: {e.reason}")
+            log_text = None
+
+        with LOG_PARSE_SECONDS.time():
+            for key, pattern in METRIC_PATTERNS.items():
+                # The last match is the closing report: verbose "Pass [n]" lines also print latencies
+                matches = re.findall(pattern, log_text or "")
+                if matches:
+                    val_str = matches[-1]
+                    rec[key] = float(val_str) if "." in val_str else int(val_str)
+                else:
+                    rec[key] = None
+            rec.update(parse_cgroup_stats(log_text or ""))
+            rec.update(parse_passes(log_text or ""))
+            if windows_writer is not None:
+                for window in parse_windows(log_text or "", stopping["window_s"] if stopping else None):
+                    windows_writer.writerow({"pod_name": pod_name, "placement": placement.name, **window})
+        rec["client_status"] = client_status(log_text, rec, exit_code) if log_text is not None else "missing"
+        if rec["client_status"] != "ok":
+            CLIENT_FAILURES.labels(rec["client_status"]).inc()
+            # A partial or failed run must not count towards the step's throughput and latency,
+            # unless failures are what the step measures (fault injection)
+            if not keep_failed_metrics:
+                for key in METRIC_PATTERNS:
+                    rec[key] = None
         rec["envoy_overhead_avg"] = envoy_overhead_avg
         rec["envoy_overhead_std"] = envoy_overhead_std
         rec["gpu_util_avg"] = gpu_util_avg
         rec["gpu_util_std"] = gpu_util_std
         records.append(rec)
+    record_span("log_collection", logs_start, time.time())
+    failures = [f"{rec['pod_name']} ({rec['client_status']}, {rec['attempts']} attempts)"
+                for rec in records if rec["client_status"] != "ok"]
+    retried = sum(1 for rec in records if rec["attempts"] > 1)
+    if failures or retried or len(records) < n_clients:
+        print(f"[Mode={mode}, n_clients={n_clients}] {len(records) - len(failures)} of {n_clients} clients usable, "
+              f"{retried} restarted; without a result: {failures or 'none'}")
+    saturated = [rec["pod_name"] for rec in records if rec["client_saturated"]]
+    if saturated:
+        print(f"[Mode={mode}, n_clients={n_clients}] WARNING: {len(saturated)} client(s) CPU-saturated, "
+              f"throughput of this step is bounded by the load generators: {saturated}")
 
-    batch_v1.delete_namespaced_job(
-        name=job_name,
-        namespace=NAMESPACE,
-        body=client.V1DeleteOptions(propagation_policy="Background"),
-    )
+    with span("cleanup"):
+        for placement, _ in assignments:
+            with KUBE_API_SECONDS.labels("delete_job").time():
+                placement.batch_v1.delete_namespaced_job(
+                    name=job_name,
+                    namespace=placement.namespace,
+                    body=client.V1DeleteOptions(propagation_policy="Background"),
+                )
 
     df = pd.DataFrame(records)
     return df[[col for col in COLUMNS if col not in ['mode', 'n_servers']]] 
\ No newline at end of file
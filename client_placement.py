@@ -0,0 +1,86 @@
+# Placement of perf_analyzer client pods across clusters and node pools
+from kubernetes import client, config as k8s_config
+from config import NAMESPACE, CLIENT_PLACEMENTS, CLIENT_TOPOLOGY_KEY, CLIENT_AVOID_SERVER_NODES
+
+class ClientPlacement:
+    """
+    One place client pods can run: a kubeconfig context (None = the runner's own cluster),
+    a namespace and optional node constraints. `weight` sets its share of the clients of a step,
+    `endpoints` overrides the Triton/SuperSONIC endpoint per mode when the default service DNS
+    name is not reachable from that cluster. `shared_volume` tells whether the shared PVC holding
+    payloads can be mounted there (default: only in the runner's own cluster).
+    """
+    def __init__(self, name, context=None, namespace=NAMESPACE, weight=1, node_selector=None,
+                 node_affinity=None, endpoints=None, shared_volume=None):
+        self.name = name
+        self.context = context
+        self.namespace = namespace
+        self.weight = weight
+        self.node_selector = node_selector
+        self.node_affinity = node_affinity or {}
+        self.endpoints = endpoints or {}
+        self.shared_volume = context is None if shared_volume is None else shared_volume
+        api_client = k8s_config.new_client_from_config(context=context) if context else None
+        self.batch_v1 = client.BatchV1Api(api_client)
+        self.core_v1 = client.CoreV1Api(api_client)
+
+    def scheduling(self, job_name: str) -> dict:
+        """V1PodSpec keyword arguments that spread the job's pods and apply the node constraints."""
+        spread = client.V1TopologySpreadConstraint(
+            max_skew=1,
+            topology_key=CLIENT_TOPOLOGY_KEY,
+            when_unsatisfiable="ScheduleAnyway",
+            label_selector=client.V1LabelSelector(match_labels={"job-name": job_name}),
+        )
+        node_affinity = None
+        if self.node_affinity:
+            node_affinity = client.V1NodeAffinity(
+                required_during_scheduling_ignored_during_execution=client.V1NodeSelector(
+                    node_selector_terms=[client.V1NodeSelectorTerm(match_expressions=[
+                        client.V1NodeSelectorRequirement(key=key, operator="In", values=list(values))
+                        for key, values in self.node_affinity.items()
+                    ])]
+                )
+            )
+        pod_anti_affinity = None
+        if CLIENT_AVOID_SERVER_NODES:
+            # Keep load generators off the GPU nodes so they do not steal CPU from Triton
+            pod_anti_affinity = client.V1PodAntiAffinity(
+                preferred_during_scheduling_ignored_during_execution=[client.V1WeightedPodAffinityTerm(
+                    weight=100,
+                    pod_affinity_term=client.V1PodAffinityTerm(
+                        topology_key="kubernetes.io/hostname",
+                        label_selector=client.V1LabelSelector(
+                            match_labels={"app.kubernetes.io/component": "triton"}),
+                    ),
+                )]
+            )
+        return {
+            "node_selector": self.node_selector,
+            "topology_spread_constraints": [spread],
+            "affinity": client.V1Affinity(node_affinity=node_affinity, pod_anti_affinity=pod_anti_affinity),
+        }
+
+# Built on first use, so API clients for remote contexts are only created when needed
+_placements = []
+
+def get_placements():
+    if not _placements:
+        _placements.extend(ClientPlacement(**spec) for spec in CLIENT_PLACEMENTS)
+    return _placements
+
+def split_clients(n_clients: int, weights):
+    """Split n_clients proportionally to weights (largest remainder), e.g. 10 over [1, 1, 1] -> [4, 3, 3]."""
+    total = float(sum(weights))
+    exact = [n_clients * w / total for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in by_remainder[:n_clients - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+def assign_clients(n_clients: int):
+    """[(placement, number of clients)] for a step, skipping placements that get no clients."""
+    placements = get_placements()
+    shares = split_clients(n_clients, [p.weight for p in placements])
+    return [(p, share) for p, share in zip(placements, shares) if share > 0]
@@ -0,0 +1,113 @@
+# Compare benchmark runs step by step and flag statistically significant regressions
+import argparse
+import os
+import sys
+from glob import glob
+import numpy as np
+import pandas as pd
+
+STEP_KEY = ["sequence", "mode", "n_servers", "n_clients"]
+
+# Metric -> +1 if higher is better, -1 if lower is better
+COMPARE_METRICS = {
+    "throughput_ips": +1,
+    "avg_latency_us": -1,
+    "p99_latency_us": -1,
+}
+
+def load_run(run_dir):
+    """All client result rows of a run, one row per perf_analyzer pod, tagged with their sequence."""
+    frames = []
+    for results_csv in sorted(glob(os.path.join(run_dir, "*", "results_rep*.csv"))):
+        df = pd.read_csv(results_csv, usecols=lambda col: col in STEP_KEY + list(COMPARE_METRICS))
+        if df.empty:
+            continue
+        df["sequence"] = os.path.basename(os.path.dirname(results_csv))
+        frames.append(df)
+    if not frames:
+        raise ValueError(f"No results found in {run_dir}")
+    return pd.concat(frames, ignore_index=True)
+
+def bootstrap_relative_delta(base, other, n_boot=2000, alpha=0.05, rng=None):
+    """
+    Relative change of the mean (other vs base) with a percentile bootstrap confidence interval.
+    Resampling is vectorized: one (n_boot, n) index matrix per sample.
+    """
+    rng = rng or np.random.default_rng(0)
+    base_means = base[rng.integers(0, len(base), (n_boot, len(base)))].mean(axis=1)
+    other_means = other[rng.integers(0, len(other), (n_boot, len(other)))].mean(axis=1)
+    deltas = other_means / base_means - 1.0
+    low, high = np.percentile(deltas, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+    return other.mean() / base.mean() - 1.0, low, high
+
+def compare_runs(base_df, other_df, n_boot=2000, alpha=0.05, min_effect=0.0):
+    """
+    One row per (step key, metric) present in both runs. A step is flagged as a regression when
+    the whole confidence interval lies on the bad side of -min_effect (relative change).
+    """
+    rng = np.random.default_rng(0)
+    base_groups = {key: group for key, group in base_df.groupby(STEP_KEY)}
+    rows = []
+    for key, other_group in other_df.groupby(STEP_KEY):
+        if key not in base_groups:
+            continue
+        base_group = base_groups[key]
+        for metric, direction in COMPARE_METRICS.items():
+            base = base_group[metric].dropna().to_numpy(dtype=float)
+            other = other_group[metric].dropna().to_numpy(dtype=float)
+            if len(base) < 2 or len(other) < 2 or base.mean() == 0:
+                continue
+            delta, low, high = bootstrap_relative_delta(base, other, n_boot, alpha, rng)
+            # Express the interval as "improvement", so regressions are always negative
+            worst = min(low * direction, high * direction)
+            best = max(low * direction, high * direction)
+            rows.append(dict(zip(STEP_KEY, key), **{
+                "metric": metric,
+                "base_mean": base.mean(),
+                "other_mean": other.mean(),
+                "rel_delta": delta,
+                "ci_low": low,
+                "ci_high": high,
+                "n_base": len(base),
+                "n_other": len(other),
+                "regression": best < -min_effect,
+                "improvement": worst > min_effect,
+            }))
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark runs against a baseline run")
+    parser.add_argument("base", help="baseline run directory (multiseq_YYYYMMDD_HHMMSS)")
+    parser.add_argument("others", nargs="+", help="run directories to compare against the baseline")
+    parser.add_argument("--n-boot", type=int, default=2000, help="bootstrap resamples")
+    parser.add_argument("--alpha", type=float, default=0.05, help="1 - confidence level")
+    parser.add_argument("--min-effect", type=float, default=0.0,
+                        help="relative change that must be exceeded to flag a regression")
+    parser.add_argument("--output", help="write the full comparison table to this CSV")
+    args = parser.parse_args()
+
+    base_df = load_run(args.base)
+    tables = []
+    for other in args.others:
+        table = compare_runs(base_df, load_run(other), args.n_boot, args.alpha, args.min_effect)
+        if table.empty:
+            print(f"No matching steps between {args.base} and {other}")
+            continue
+        table.insert(0, "run", other)
+        tables.append(table)
+        print(f"\n{other} vs {args.base}:")
+        print(table.drop(columns=["run"]).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+    if not tables:
+        sys.exit(2)
+    result = pd.concat(tables, ignore_index=True)
+    if args.output:
+        result.to_csv(args.output, index=False)
+    regressions = result[result["regression"]]
+    if not regressions.empty:
+        print(f"\n{len(regressions)} significant regression(s):")
+        print(regressions[["run"] + STEP_KEY + ["metric", "rel_delta", "ci_low", "ci_high"]].to_string(index=False))
+        sys.exit(1)
+    print("\nNo significant regressions")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ except Exception:
     k8s_config.load_kube_config()
 
 # Configuration constants and global variables for the benchmark
+import os
 import numpy as np
 from kubernetes import client
 
@@ -15,6 +16,52 @@ BARE_TRITON_SERVICE   = "sonic-interlink-triton"
 DEPLOYMENT_NAME       = "sonic-interlink-triton"
 CONTAINER_IMAGE       = "nvcr.io/nvidia/tritonserver:24.11-py3-sdk"
 CONTAINER_NAME        = "perf-analyzer"
+# Model under test, shared by both client engines (perf_analyzer pods and loadgen.py).
+# Input shapes exclude the batch dimension.
+MODEL_NAME        = "particlenet_AK4_PT"
+MODEL_BATCH_SIZE  = 100
+MODEL_INPUT_DTYPE = "FP32"
+MODEL_INPUTS = {
+    "pf_points__0":   [2, 100],
+    "pf_features__1": [20, 100],
+    "pf_mask__2":     [1, 100],
+    "sv_points__3":   [2, 10],
+    "sv_features__4": [11, 10],
+    "sv_mask__5":     [1, 10],
+}
+# Precomputed request payloads (see payloads.py), selected per step with exp "payload": <name>.
+# Generated once per spec into PAYLOAD_DIR on the shared volume, which client pods mount read-only.
+# A spec is either {"npz": path} with one [n_samples, *shape] array per input, or a distribution:
+# "collections" are zero-padded variable-length axes (particles/vertices of a jet) with their mask.
+PAYLOAD_DIR          = "/work/users/dkondra/sonic-benchmark/payloads"
+SHARED_VOLUME_CLAIM  = "af-shared-storage"
+SHARED_VOLUME_MOUNT  = "/work"
+PAYLOADS = {
+    "jets": {
+        "n_samples": 1024,
+        "seed": 0,
+        "values": {"dist": "normal", "mean": 0.0, "std": 1.0},
+        "collections": {
+            "pf": {"inputs": ["pf_points__0", "pf_features__1", "pf_mask__2"], "mask": "pf_mask__2",
+                   "length": {"dist": "poisson", "mean": 40}},
+            "sv": {"inputs": ["sv_points__3", "sv_features__4", "sv_mask__5"], "mask": "sv_mask__5",
+                   "length": {"dist": "poisson", "mean": 2}},
+        },
+    },
+}
+# Adaptive measurement (exp "stopping": True or a partial dict): clients measure in windows of
+# window_s until the 95% CI of throughput and p99 latency is within rel_ci, at most max_seconds
+STOPPING_DEFAULTS = {"rel_ci": 0.05, "max_seconds": 300, "window_s": 5}
+# In-process client engine (exp "engine": "python", see loadgen.py)
+LOADGEN_CONCURRENCY = 1     # in-flight requests per logical client, like perf_analyzer --concurrency-range
+LOADGEN_TIMEOUT_S   = 60    # per-request deadline
+# Soak steps (exp "soak": True or a partial dict, python engine, see soak.py); duration_s None runs until interrupted
+SOAK_DEFAULTS = {
+    "duration_s": None, "window_s": 60, "rolling_windows": 60,         # rolling summaries over the last hour
+    "rotate_s": 3600, "rotate_bytes": 50_000_000, "keep_files": 48,    # per output stream
+    "drift_min_points": 10, "latency_drift_per_hour": 0.05, "memory_drift_per_hour": 0.02,
+}
+SOAK_HISTORY_POINTS = 168  # rolling means kept for long-term drift (a week of hourly points by default)
 # REQUEST_COUNT is now set per-job in the experiment sequence config (default 5000 if not specified)
 SERVICE_ACCOUNT_NAME  = "hub"   # must have 'list pods' permission
 
@@ -23,9 +70,74 @@ RESOURCES = client.V1ResourceRequirements(
     limits={"cpu": "1", "memory": "4G"},
 )
 
+# Where perf_analyzer client pods run. Each step's clients are split across placements by weight;
+# "context" is a kubeconfig context (None = this cluster), "endpoints" optionally overrides the
+# server address per mode, "node_selector"/"node_affinity" ({label: [values]}) pin node pools,
+# "shared_volume" says whether SHARED_VOLUME_CLAIM can be mounted there (default: local cluster only).
+CLIENT_PLACEMENTS = [
+    {"name": "local", "context": None, "namespace": NAMESPACE, "weight": 1},
+]
+CLIENT_TOPOLOGY_KEY       = "kubernetes.io/hostname"  # client pods of a step are spread over this topology
+CLIENT_AVOID_SERVER_NODES = True                      # prefer nodes not running Triton
+
+# A client pod counts as saturated (its own CPU limit, not the server, bounds its throughput) when
+# it was throttled in more than this fraction of CFS periods, or used this fraction of its CPU limit
+CLIENT_THROTTLE_THRESHOLD = 0.05
+CLIENT_CPU_SATURATION     = 0.9
+
+# Client failure accounting: a client pod counts only if perf_analyzer printed a complete summary and
+# exited cleanly. Steps where fewer than MIN_CLIENT_COVERAGE of the clients did are run again.
+CLIENT_MAX_RESTARTS    = 3      # container restarts per client pod before its job gives up
+CLIENT_REQUIRED_FIELDS = ["throughput_ips", "avg_latency_us", "p99_latency_us"]
+CLIENT_ERROR_PATTERN   = r"(?i)\berror\b|failed to|Thread \[\d+\] had error"
+MIN_CLIENT_COVERAGE    = 0.9
+STEP_MAX_ATTEMPTS      = 3
+
 POLL_INTERVAL_SECONDS = 5
+
+# Servers count as ready once Triton reports the model ready on :8000/v2/models/<MODEL_NAME>/ready.
+# Readiness is polled with exponential backoff, restarting from the initial delay on progress.
+TRITON_HTTP_PORT      = 8000
+TRITON_GRPC_PORT      = 8001  # per-pod inference statistics of the loadgen engine
+READY_BACKOFF_INITIAL = 0.25  # seconds
+READY_BACKOFF_MAX     = 2.0
+READY_PROBE_TIMEOUT   = 2.0
+READY_TIMEOUT_SECONDS = 1800  # give up waiting for servers after this long
+
+# KEDA replica bounds in supersonic mode, and what autoscaler.py judges the autoscaler against
+SUPERSONIC_MIN_REPLICAS       = 1
+SUPERSONIC_MAX_REPLICAS       = 10
+AUTOSCALER_SLO_MS             = 100   # latency objective: client p99, or envoy total_latency in the live series
+AUTOSCALER_CLIENTS_PER_SERVER = None  # clients a server serves within the SLO; None: estimated from bare_triton steps
+AUTOSCALER_TARGET_UTIL        = 0.8   # oracle without a known capacity: servers needed to run the GPU work at this utilization
+
+# Fault injection during steps (exp "faults", see faults.py). proxy_delay sets the runtime keys of
+# Envoy's HTTP fault filter through its admin port, so the filter must be in the proxy's config.
+ENVOY_SELECTOR         = "app.kubernetes.io/component=envoy"
+ENVOY_ADMIN_PORT       = 9901
+FAULT_POLL_SECONDS     = 1     # how often recovery is checked after servers are killed or drained
+FAULT_RECOVERY_TIMEOUT = 900   # a fault that has not recovered after this long is recorded as unrecovered
 PROMETHEUS_URL = "https://prometheus-af.geddes.rcac.purdue.edu/api/v1/query"
 
+# Where GPU utilization comes from: "prometheus" (30s avg_over_time) or "triton" (direct scrape of :8002/metrics)
+METRICS_SOURCE            = "prometheus"
+TRITON_METRICS_PORT       = 8002
+TRITON_SCRAPE_INTERVAL    = 0.5   # seconds between direct scrapes
+TRITON_DISCOVERY_INTERVAL = 10    # seconds between listings of the Triton pods to scrape
+
+# Live dashboard served by the runner (see dashboard.py)
+DASHBOARD_PORT        = 8050
+DASHBOARD_HISTORY     = 2000  # live samples kept in memory
+HARNESS_METRICS_PORT  = 9108  # /metrics endpoint describing the harness itself
+
+# Time-series plots of long runs (see downsample.py)
+PLOT_MAX_POINTS = 4000     # points per series after min/max decimation
+CSV_CHUNK_ROWS  = 100000   # rows of a live-metrics CSV held in memory at once
+
+# Client clocks are synchronised against the dashboard's /time endpoint before and after every run
+CLOCK_SYNC_SAMPLES = 8     # request/response exchanges; the one with the smallest round trip is used
+CLOCK_SYNC_URL     = None  # defaults to the runner pod (POD_IP), set for placements that cannot reach it
+
 METRIC_PATTERNS = {
     "batch_size":             r"Batch size:\s+(\d+)",
     "throughput_ips":         r"Throughput:\s+([\d.]+)\s+infer/sec",
@@ -42,17 +154,63 @@ METRIC_PATTERNS = {
     "compute_output_us":      r"compute output\s+(\d+)\s+usec",
 }
 
+RESULTS_ROOT  = "/work/users/dkondra/sonic-benchmark/results"
+CATALOG_DB    = os.path.join(RESULTS_ROOT, "catalog.sqlite")  # index of all runs (see catalog.py)
+RUN_INFO_JSON = "run_info.json"  # per-run metadata: git revision, images, sequences
+
+# Runner/deployer pods (see runner_job.py): a prebuilt image from the Dockerfile skips all installs,
+# otherwise a virtualenv cached on the shared volume is built once per requirements.txt revision
+RUNNER_IMAGE     = "python:3.9-slim"
+RUNNER_VENV_ROOT = "/work/users/dkondra/sonic-benchmark/runner-env"
+
 OUTPUT_CSV = "sonic_benchmark_results.csv"
 LIVE_METRICS_CSV = "sonic_benchmark_live_metrics.csv"
 
 COLUMNS = [
-    'n_clients', 'pod_name', 'batch_size', 'throughput_ips', 'avg_latency_us', 'p50_latency_us', 'p90_latency_us',
+    'n_clients', 'pod_name', 'placement', 'batch_size', 'throughput_ips', 'avg_latency_us', 'p50_latency_us', 'p90_latency_us',
     'p95_latency_us', 'p99_latency_us', 'avg_request_latency_us', 'overhead_us', 'queue_us', 'compute_input_us',
     'compute_infer_us', 'compute_output_us', 'envoy_overhead_avg', 'envoy_overhead_std', 'gpu_util_avg',
-    'gpu_util_std', 'mode', 'n_servers'
+    'gpu_util_std', 'cpu_usage_cores', 'cpu_throttled_ratio', 'cpu_throttled_s', 'memory_peak_bytes',
+    'client_saturated', 'n_trials', 'throughput_ci_rel', 'p99_ci_rel', 'attempts', 'client_status', 'mode', 'n_servers'
 ]
 
 LIVE_METRICS_COLUMNS = [
     "timestamp", "running_clients", "running_servers",
-    "envoy_overhead", "gpu_util", "total_latency"
-] 
\ No newline at end of file
+    "envoy_overhead", "gpu_util", "total_latency", "failure_rate", "active_faults"
+]
+
+# Direct Triton scrapes, written per repetition when METRICS_SOURCE == "triton"
+TRITON_METRICS_COLUMNS = [
+    "timestamp", "n_targets", "interval_s", "request_rate", "failure_rate", "inference_rate",
+    "request_us", "queue_us", "compute_input_us", "compute_infer_us", "compute_output_us", "gpu_util"
+]
+
+# Step boundaries, written per repetition so live samples can be attributed to steps
+STEP_COLUMNS = [
+    "step", "mode", "n_clients", "n_servers", "request_count", "start", "end", "attempts", "client_coverage"
+]
+
+# Client measurement windows on the runner's clock, written per repetition (see timeline.py)
+WINDOW_COLUMNS = [
+    "pod_name", "placement", "window", "start", "end", "throughput_ips", "latency_us", "latency_stat",
+    "clock_offset_s", "clock_rtt_s"
+]
+
+# Rolling summaries of a soak step, one row per window (see soak.py)
+SOAK_SUMMARY_COLUMNS = [
+    "end", "windows", "throughput_ips", "p99_latency_us", "gpu_util", "gpu_memory_bytes", "cpu_memory_bytes",
+    "latency_drift_per_hour", "memory_drift_per_hour", "long_latency_drift_per_hour", "long_memory_drift_per_hour",
+    "latency_drift", "memory_drift"
+]
+
+# Injected faults, written per repetition (see faults.py)
+FAULT_COLUMNS = [
+    "step", "attempt", "fault", "action", "params", "target", "applied", "reverted", "recovered", "recovery_s"
+]
+
+# Phase spans of every step, written once per run (see tracing.py)
+TIMINGS_CSV = "timings.csv"
+TIMING_COLUMNS = [
+    "sequence", "repetition", "step", "mode", "n_servers", "n_clients", "request_count",
+    "phase", "start", "end", "duration_s"
+]
@@ -0,0 +1,147 @@
+# Lightweight live view of a running benchmark, served over HTTP from the runner
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import DASHBOARD_PORT, DASHBOARD_HISTORY, LIVE_METRICS_COLUMNS
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<title>SONIC benchmark</title>
+<style>
+  body { font-family: sans-serif; margin: 20px; }
+  canvas { border: 1px solid #ccc; margin: 4px 0; display: block; }
+  .label { font-weight: bold; margin-top: 8px; }
+</style>
+</head>
+<body>
+<h3>SONIC benchmark &mdash; live</h3>
+<div id="step"></div>
+<div id="panels"></div>
+<script>
+const SERIES = [
+  ["running_clients", "Perf. Analyzer Clients", 1, "#1f77b4"],
+  ["running_servers", "Triton Inference Servers", 1, "#ff7f0e"],
+  ["total_latency", "Total Latency, ms", 1, "#2ca02c"],
+  ["gpu_util", "Avg. GPU utilization, %", 100, "#9467bd"],
+  ["failure_rate", "Failed requests/s", 1, "#d62728"],
+];
+const panels = document.getElementById("panels");
+for (const [key, label] of SERIES) {
+  panels.insertAdjacentHTML("beforeend",
+    `<div class="label" id="label-${key}">${label}</div><canvas id="c-${key}" width="900" height="120"></canvas>`);
+}
+function draw(key, values, color) {
+  const canvas = document.getElementById("c-" + key);
+  const ctx = canvas.getContext("2d");
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  const ys = values.filter(v => v !== null);
+  if (!ys.length) return;
+  const ymax = Math.max(...ys) * 1.2 || 1;
+  ctx.strokeStyle = color;
+  ctx.lineWidth = 2;
+  ctx.beginPath();
+  values.forEach((v, i) => {
+    if (v === null) return;
+    const x = values.length > 1 ? i * canvas.width / (values.length - 1) : 0;
+    const y = canvas.height - v / ymax * canvas.height;
+    i === 0 ? ctx.moveTo(x, y) : ctx.lineTo(x, y);
+  });
+  ctx.stroke();
+}
+async function refresh() {
+  const data = await (await fetch("data")).json();
+  document.getElementById("step").textContent = JSON.stringify(data.step);
+  for (const [key, label, scale, color] of SERIES) {
+    const values = data.samples.map(s => s[key] === null || s[key] === "" ? null : s[key] * scale);
+    const last = values.length ? values[values.length - 1] : null;
+    document.getElementById("label-" + key).textContent = `${label}: ${last === null ? "-" : last.toFixed(2)}`;
+    draw(key, values, color);
+  }
+}
+refresh();
+setInterval(refresh, 2000);
+</script>
+</body>
+</html>
+"""
+
+class DashboardWriter:
+    """Drop-in replacement for the live-metrics csv.DictWriter that also feeds the dashboard."""
+    def __init__(self, writer, dashboard):
+        self.writer = writer
+        self.dashboard = dashboard
+
+    def writeheader(self):
+        self.writer.writeheader()
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+        self.dashboard.record(row)
+
+class LiveDashboard:
+    """
+    Keeps the most recent live-metrics samples in a ring buffer and serves them at
+    http://<runner>:<port>/ (HTML page) and /data (JSON). Memory use is bounded by `history`.
+    """
+    def __init__(self, port: int = DASHBOARD_PORT, history: int = DASHBOARD_HISTORY):
+        self.port = port
+        self.samples = deque(maxlen=history)
+        self.step = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def record(self, row):
+        sample = {col: row.get(col) for col in LIVE_METRICS_COLUMNS}
+        with self.lock:
+            self.samples.append(sample)
+
+    def set_step(self, **info):
+        with self.lock:
+            self.step = dict(info, started=datetime.utcnow().isoformat())
+
+    def wrap(self, writer):
+        return DashboardWriter(writer, self)
+
+    def snapshot(self):
+        with self.lock:
+            return {"step": self.step, "samples": list(self.samples)}
+
+    def start(self):
+        dashboard = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/data":
+                    body = json.dumps(dashboard.snapshot(), default=str).encode()
+                    content_type = "application/json"
+                elif self.path == "/":
+                    body = PAGE.encode()
+                    content_type = "text/html"
+                elif self.path == "/time":
+                    # Reference clock of the client pods (see client_job.clock_sync_script)
+                    body = f"{time.time():.6f}".encode()
+                    content_type = "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Live dashboard available at http://localhost:{self.port}/")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
@@ -2,8 +2,12 @@
 
 import os
 import sys
+import json
+import shlex
+import shutil
+import hashlib
+import argparse
 import subprocess
-from datetime import datetime
 
 # Constants
 POD_NAME = "purdue-af-1"  # Replace with your pod name
@@ -11,6 +15,143 @@ NAMESPACE = "cms"
 RESULTS_BASE = "/work/users/dkondra/sonic-benchmark/results"
 # SPECIFIC_RESULTS_DIR = "/work/users/dkondra/sonic-benchmark/results/multiseq_20250611_143922"
 SPECIFIC_RESULTS_DIR = "/work/users/dkondra/sonic-benchmark/results/multiseq_20250612_132332"
+LOCAL_RESULTS_DIR = "results"
+MANIFEST_NAME = ".sync_manifest.json"
+BATCH_BYTES = 256 * 1024 * 1024  # files per transfer are grouped up to this size; a batch is the unit of resume
+
+# Remote compressor (appended to the remote tar) and the matching local tar flags
+COMPRESSION = {
+    "zstd": ("| zstd -c -T0 -3", ["--zstd"]),
+    "gzip": ("| gzip -c -1", ["-z"]),
+    "none": ("", []),
+}
+
+def kubectl_exec(pod, namespace, command):
+    return ["kubectl", "exec", "-i", pod, "-n", namespace, "--", "sh", "-c", command]
+
+def available_compression(pod, namespace, preferred):
+    """
+    preferred if its compressor exists both in the pod and locally, else the next one in
+    COMPRESSION that does ("none" always does).
+    """
+    candidates = list(COMPRESSION)[list(COMPRESSION).index(preferred):]
+    tools = [name for name in candidates if name != "none"]
+    cmd = " ; ".join(f"command -v {name} >/dev/null 2>&1 && echo {name}" for name in tools) + " ; true"
+    out = subprocess.run(kubectl_exec(pod, namespace, cmd), check=True, capture_output=True, text=True).stdout
+    remote_tools = set(out.split())
+    for name in candidates:
+        if name == "none" or (name in remote_tools and shutil.which(name)):
+            if name != preferred:
+                print(f"{preferred} is not available in {pod} or locally, transferring with compression={name}")
+            return name
+
+def remote_manifest(pod, namespace, remote_dir):
+    """{relative path: (size, mtime)} of every file under remote_dir in the pod."""
+    cmd = f"find {shlex.quote(remote_dir)} -type f -printf '%P\\t%s\\t%T@\\n'"
+    out = subprocess.run(kubectl_exec(pod, namespace, cmd), check=True, capture_output=True, text=True).stdout
+    manifest = {}
+    for line in out.splitlines():
+        path, size, mtime = line.rsplit("\t", 2)
+        manifest[path] = (int(size), float(mtime))
+    return manifest
+
+def remote_checksums(pod, namespace, remote_dir, paths):
+    """sha256 of the given files, computed in the pod; the file list is streamed over stdin."""
+    cmd = f"cd {shlex.quote(remote_dir)} && tr '\\n' '\\0' | xargs -0 sha256sum --"
+    out = subprocess.run(
+        kubectl_exec(pod, namespace, cmd), input="\n".join(paths), check=True, capture_output=True, text=True,
+    ).stdout
+    checksums = {}
+    for line in out.splitlines():
+        digest, path = line.split("  ", 1)
+        checksums[path] = digest
+    return checksums
+
+def local_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(local_dir):
+    path = os.path.join(local_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(local_dir, manifest):
+    # Written atomically, so an interrupted sync never leaves a corrupt manifest behind
+    path = os.path.join(local_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+def batches(paths, sizes, limit=BATCH_BYTES):
+    batch, total = [], 0
+    for path in paths:
+        if batch and total + sizes[path] > limit:
+            yield batch
+            batch, total = [], 0
+        batch.append(path)
+        total += sizes[path]
+    if batch:
+        yield batch
+
+def stream_files(pod, namespace, remote_dir, paths, local_dir, compression):
+    """Pipe `tar | compressor` from the pod straight into a local `tar x`; nothing is staged on disk."""
+    remote_compress, local_flags = COMPRESSION[compression]
+    cmd = f"cd {shlex.quote(remote_dir)} && tar cf - --verbatim-files-from -T - {remote_compress}"
+    sender = subprocess.Popen(kubectl_exec(pod, namespace, cmd), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    receiver = subprocess.Popen(["tar", "xf", "-", *local_flags, "-C", local_dir], stdin=sender.stdout)
+    sender.stdout.close()  # so the sender gets SIGPIPE if tar x exits early
+    sender.stdin.write("\n".join(paths).encode() + b"\n")
+    sender.stdin.close()
+    if receiver.wait() != 0 or sender.wait() != 0:
+        raise subprocess.CalledProcessError(sender.returncode or receiver.returncode, cmd)
+
+def sync_results(remote_dir=RESULTS_BASE, local_dir=LOCAL_RESULTS_DIR, pod=POD_NAME, namespace=NAMESPACE,
+                 compression="zstd", batch_bytes=BATCH_BYTES):
+    """
+    Bring local_dir up to date with remote_dir in the pod, transferring only new or changed files.
+    Files are compared by size and mtime against the local manifest, verified by sha256 after
+    transfer, and the manifest is saved after every batch so an interrupted sync resumes where it stopped.
+    Falls back from the requested compression when its tool is missing (see available_compression).
+    """
+    os.makedirs(local_dir, exist_ok=True)
+    compression = available_compression(pod, namespace, compression)
+    manifest = load_manifest(local_dir)
+    remote = remote_manifest(pod, namespace, remote_dir)
+    pending = sorted(
+        path for path, (size, mtime) in remote.items()
+        if path != MANIFEST_NAME and (
+            manifest.get(path, {}).get("size") != size
+            or manifest.get(path, {}).get("mtime") != mtime
+            or not os.path.exists(os.path.join(local_dir, path))
+        )
+    )
+    sizes = {path: remote[path][0] for path in pending}
+    total_bytes = sum(sizes.values())
+    print(f"{len(pending)} of {len(remote)} files to transfer ({total_bytes / 1e6:.1f} MB before compression)")
+
+    done_bytes = 0
+    for batch in batches(pending, sizes, batch_bytes):
+        checksums = remote_checksums(pod, namespace, remote_dir, batch)
+        stream_files(pod, namespace, remote_dir, batch, local_dir, compression)
+        for path in batch:
+            local_path = os.path.join(local_dir, path)
+            if local_checksum(local_path) != checksums.get(path):
+                # The file changed while it was being sent (e.g. a live CSV); it is picked up next sync
+                print(f"Checksum mismatch for {path}, will retry on the next sync")
+                continue
+            size, mtime = remote[path]
+            manifest[path] = {"size": size, "mtime": mtime, "sha256": checksums[path]}
+        save_manifest(local_dir, manifest)
+        done_bytes += sum(sizes[path] for path in batch)
+        print(f"  {done_bytes / 1e6:.1f} / {total_bytes / 1e6:.1f} MB")
+
+    print(f"Results in {remote_dir} synced to {local_dir}")
 
 def download_results():
     """
@@ -27,45 +168,31 @@ def download_results():
     except subprocess.CalledProcessError:
         print(f"Error: Pod {POD_NAME} not found in namespace {NAMESPACE}")
         sys.exit(1)
-    
-    # Create local results directory if it doesn't exist
-    local_results_dir = "results"
-    os.makedirs(local_results_dir, exist_ok=True)
-    
-    # Get the timestamp from the results directory
-    results_dir = SPECIFIC_RESULTS_DIR
-    timestamp = os.path.basename(results_dir)
-    local_dir = os.path.join(local_results_dir, timestamp)
-    
-    print(f"Downloading results from {results_dir} to {local_dir}")
-    
-    # Create a tar archive of the results directory in the pod
+
+    local_dir = os.path.join(LOCAL_RESULTS_DIR, os.path.basename(SPECIFIC_RESULTS_DIR))
+    print(f"Downloading results from {SPECIFIC_RESULTS_DIR} to {local_dir}")
     try:
-        subprocess.run(
-            ["kubectl", "exec", POD_NAME, "-n", NAMESPACE, "--", "tar", "czf", "-", "-C", os.path.dirname(results_dir), os.path.basename(results_dir)],
-            stdout=open(os.path.join(local_dir + ".tar.gz"), "wb"),
-            check=True
-        )
+        sync_results(SPECIFIC_RESULTS_DIR, local_dir)
     except subprocess.CalledProcessError as e:
-        print(f"Error creating tar archive: {e}")
+        print(f"Error transferring results: {e}")
         sys.exit(1)
-    
-    # Extract the archive locally
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally sync benchmark results from a pod")
+    parser.add_argument("--pod", default=POD_NAME)
+    parser.add_argument("--namespace", default=NAMESPACE)
+    parser.add_argument("--remote", default=RESULTS_BASE, help="directory in the pod to mirror")
+    parser.add_argument("--local", default=LOCAL_RESULTS_DIR, help="local destination directory")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION), default="zstd")
+    parser.add_argument("--batch-mb", type=int, default=BATCH_BYTES // (1024 * 1024),
+                        help="transfer size between manifest checkpoints")
+    args = parser.parse_args()
     try:
-        subprocess.run(
-            ["tar", "xzf", os.path.join(local_dir + ".tar.gz"), "-C", local_results_dir],
-            check=True
-        )
+        sync_results(args.remote, args.local, args.pod, args.namespace, args.compression,
+                     args.batch_mb * 1024 * 1024)
     except subprocess.CalledProcessError as e:
-        print(f"Error extracting archive: {e}")
+        print(f"Error syncing results: {e}")
         sys.exit(1)
-    
-    # Clean up the tar file
-    os.remove(os.path.join(local_dir + ".tar.gz"))
-    
-    print(f"Results downloaded to {local_dir}")
-    print(f"Contents:")
-    subprocess.run(["ls", "-R", local_dir])
 
 if __name__ == "__main__":
-    download_results() 
\ No newline at end of file
+    main()
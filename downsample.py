@@ -0,0 +1,155 @@
+# Constant-memory reading and min/max decimation of long time series (live metrics of soak runs)
+import csv
+import json
+import os
+import numpy as np
+import pandas as pd
+from config import PLOT_MAX_POINTS, CSV_CHUNK_ROWS
+
+class MinMaxDecimator:
+    """
+    Online min/max decimation of one series into at most max_buckets time buckets. Every bucket
+    keeps its smallest and largest sample with their times, so spikes survive any reduction and
+    the extremes of the series stay exact. A sample beyond the last bucket doubles the bucket
+    width, merging neighbouring buckets, so memory does not depend on the length of the series.
+    """
+    def __init__(self, max_buckets: int = PLOT_MAX_POINTS // 2, width: float = 1.0, t0: float = None,
+                 buckets: dict = None):
+        self.max_buckets = max_buckets
+        self.width = width
+        self.t0 = t0
+        self.buckets = buckets or {}  # index -> [t_min, v_min, t_max, v_max]
+
+    def _merge(self, buckets, i, bucket):
+        current = buckets.get(i)
+        if current is None:
+            buckets[i] = list(bucket)
+            return
+        if bucket[1] < current[1]:
+            current[0], current[1] = bucket[0], bucket[1]
+        if bucket[3] > current[3]:
+            current[2], current[3] = bucket[2], bucket[3]
+
+    def _coarsen(self):
+        self.width *= 2
+        merged = {}
+        for i, bucket in self.buckets.items():
+            self._merge(merged, i // 2, bucket)
+        self.buckets = merged
+
+    def add(self, times, values):
+        """Add a chunk of samples (times in epoch seconds); NaNs are skipped."""
+        times, values = np.asarray(times, dtype=float), np.asarray(values, dtype=float)
+        keep = ~np.isnan(times) & ~np.isnan(values)
+        times, values = times[keep], values[keep]
+        if not len(times):
+            return
+        if self.t0 is None:
+            self.t0 = float(times.min())
+        while (times.max() - self.t0) / self.width >= self.max_buckets:
+            self._coarsen()
+        # Samples older than the first one (out of order rows) fall into the first bucket
+        chunk = pd.DataFrame({"i": np.maximum((times - self.t0) // self.width, 0).astype(int),
+                              "t": times, "v": values})
+        grouped = chunk.groupby("i")["v"]
+        lows, highs = chunk.loc[grouped.idxmin()], chunk.loc[grouped.idxmax()]
+        for i, t_min, v_min, t_max, v_max in zip(lows["i"], lows["t"], lows["v"], highs["t"], highs["v"]):
+            self._merge(self.buckets, int(i), (float(t_min), float(v_min), float(t_max), float(v_max)))
+
+    def points(self):
+        """(times as datetime64, values) of the decimated series in time order, at most 2 * max_buckets points."""
+        times, values = [], []
+        for i in sorted(self.buckets):
+            t_min, v_min, t_max, v_max = self.buckets[i]
+            for t, v in sorted({(t_min, v_min), (t_max, v_max)}):
+                times.append(t)
+                values.append(v)
+        return pd.to_datetime(np.array(times), unit="s").to_numpy(), np.array(values)
+
+    def max(self) -> float:
+        return max((bucket[3] for bucket in self.buckets.values()), default=None)
+
+    def state(self) -> dict:
+        return {"max_buckets": self.max_buckets, "width": self.width, "t0": self.t0,
+                "buckets": [[i, *bucket] for i, bucket in self.buckets.items()]}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        return cls(state["max_buckets"], state["width"], state["t0"],
+                   {int(row[0]): list(row[1:]) for row in state["buckets"]})
+
+class _ByteRange:
+    """Read-only view of a binary file up to byte `end`, for pandas to parse."""
+    def __init__(self, f, end: int):
+        self.f = f
+        self.end = end
+
+    def read(self, size: int = -1) -> bytes:
+        left = self.end - self.f.tell()
+        if left <= 0:
+            return b""
+        return self.f.read(left if size is None or size < 0 else min(size, left))
+
+def complete_rows_end(path) -> int:
+    """Byte offset just past the last complete line of a file that may still be written to."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return pos - step + newline + 1
+            pos -= step
+    return 0
+
+def read_csv_chunks(path, usecols=None, start: int = 0, end: int = None, chunk_rows: int = CSV_CHUNK_ROWS):
+    """
+    DataFrames of at most chunk_rows rows of a CSV, from byte offset `start` (0: the first row
+    after the header) to `end` (default: the last complete row), so only one chunk is in memory.
+    """
+    end = complete_rows_end(path) if end is None else end
+    with open(path, "rb") as f:
+        header = f.readline()
+        names = next(csv.reader([header.decode()]))
+        f.seek(max(start, len(header)))
+        if f.tell() >= end:
+            return
+        yield from pd.read_csv(_ByteRange(f, end), names=names, header=None, usecols=usecols, chunksize=chunk_rows)
+
+def decimated_series(path, columns, cache_path: str = None, max_points: int = PLOT_MAX_POINTS, scale: dict = None):
+    """
+    {column: MinMaxDecimator} of a CSV with a timestamp column, read in chunks. With a cache_path,
+    the decimators and the offset read up to are stored there, and a later call only reads the
+    rows appended since: re-plotting a growing soak run costs the new samples, not the whole file.
+    scale multiplies columns (e.g. {"gpu_util": 100}) before decimation.
+    """
+    scale = scale or {}
+    state = None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            state = json.load(f)
+        # Other settings, or a truncated or replaced file, are read again from the start
+        if (state.get("max_points") != max_points or state.get("scale") != scale
+                or set(state["series"]) != set(columns) or state["offset"] > os.path.getsize(path)):
+            state = None
+    if state is None:
+        decimators = {col: MinMaxDecimator(max_points // 2) for col in columns}
+        offset = 0
+    else:
+        decimators = {col: MinMaxDecimator.from_state(state["series"][col]) for col in columns}
+        offset = state["offset"]
+    end = complete_rows_end(path)
+    for chunk in read_csv_chunks(path, usecols=lambda col: col == "timestamp" or col in columns, start=offset, end=end):
+        seconds = (pd.to_datetime(chunk["timestamp"]) - pd.Timestamp(0)).dt.total_seconds()
+        for col in columns:
+            if col in chunk.columns:
+                values = pd.to_numeric(chunk[col], errors="coerce") * scale.get(col, 1)
+                decimators[col].add(seconds, values)
+    if cache_path:
+        with open(cache_path, "w") as f:
+            json.dump({"source": path, "offset": max(end, offset), "max_points": max_points,
+                       "scale": scale, "series": {col: d.state() for col, d in decimators.items()}}, f)
+    return decimators
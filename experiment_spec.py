@@ -0,0 +1,333 @@
+# Declarative experiment specs (YAML/TOML): templating, validation and a dry-run planner
+import argparse
+import itertools
+import os
+import re
+from glob import glob
+import pandas as pd
+import yaml
+from config import RESULTS_ROOT, TIMINGS_CSV, PAYLOADS
+from stopping import stopping_config
+from faults import fault_config
+from soak import soak_config
+from step_order import step_reset
+
+MODES = ("supersonic", "bare_triton")
+ENGINES = ("perf_analyzer", "python")
+
+# Step key -> (accepted types, required)
+STEP_FIELDS = {
+    "mode":            (str, True),
+    "n_clients":       (int, True),
+    "n_servers":       (int, True),
+    "request_count":   (int, False),
+    "restart_servers": (bool, False),
+    "cold_start":      (bool, False),
+    "engine":          (str, False),
+    "concurrency":     (int, False),
+    "rate":            ((int, float), False),
+    "payload":         (str, False),
+    "stopping":        ((bool, dict), False),
+    "faults":          (list, False),
+    "soak":            ((bool, dict), False),
+}
+# List-valued step keys: a list of such lists expands like any other list, a single one does not
+LIST_FIELDS = {"faults"}
+SEQUENCE_FIELDS = {"name", "matrix", "defaults", "steps", "reorder"}
+SPEC_FIELDS = {"repetitions", "start", "defaults", "sequences", "reorder_sequences", "optimize_order"}
+
+RANGE = re.compile(r"^range\(\s*(-?\d+)\s*(?:,\s*(-?\d+)\s*)?(?:,\s*(-?\d+)\s*)?\)$")
+
+# Phase durations used when no run has been traced yet (seconds)
+FALLBACK_PHASE_SECONDS = {
+    "service_recreate": 5.0,
+    "scale_down": 60.0,
+    "scale_up_cold": 120.0,
+    "scale_up_warm": 5.0,
+    "job_scheduling": 30.0,
+    "barrier": 10.0,
+    "log_collection": 5.0,
+    "cleanup": 1.0,
+}
+FALLBACK_SECONDS_PER_REQUEST = 0.01
+
+def resolve_spec(path: str) -> str:
+    """Spec files are flattened next to the code when shipped to a runner pod (see runner_job.py)."""
+    if os.path.exists(path):
+        return path
+    shipped = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.basename(path))
+    return shipped if os.path.exists(shipped) else path
+
+def load_spec(path: str) -> dict:
+    """Read a .yaml/.yml or .toml experiment spec."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".yaml", ".yml"):
+        with open(path) as f:
+            spec = yaml.safe_load(f)
+    elif ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        raise ValueError(f"Unsupported spec format {ext!r}, expected .yaml, .yml or .toml")
+    if not isinstance(spec, dict):
+        raise ValueError(f"{path}: a spec must be a mapping")
+    return spec
+
+def expand_value(value, where: str):
+    """Values a templated field takes: "range(a, b[, step])" and lists expand, scalars stay single."""
+    if isinstance(value, str):
+        m = RANGE.match(value.strip())
+        if m:
+            args = [int(x) for x in m.groups() if x is not None]
+            values = list(range(*args))
+            if not values:
+                raise ValueError(f"{where}: {value} is empty")
+            return values
+    if isinstance(value, list):
+        if not value:
+            raise ValueError(f"{where}: empty list")
+        return value
+    return [value]
+
+def validate_step(step: dict, where: str, optimize_order: bool = False):
+    unknown = set(step) - set(STEP_FIELDS)
+    if unknown:
+        raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+    for key, (types, required) in STEP_FIELDS.items():
+        if key not in step:
+            if required:
+                raise ValueError(f"{where}: missing {key!r}")
+            continue
+        value = step[key]
+        # bool is an int subclass, but True is not a valid client count
+        if not isinstance(value, types) or (isinstance(value, bool) and types in (int, (int, float))):
+            raise ValueError(f"{where}.{key}: expected {getattr(types, '__name__', types)}, got {value!r}")
+    if step["mode"] not in MODES:
+        raise ValueError(f"{where}.mode: expected one of {MODES}, got {step['mode']!r}")
+    if step.get("engine", "perf_analyzer") not in ENGINES:
+        raise ValueError(f"{where}.engine: expected one of {ENGINES}, got {step['engine']!r}")
+    for key in ("n_clients", "n_servers", "request_count", "concurrency"):
+        if key in step and step[key] < 1:
+            raise ValueError(f"{where}.{key}: must be at least 1, got {step[key]}")
+    if "payload" in step and step["payload"] not in PAYLOADS:
+        raise ValueError(f"{where}.payload: unknown payload {step['payload']!r}, expected one of {sorted(PAYLOADS)}")
+    try:
+        stopping_config(step.get("stopping"))
+    except ValueError as e:
+        raise ValueError(f"{where}.stopping: {e}")
+    try:
+        soak = soak_config(step.get("soak"))
+    except ValueError as e:
+        raise ValueError(f"{where}.soak: {e}")
+    if soak and step.get("engine", "perf_analyzer") != "python":
+        raise ValueError(f"{where}.soak: soak steps keep their load running from the runner, set engine: python")
+    if soak and step.get("stopping"):
+        raise ValueError(f"{where}: soak and stopping cannot be combined")
+    for i, fault in enumerate(step.get("faults", [])):
+        try:
+            fault_config(fault)
+        except ValueError as e:
+            raise ValueError(f"{where}.faults[{i}]: {e}")
+    if optimize_order and step.get("restart_servers") is True:
+        # The optimized order only resets servers before cold_start steps (see step_order.step_reset)
+        raise ValueError(f"{where}.restart_servers: not honoured with optimize_order, set cold_start: true instead")
+
+def expand_steps(template: dict, where: str):
+    """One step per combination of the list/range-valued keys of a step template, in declaration order."""
+    keys = list(template)
+    choices = []
+    for key in keys:
+        value = template[key]
+        if key in LIST_FIELDS and not (value and all(isinstance(v, list) for v in value)):
+            choices.append([value])
+        else:
+            choices.append(expand_value(value, f"{where}.{key}"))
+    return [dict(zip(keys, combo)) for combo in itertools.product(*choices)]
+
+def group_steps(steps):
+    """
+    Reorder interchangeable steps so equal (mode, n_servers) run back to back, keeping the first
+    appearance order of each group. Only the first step of a group restarts servers, and only if
+    one of its steps asked for it.
+    """
+    groups = {}
+    for step in steps:
+        groups.setdefault((step["mode"], step["n_servers"]), []).append(step)
+    ordered = []
+    for group in groups.values():
+        restart = any(step.get("restart_servers", True) for step in group)
+        for i, step in enumerate(group):
+            ordered.append(dict(step, restart_servers=restart and i == 0))
+    return ordered
+
+def expand_spec(spec: dict):
+    """
+    Validate a spec and expand its templates.
+    Returns ({sequence name: [step dicts as run_experiment_sequences expects]}, repetitions, start).
+    """
+    unknown = set(spec) - SPEC_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown top-level keys {sorted(unknown)}")
+    if not spec.get("sequences"):
+        raise ValueError("A spec needs at least one entry in 'sequences'")
+    if not isinstance(spec.get("optimize_order", False), bool):
+        raise ValueError(f"optimize_order: expected a boolean, got {spec['optimize_order']!r}")
+    defaults = spec.get("defaults", {})
+    sequences = {}
+    for i, seq in enumerate(spec["sequences"]):
+        where = f"sequences[{i}]"
+        if not isinstance(seq, dict):
+            raise ValueError(f"{where}: expected a mapping")
+        unknown = set(seq) - SEQUENCE_FIELDS
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        if "name" not in seq or not seq.get("steps"):
+            raise ValueError(f"{where}: needs a 'name' and a non-empty 'steps' list")
+        matrix = seq.get("matrix", {})
+        matrix_keys = list(matrix)
+        matrix_values = [expand_value(matrix[key], f"{where}.matrix.{key}") for key in matrix_keys]
+        for combo in itertools.product(*matrix_values):
+            params = dict(zip(matrix_keys, combo))
+            try:
+                name = seq["name"].format(**params)
+            except KeyError as e:
+                raise ValueError(f"{where}.name: {seq['name']!r} uses {e} which is not in the matrix")
+            if name in sequences:
+                raise ValueError(f"{where}: duplicate sequence name {name!r}")
+            steps = []
+            for j, template in enumerate(seq["steps"]):
+                # Precedence: spec defaults < sequence defaults < matrix values < the step itself
+                merged = {**defaults, **seq.get("defaults", {}), **params, **template}
+                for step in expand_steps(merged, f"{where}.steps[{j}]"):
+                    validate_step(step, f"{name}.steps[{j}]", spec.get("optimize_order", False))
+                    steps.append(step)
+            sequences[name] = group_steps(steps) if seq.get("reorder") else steps
+    if spec.get("reorder_sequences"):
+        by_key = {}
+        for name, steps in sequences.items():
+            by_key.setdefault((steps[0]["mode"], steps[0]["n_servers"]), []).append(name)
+        sequences = {name: sequences[name] for names in by_key.values() for name in names}
+
+    repetitions = spec.get("repetitions", 1)
+    start = spec.get("start", 0)
+    for key, value in (("repetitions", repetitions), ("start", start)):
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"{key}: expected a non-negative integer, got {value!r}")
+    return sequences, repetitions, start
+
+def load_timings(root: str = RESULTS_ROOT):
+    """Phase spans of every traced run under root, with the run directory name in "run"."""
+    frames = []
+    for path in sorted(glob(os.path.join(root, "*", TIMINGS_CSV))):
+        try:
+            timings = pd.read_csv(path)
+        except pd.errors.EmptyDataError:
+            continue
+        # Runs of the same spec reuse sequence names; steps are only unique within a run
+        timings["run"] = os.path.basename(os.path.dirname(path))
+        frames.append(timings)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+class PhaseModel:
+    """
+    Expected phase durations of a step, from the medians of historical timings. Lookups go from the
+    most specific match (same mode, n_servers, n_clients) to the phase's overall median, and to
+    FALLBACK_PHASE_SECONDS when the phase was never traced.
+    """
+    def __init__(self, timings=None):
+        self.timings = timings if timings is not None and not timings.empty else None
+        if self.timings is not None:
+            df = self.timings
+            # scale_up after a scale_down (restart) is a cold start, otherwise servers were already up
+            step_key = ["run", "sequence", "repetition", "step"]
+            cold = df.loc[df["phase"] == "scale_down", step_key].drop_duplicates()
+            cold["cold"] = True
+            df = df.merge(cold, on=step_key, how="left")
+            df.loc[df["phase"] == "scale_up", "phase"] = df["cold"].map({True: "scale_up_cold"}).fillna("scale_up_warm")
+            # Load phases scale with the number of requests sent
+            df["per_request_s"] = df["duration_s"] / df["request_count"]
+            self.timings = df
+
+    def median(self, phase: str, column: str = "duration_s", **match):
+        if self.timings is not None:
+            rows = self.timings[self.timings["phase"] == phase]
+            keys = list(match)
+            # Drop the least important key until something matches
+            for n in range(len(keys), -1, -1):
+                subset = rows
+                for key in keys[:n]:
+                    subset = subset[subset[key] == match[key]]
+                if not subset.empty:
+                    return float(subset[column].median())
+        if column == "per_request_s":
+            return FALLBACK_SECONDS_PER_REQUEST
+        return FALLBACK_PHASE_SECONDS.get(phase, 0.0)
+
+    def step_seconds(self, step: dict) -> dict:
+        """{phase: expected seconds} of one step."""
+        mode, n_servers, n_clients = step["mode"], step["n_servers"], step["n_clients"]
+        restart = step_reset(step, optimized=False)
+        est = {"service_recreate": self.median("service_recreate", mode=mode)}
+        if restart:
+            est["scale_down"] = self.median("scale_down")
+        scale_up = "scale_up_cold" if restart else "scale_up_warm"
+        est["scale_up"] = self.median(scale_up, mode=mode, n_servers=n_servers)
+        if step.get("engine", "perf_analyzer") == "python":
+            load_phase = "loadgen_run"
+        else:
+            load_phase = "perf_analyzer_run"
+            est["job_scheduling"] = self.median("job_scheduling", n_clients=n_clients)
+            est["barrier"] = self.median("barrier", n_clients=n_clients)
+            est["log_collection"] = self.median("log_collection", n_clients=n_clients)
+            est["cleanup"] = self.median("cleanup")
+        stopping = stopping_config(step.get("stopping"))
+        if stopping:
+            # Adaptive steps end somewhere before their time budget; plan for the worst case
+            est[load_phase] = float(stopping["max_seconds"])
+        else:
+            per_request = self.median(load_phase, "per_request_s", mode=mode, n_servers=n_servers, n_clients=n_clients)
+            est[load_phase] = per_request * step.get("request_count", 5000)
+        return est
+
+def plan(sequences: dict, repetitions: int, model: PhaseModel):
+    """One row per step of one repetition with its expected phase durations; the run repeats it."""
+    rows = []
+    for name, steps in sequences.items():
+        for i, step in enumerate(steps):
+            est = model.step_seconds(step)
+            rows.append({
+                "sequence": name, "step": i, "mode": step["mode"], "n_servers": step["n_servers"],
+                "n_clients": step["n_clients"], "restart": step_reset(step, optimized=False),
+                **{f"{phase}_s": seconds for phase, seconds in est.items()},
+                "total_s": sum(est.values()),
+            })
+    df = pd.DataFrame(rows).fillna(0.0)
+    df = df[[col for col in df.columns if col != "total_s"] + ["total_s"]]
+    df.attrs["repetitions"] = repetitions
+    return df
+
+def print_plan(df):
+    repetitions = df.attrs.get("repetitions", 1)
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.0f}"))
+    per_sequence = df.groupby("sequence", sort=False)["total_s"].sum()
+    print("\nEstimated time per repetition:")
+    for name, seconds in per_sequence.items():
+        print(f"  {name}: {seconds / 60:.1f} min")
+    total = df["total_s"].sum() * repetitions
+    print(f"\n{len(df)} steps x {repetitions} repetition(s), {int(df['restart'].sum()) * repetitions} server restarts, "
+          f"estimated {total / 3600:.2f} h")
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate an experiment spec and estimate its duration")
+    parser.add_argument("spec", help="YAML or TOML experiment spec")
+    parser.add_argument("--results-root", default=RESULTS_ROOT, help="where to look for historical timings")
+    args = parser.parse_args()
+    sequences, repetitions, _ = expand_spec(load_spec(args.spec))
+    print_plan(plan(sequences, repetitions, PhaseModel(load_timings(args.results_root))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Scheduled fault injection during steps: kill servers, cordon nodes, delay requests in the proxy
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+import requests
+from config import NAMESPACE, ENVOY_SELECTOR, ENVOY_ADMIN_PORT, FAULT_POLL_SECONDS, FAULT_RECOVERY_TIMEOUT
+from kube_utils import core_api, ready_servers, TRITON_SELECTOR
+from analysis import find_repetitions, time_integral
+
+# Action -> optional parameters and their defaults. Every fault also has "at_s", seconds after the
+# step started; faults with a duration_s are reverted that long after being applied, the others
+# when the step ends.
+FAULT_ACTIONS = {
+    "kill_servers": {"count": 1},
+    "cordon_node":  {"node": None, "drain": False, "duration_s": None},
+    "proxy_delay":  {"delay_ms": 100, "percent": 100, "duration_s": None},
+}
+FAULT_BASELINE_S = 60  # live samples before a fault that define its baseline latency
+
+# Faults currently in effect, written into every live-metrics row
+_active = {"faults": {}}
+
+def active_faults() -> str:
+    return ";".join(sorted(set(_active["faults"].values())))
+
+def fault_config(fault: dict) -> dict:
+    """A fault of a step spec merged over the defaults of its action; ValueError if malformed."""
+    if not isinstance(fault, dict) or fault.get("action") not in FAULT_ACTIONS:
+        raise ValueError(f"Fault {fault!r}: action must be one of {sorted(FAULT_ACTIONS)}")
+    defaults = FAULT_ACTIONS[fault["action"]]
+    unknown = set(fault) - set(defaults) - {"action", "at_s"}
+    if unknown:
+        raise ValueError(f"Fault {fault['action']}: unknown keys {sorted(unknown)}")
+    if not isinstance(fault.get("at_s"), (int, float)) or isinstance(fault["at_s"], bool) or fault["at_s"] < 0:
+        raise ValueError(f"Fault {fault['action']}: at_s must be a number of seconds >= 0, got {fault.get('at_s')!r}")
+    config = dict(defaults)
+    config.update(fault)
+    if config["action"] == "kill_servers" and (not isinstance(config["count"], int) or config["count"] < 1):
+        raise ValueError(f"Fault kill_servers: count must be at least 1, got {config['count']!r}")
+    return config
+
+class KubeFaultBackend:
+    """Faults against the Triton pods, their nodes and the SuperSONIC proxy of the cluster."""
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+
+    def server_count(self) -> int:
+        return len(ready_servers(self.namespace))
+
+    def server_pods(self):
+        pods = core_api.list_namespaced_pod(namespace=self.namespace, label_selector=TRITON_SELECTOR).items
+        return sorted((pod for pod in pods if pod.metadata.deletion_timestamp is None), key=lambda pod: pod.metadata.name)
+
+    def delete_pod(self, name: str):
+        core_api.delete_namespaced_pod(name=name, namespace=self.namespace, grace_period_seconds=0)
+
+    def kill_servers(self, count: int) -> list:
+        victims = [pod.metadata.name for pod in self.server_pods()[:count]]
+        for name in victims:
+            self.delete_pod(name)
+        return victims
+
+    def cordon_node(self, node: str = None, drain: bool = False) -> str:
+        """
+        Mark a node unschedulable (by default the node of the first server) and optionally evict its
+        servers. Needs "patch" on nodes, granted by the ClusterRole of setup_service_account.py.
+        """
+        pods = self.server_pods()
+        node = node or (pods[0].spec.node_name if pods else None)
+        if node is None:
+            raise ValueError("No Triton pod to pick a node from")
+        core_api.patch_node(node, {"spec": {"unschedulable": True}})
+        if drain:
+            for pod in pods:
+                if pod.spec.node_name == node:
+                    self.delete_pod(pod.metadata.name)
+        return node
+
+    def uncordon_node(self, node: str):
+        core_api.patch_node(node, {"spec": {"unschedulable": False}})
+
+    def set_proxy_delay(self, delay_ms: float, percent: float) -> list:
+        """Delay `percent` of the requests through every Envoy pod by delay_ms, via the fault filter's runtime keys."""
+        pods = core_api.list_namespaced_pod(namespace=self.namespace, label_selector=ENVOY_SELECTOR).items
+        targets = [pod.metadata.name for pod in pods if pod.status.pod_ip]
+        for pod in pods:
+            if not pod.status.pod_ip:
+                continue
+            r = requests.post(f"http://{pod.status.pod_ip}:{ENVOY_ADMIN_PORT}/runtime_modify", params={
+                "fault.http.delay.fixed_delay_percent": percent,
+                "fault.http.delay.fixed_duration_ms": int(delay_ms),
+            }, timeout=5)
+            r.raise_for_status()
+        return targets
+
+    def clear_proxy_delay(self):
+        self.set_proxy_delay(0, 0)
+
+class SimulatedBackend:
+    """
+    The same actions against loadgen.FakeTritonGrpc standing in for n_servers servers spread over
+    n_nodes nodes. A killed server is replaced after recovery_s; meanwhile the fake server gets
+    proportionally slower, and requests fail for failover_s after each kill (or until a replacement
+    is ready when none is left). A proxy delay is added to every request.
+    """
+    def __init__(self, fake, n_servers: int, n_nodes: int = 2, recovery_s: float = 30.0, failover_s: float = 1.0):
+        self.fake = fake
+        self.recovery_s = recovery_s
+        self.failover_s = failover_s
+        self.nodes = [f"sim-node-{i}" for i in range(n_nodes)]
+        self.servers = {f"sim-triton-{i}": {"node": self.nodes[i % n_nodes], "ready_at": 0.0} for i in range(n_servers)}
+        self.cordoned = set()
+        self.lock = threading.Lock()
+
+    def server_count(self) -> int:
+        with self.lock:
+            now = time.monotonic()
+            ready = sum(1 for server in self.servers.values() if server["ready_at"] <= now)
+            self.fake.slowdown = len(self.servers) / max(ready, 1)
+            if ready == 0:
+                self.fake.unavailable_until = max(self.fake.unavailable_until,
+                                                  min(server["ready_at"] for server in self.servers.values()))
+            return ready
+
+    def kill(self, names):
+        now = time.monotonic()
+        with self.lock:
+            # Replacements are scheduled on the first node that is not cordoned
+            free = [node for node in self.nodes if node not in self.cordoned]
+            for name in names:
+                self.servers[name]["ready_at"] = now + self.recovery_s
+                self.servers[name]["node"] = free[0] if free else self.servers[name]["node"]
+            self.fake.unavailable_until = max(self.fake.unavailable_until, now + self.failover_s)
+        self.server_count()
+
+    def kill_servers(self, count: int) -> list:
+        now = time.monotonic()
+        victims = sorted(name for name, server in self.servers.items() if server["ready_at"] <= now)[:count]
+        self.kill(victims)
+        return victims
+
+    def cordon_node(self, node: str = None, drain: bool = False) -> str:
+        node = node or self.servers[min(self.servers)]["node"]
+        self.cordoned.add(node)
+        if drain:
+            self.kill([name for name, server in self.servers.items() if server["node"] == node])
+        return node
+
+    def uncordon_node(self, node: str):
+        self.cordoned.discard(node)
+
+    def set_proxy_delay(self, delay_ms: float, percent: float) -> list:
+        # The fake applies the delay to every request; percent scales it to the same mean
+        self.fake.delay_us = delay_ms * 1000.0 * percent / 100.0
+        return ["sim-proxy"]
+
+    def clear_proxy_delay(self):
+        self.fake.delay_us = 0.0
+
+class FaultInjector:
+    """
+    Applies the faults of one step on schedule from a background thread, reverts them, and records
+    when servers killed or drained by a fault were replaced by as many ready servers as before.
+    """
+    def __init__(self, faults, backend, step: int = None):
+        self.faults = [fault_config(fault) for fault in faults]
+        self.backend = backend
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.reverted = set()
+        self.events = [{
+            "step": step, "fault": i, "action": fault["action"],
+            "params": json.dumps({k: v for k, v in fault.items() if k != "action"}),
+            "target": None, "applied": None, "reverted": None, "recovered": None, "recovery_s": None,
+        } for i, fault in enumerate(self.faults)]
+
+    def start(self):
+        self.t0 = time.time()
+        self.spawn(self.run)
+
+    def spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def run(self):
+        schedule = [(fault["at_s"], i, "apply") for i, fault in enumerate(self.faults)]
+        heapq.heapify(schedule)
+        while schedule:
+            at_s, i, kind = heapq.heappop(schedule)
+            if self.stop_event.wait(max(0.0, self.t0 + at_s - time.time())):
+                return
+            if kind == "revert":
+                self.revert(i)
+            elif self.apply(i) and self.faults[i].get("duration_s"):
+                heapq.heappush(schedule, (at_s + self.faults[i]["duration_s"], i, "revert"))
+
+    def apply(self, i: int) -> bool:
+        fault, event = self.faults[i], self.events[i]
+        action = fault["action"]
+        try:
+            before = self.backend.server_count()
+            if action == "kill_servers":
+                target = self.backend.kill_servers(fault["count"])
+            elif action == "cordon_node":
+                target = self.backend.cordon_node(fault["node"], fault["drain"])
+            else:
+                target = self.backend.set_proxy_delay(fault["delay_ms"], fault["percent"])
+        except Exception as e:
+            print(f"Fault {i} ({action}) could not be applied: {e}")
+            return False
+        event["applied"] = datetime.utcnow().isoformat()
+        event["target"] = target if isinstance(target, str) else ",".join(target)
+        _active["faults"][i] = action
+        print(f"Applied fault {i}: {action} on {event['target']}")
+        if action == "kill_servers" or (action == "cordon_node" and fault["drain"]):
+            self.spawn(self.watch_recovery, i, before)
+        return True
+
+    def revert(self, i: int):
+        fault, event = self.faults[i], self.events[i]
+        # Killed servers are replaced by the deployment, there is nothing to revert
+        if event["applied"] is None or i in self.reverted or fault["action"] == "kill_servers":
+            return
+        self.reverted.add(i)
+        try:
+            if fault["action"] == "cordon_node":
+                self.backend.uncordon_node(event["target"])
+            elif fault["action"] == "proxy_delay":
+                self.backend.clear_proxy_delay()
+        except Exception as e:
+            print(f"Fault {i} ({fault['action']}) could not be reverted: {e}")
+            return
+        event["reverted"] = datetime.utcnow().isoformat()
+        _active["faults"].pop(i, None)
+
+    def watch_recovery(self, i: int, before: int):
+        applied = time.time()
+        while not self.stop_event.wait(FAULT_POLL_SECONDS):
+            if self.backend.server_count() >= before:
+                self.events[i]["recovered"] = datetime.utcnow().isoformat()
+                self.events[i]["recovery_s"] = round(time.time() - applied, 3)
+                print(f"Fault {i} recovered after {self.events[i]['recovery_s']:.1f}s ({before} servers ready)")
+                if self.faults[i]["action"] == "kill_servers":
+                    _active["faults"].pop(i, None)
+                return
+            if time.time() - applied > FAULT_RECOVERY_TIMEOUT:
+                print(f"Fault {i} did not recover within {FAULT_RECOVERY_TIMEOUT}s")
+                return
+
+    def stop(self) -> list:
+        """End of the step: stop scheduling, revert what is still in effect, and return the fault records."""
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        for i in range(len(self.faults)):
+            self.revert(i)
+        _active["faults"].clear()
+        return self.events
+
+def summarize_faults(df_faults, df_live):
+    """
+    Impact of every applied fault: the peak total_latency from its application until it recovered
+    (or was reverted) against the median of the FAULT_BASELINE_S before, and the failed requests
+    integrated over that window.
+    """
+    live = df_live.copy()
+    live["timestamp"] = pd.to_datetime(live["timestamp"])
+    live = live.sort_values("timestamp")
+    rows = []
+    for _, fault in df_faults.dropna(subset=["applied"]).iterrows():
+        applied = pd.to_datetime(fault["applied"])
+        end = pd.to_datetime(fault["recovered"] if pd.notna(fault["recovered"]) else fault["reverted"])
+        if pd.isna(end):
+            end = live["timestamp"].max()
+        baseline = live[(live["timestamp"] >= applied - pd.Timedelta(seconds=FAULT_BASELINE_S))
+                        & (live["timestamp"] < applied)]
+        during = live[(live["timestamp"] >= applied) & (live["timestamp"] <= end)]
+        baseline_latency = pd.to_numeric(baseline["total_latency"], errors="coerce").median()
+        peak_latency = pd.to_numeric(during["total_latency"], errors="coerce").max()
+        failures = pd.to_numeric(during["failure_rate"], errors="coerce").fillna(0.0)
+        rows.append({
+            "step": fault["step"], "attempt": fault.get("attempt", 1), "fault": fault["fault"],
+            "action": fault["action"], "target": fault["target"], "recovery_s": fault["recovery_s"],
+            "window_s": (end - applied).total_seconds(),
+            "baseline_latency_ms": baseline_latency,
+            "peak_latency_ms": peak_latency,
+            "latency_spike": peak_latency / baseline_latency if baseline_latency else float("nan"),
+            "failed_requests": time_integral(during["timestamp"], failures) if len(during) else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recovery time, latency spikes and failed requests of the faults of a run")
+    parser.add_argument("run_dir", help="run directory (multiseq_YYYYMMDD_HHMMSS)")
+    args = parser.parse_args()
+
+    tables = []
+    for sequence in sorted(os.listdir(args.run_dir)):
+        for rep, files in find_repetitions(os.path.join(args.run_dir, sequence)).items():
+            if "faults" not in files or "live" not in files:
+                continue
+            table = summarize_faults(pd.read_csv(files["faults"]), pd.read_csv(files["live"]))
+            table.insert(0, "repetition", rep)
+            table.insert(0, "sequence", sequence)
+            tables.append(table)
+    if not tables:
+        print(f"No injected faults in {args.run_dir}")
+        sys.exit(1)
+    print(pd.concat(tables, ignore_index=True).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+if __name__ == "__main__":
+    main()
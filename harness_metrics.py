@@ -0,0 +1,72 @@
+# Prometheus metrics describing the benchmark harness itself
+import time
+import functools
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from config import HARNESS_METRICS_PORT
+
+CALL_SECONDS = Histogram(
+    "sonic_harness_call_seconds", "Wall time of instrumented harness functions", ["function"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+CALL_ERRORS = Counter(
+    "sonic_harness_call_errors_total", "Exceptions raised by instrumented harness functions", ["function"],
+)
+KUBE_API_SECONDS = Histogram(
+    "sonic_harness_kube_api_seconds", "Duration of Kubernetes API calls", ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POLL_LOOP_SECONDS = Histogram(
+    "sonic_harness_poll_loop_seconds", "Duration of one client-job poll iteration, excluding the sleep",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+LAST_POLL_TIMESTAMP = Gauge(
+    "sonic_harness_last_poll_timestamp_seconds", "Unix time of the last completed poll iteration",
+)
+LOG_FETCH_SECONDS = Histogram(
+    "sonic_harness_log_fetch_seconds", "Time to fetch one client pod log",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOG_PARSE_SECONDS = Histogram(
+    "sonic_harness_log_parse_seconds", "Time to parse one client pod log",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+STEP_INFO = Gauge(
+    "sonic_harness_step", "Parameters of the step currently running", ["field"],
+)
+STEP_STARTED = Gauge(
+    "sonic_harness_step_started_timestamp_seconds", "Unix time at which the current step started",
+)
+CLIENT_FAILURES = Counter(
+    "sonic_harness_client_failures_total", "Client pods without a usable result", ["status"],
+)
+STEP_RETRIES = Counter(
+    "sonic_harness_step_retries_total", "Steps run again because too few clients produced a result", ["mode"],
+)
+STEPS_COMPLETED = Counter(
+    "sonic_harness_steps_completed_total", "Experiment steps completed", ["sequence", "mode"],
+)
+
+def instrumented(func):
+    """Record the duration and failures of every call to `func`."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            CALL_ERRORS.labels(func.__name__).inc()
+            raise
+        finally:
+            CALL_SECONDS.labels(func.__name__).observe(time.perf_counter() - start)
+    return wrapper
+
+def set_current_step(repetition, step, n_clients, n_servers):
+    STEP_INFO.labels("repetition").set(repetition)
+    STEP_INFO.labels("step").set(step)
+    STEP_INFO.labels("n_clients").set(n_clients)
+    STEP_INFO.labels("n_servers").set(n_servers)
+    STEP_STARTED.set(time.time())
+
+def start_metrics_server(port: int = HARNESS_METRICS_PORT):
+    start_http_server(port)
+    print(f"Harness metrics exposed at http://localhost:{port}/metrics")
@@ -1,7 +1,17 @@
 # Kubernetes utility functions for the benchmark
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
 from kubernetes import client
-from config import NAMESPACE, BARE_TRITON_SERVICE, DEPLOYMENT_NAME, POLL_INTERVAL_SECONDS, SUPERSONIC_SERVICE
+from config import (NAMESPACE, BARE_TRITON_SERVICE, DEPLOYMENT_NAME, SUPERSONIC_SERVICE, MODEL_NAME,
+                    TRITON_HTTP_PORT, READY_BACKOFF_INITIAL, READY_BACKOFF_MAX, READY_PROBE_TIMEOUT,
+                    READY_TIMEOUT_SECONDS, SUPERSONIC_MIN_REPLICAS, SUPERSONIC_MAX_REPLICAS)
+from harness_metrics import instrumented, KUBE_API_SECONDS
+from tracing import span
+
+TRITON_SELECTOR = "app.kubernetes.io/component=triton"
 
 core_api = client.CoreV1Api()
 apps_v1 = client.AppsV1Api()
@@ -73,19 +83,22 @@ def create_loadbalancer_service():
     core_api.create_namespaced_service(namespace=NAMESPACE, body=svc)
     time.sleep(5)
 
+@instrumented
 def set_service_mode(mode: str):
-    delete_service(BARE_TRITON_SERVICE, NAMESPACE)
-    if mode == "supersonic":
-        create_headless_service()
-    elif mode == "bare_triton":
-        create_loadbalancer_service()
-    else:
-        raise ValueError("Mode must be 'supersonic' or 'bare_triton'")
+    with span("service_recreate"):
+        delete_service(BARE_TRITON_SERVICE, NAMESPACE)
+        if mode == "supersonic":
+            create_headless_service()
+        elif mode == "bare_triton":
+            create_loadbalancer_service()
+        else:
+            raise ValueError("Mode must be 'supersonic' or 'bare_triton'")
 
+@instrumented
 def scale_deployment(name: str, namespace: str, replicas: int, mode: str, reset: bool = False):
     """
     Patch the KEDA ScaledObject:
-    - If mode is 'supersonic', set minReplicaCount=1 and maxReplicaCount=10 (autoscale allowed).
+    - If mode is 'supersonic', set minReplicaCount/maxReplicaCount to SUPERSONIC_MIN/MAX_REPLICAS (autoscale allowed).
     - If mode is 'bare_triton', set minReplicaCount=maxReplicaCount=replicas (disable autoscale).
     Then scale the deployment.
     """
@@ -95,8 +108,9 @@ def scale_deployment(name: str, namespace: str, replicas: int, mode: str, reset:
     plural = "scaledobjects"
     try:
         if mode == "supersonic":
-            patch = {"spec": {"minReplicaCount": 1, "maxReplicaCount": 10}}
-            print(f"Patched KEDA ScaledObject {scaledobject_name} min/max replicas to 1/10 (supersonic mode)")
+            patch = {"spec": {"minReplicaCount": SUPERSONIC_MIN_REPLICAS, "maxReplicaCount": SUPERSONIC_MAX_REPLICAS}}
+            print(f"Patched KEDA ScaledObject {scaledobject_name} min/max replicas to "
+                  f"{SUPERSONIC_MIN_REPLICAS}/{SUPERSONIC_MAX_REPLICAS} (supersonic mode)")
         else:
             patch = {"spec": {"minReplicaCount": replicas, "maxReplicaCount": replicas}}
             print(f"Patched KEDA ScaledObject {scaledobject_name} min/max replicas to {replicas} (bare_triton mode)")
@@ -114,30 +128,134 @@ def scale_deployment(name: str, namespace: str, replicas: int, mode: str, reset:
         traceback.print_exc()
 
     if reset:
-        patch_zero = {"spec": {"replicas": 0}}
-        apps_v1.patch_namespaced_deployment(name=name, namespace=namespace, body=patch_zero)
-        while True:
-            dep = apps_v1.read_namespaced_deployment(name=name, namespace=namespace).status
-            available = dep.available_replicas or 0
-            if available == 0:
-                break
-            time.sleep(POLL_INTERVAL_SECONDS)
-
-    patch_body = {"spec": {"replicas": replicas}}
-    apps_v1.patch_namespaced_deployment(name=name, namespace=namespace, body=patch_body)
+        with span("scale_down"):
+            patch_zero = {"spec": {"replicas": 0}}
+            with KUBE_API_SECONDS.labels("patch_deployment").time():
+                apps_v1.patch_namespaced_deployment(name=name, namespace=namespace, body=patch_zero)
+            # Wait for the pods themselves to go, so the next step starts from cold servers
+            wait_with_backoff(lambda: len(server_pod_ips(namespace, include_terminating=True)),
+                              lambda remaining: remaining == 0, "servers to terminate")
+
+    with span("scale_up"):
+        patch_body = {"spec": {"replicas": replicas}}
+        with KUBE_API_SECONDS.labels("patch_deployment").time():
+            apps_v1.patch_namespaced_deployment(name=name, namespace=namespace, body=patch_body)
+        wait_for_ready_servers(replicas, namespace, name, mode)
+
+def wait_with_backoff(poll, done, what: str, timeout: float = READY_TIMEOUT_SECONDS):
+    """
+    Call poll() until done(result), sleeping READY_BACKOFF_INITIAL doubled up to READY_BACKOFF_MAX
+    between calls. The delay restarts from the initial value whenever the result changes.
+    """
+    started = time.monotonic()
+    delay, last = READY_BACKOFF_INITIAL, None
     while True:
-        dep = apps_v1.read_namespaced_deployment(name=name, namespace=namespace).status
-        available = dep.available_replicas or 0
-        if available >= replicas:
-            break
-        time.sleep(POLL_INTERVAL_SECONDS)
-
-def count_running_pods(label_selector: str, namespace: str) -> int:
-    pods = core_api.list_namespaced_pod(namespace=namespace, label_selector=label_selector).items
+        result = poll()
+        if done(result):
+            return result
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for {what} (last: {result})")
+        if result != last:
+            delay, last = READY_BACKOFF_INITIAL, result
+        time.sleep(delay)
+        delay = min(delay * 2, READY_BACKOFF_MAX)
+
+def server_pod_ips(namespace: str = NAMESPACE, include_terminating: bool = False) -> dict:
+    """
+    Pod name -> IP of the Triton pods; pods being deleted are skipped unless include_terminating.
+    Finished pods (Failed or Succeeded, e.g. evicted ones awaiting garbage collection) never count.
+    """
+    with KUBE_API_SECONDS.labels("list_pods").time():
+        pods = core_api.list_namespaced_pod(namespace=namespace, label_selector=TRITON_SELECTOR).items
+    return {pod.metadata.name: pod.status.pod_ip for pod in pods
+            if pod.status.phase not in ("Failed", "Succeeded")
+            and (include_terminating or (pod.metadata.deletion_timestamp is None and pod.status.phase == "Running"))}
+
+def model_ready(pod_ip: str, model: str = MODEL_NAME) -> bool:
+    """Whether the server at pod_ip has loaded `model` and accepts requests for it."""
+    if not pod_ip:
+        return False
+    try:
+        r = requests.get(f"http://{pod_ip}:{TRITON_HTTP_PORT}/v2/models/{model}/ready", timeout=READY_PROBE_TIMEOUT)
+        return r.status_code == 200
+    except requests.RequestException:
+        return False
+
+def ready_servers(namespace: str = NAMESPACE) -> list:
+    """Names of the Triton pods whose model-ready endpoint answers 200, probed concurrently."""
+    pods = server_pod_ips(namespace)
+    if not pods:
+        return []
+    with ThreadPoolExecutor(max_workers=len(pods)) as pool:
+        ready = list(pool.map(model_ready, pods.values()))
+    return sorted(name for name, ok in zip(pods, ready) if ok)
+
+def deployment_replicas(name: str = DEPLOYMENT_NAME, namespace: str = NAMESPACE) -> int:
+    """Pods the deployment currently has, terminating ones excluded (status.replicas)."""
+    with KUBE_API_SECONDS.labels("read_deployment").time():
+        dep = apps_v1.read_namespaced_deployment(name=name, namespace=namespace)
+    return dep.status.replicas or 0
+
+def servers_settled(mode: str, replicas: int, deployment_replicas: int, n_ready: int) -> bool:
+    """
+    Whether a scale to `replicas` is done. In bare_triton mode the harness sets the pod count, so
+    exactly that many servers must be ready and the deployment must have no surplus pods (a
+    scale-down is only done once they are gone). In supersonic mode KEDA decides the count
+    within its bounds; at least min(replicas, SUPERSONIC_MIN_REPLICAS) ready servers will do.
+    """
+    if mode == "supersonic":
+        return n_ready >= min(replicas, SUPERSONIC_MIN_REPLICAS)
+    return deployment_replicas == replicas and n_ready == replicas
+
+def wait_for_ready_servers(replicas: int, namespace: str = NAMESPACE, name: str = DEPLOYMENT_NAME,
+                           mode: str = "bare_triton") -> list:
+    """Block until servers_settled, probing the model on every server rather than trusting available_replicas."""
+    _, ready = wait_with_backoff(lambda: (deployment_replicas(name, namespace), ready_servers(namespace)),
+                                 lambda state: servers_settled(mode, replicas, state[0], len(state[1])),
+                                 f"{replicas} servers with {MODEL_NAME} ready ({mode})")
+    print(f"{len(ready)} servers ready: {', '.join(ready)}")
+    return ready
+
+def get_deployment_images(name: str = DEPLOYMENT_NAME, namespace: str = NAMESPACE) -> dict:
+    """Container name -> image of the server deployment, for run metadata."""
+    try:
+        dep = apps_v1.read_namespaced_deployment(name=name, namespace=namespace)
+    except client.exceptions.ApiException as e:
+        print(f"Failed to read deployment {name}: {e}")
+        return {}
+    return {c.name: c.image for c in dep.spec.template.spec.containers}
+
+def runner_startup_times(namespace: str = NAMESPACE) -> dict:
+    """
+    Startup breakdown of the pod this process runs in (POD_NAME is set by runner_job):
+    pod creation -> container start (scheduling, image pull), bootstrap script, interpreter ready.
+    """
+    pod_name = os.environ.get("POD_NAME")
+    if not pod_name:
+        return {}
+    bootstrap = os.environ.get("RUNNER_BOOTSTRAP_SECONDS")
+    # None rather than NaN, which json.dump would write as an invalid NaN literal
+    times = {"bootstrap_s": float(bootstrap) if bootstrap else None}
+    try:
+        pod = core_api.read_namespaced_pod(name=pod_name, namespace=namespace)
+    except client.exceptions.ApiException as e:
+        print(f"Failed to read runner pod {pod_name}: {e}")
+        return times
+    created = pod.metadata.creation_timestamp
+    statuses = pod.status.container_statuses or []
+    if statuses and statuses[0].state.running is not None:
+        times["container_start_s"] = (statuses[0].state.running.started_at - created).total_seconds()
+    times["total_s"] = (datetime.now(timezone.utc) - created).total_seconds()
+    return times
+
+def count_running_pods(label_selector: str, namespace: str, api=None) -> int:
+    with KUBE_API_SECONDS.labels("list_pods").time():
+        pods = (api or core_api).list_namespaced_pod(namespace=namespace, label_selector=label_selector).items
     return sum(1 for pod in pods if pod.status.phase == "Running")
 
 def count_running_servers(namespace: str) -> int:
-    pods = core_api.list_namespaced_pod(namespace=namespace, label_selector="app.kubernetes.io/component=triton").items
+    with KUBE_API_SECONDS.labels("list_pods").time():
+        pods = core_api.list_namespaced_pod(namespace=namespace, label_selector=TRITON_SELECTOR).items
     return sum(1 for pod in pods if pod.status.phase == "Running") 
 
 def cleanup_benchmark_jobs(namespace="cms"):
@@ -0,0 +1,719 @@
+# In-process Triton gRPC load generator: many logical clients on one asyncio event loop
+import argparse
+import asyncio
+import json
+import math
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import requests
+import grpc
+import tritonclient.grpc as grpcclient
+import tritonclient.grpc.aio as aio_grpcclient
+from tritonclient.grpc import service_pb2, service_pb2_grpc
+from tritonclient.utils import InferenceServerException
+from config import (COLUMNS, MODEL_NAME, MODEL_BATCH_SIZE, MODEL_INPUT_DTYPE, MODEL_INPUTS, NAMESPACE, TRITON_GRPC_PORT,
+                    LOADGEN_CONCURRENCY, LOADGEN_TIMEOUT_S, POLL_INTERVAL_SECONDS, CLIENT_CPU_SATURATION,
+                    LIVE_METRICS_COLUMNS, WINDOW_COLUMNS, SOAK_SUMMARY_COLUMNS)
+from client_job import endpoint_url, sample_live_metrics, mean_std
+from kube_utils import server_pod_ips
+from payloads import load_payload
+from stopping import stopping_config, window_precision, is_precise
+from tracing import record_span
+from metrics import query_server_memory
+from soak import RotatingCsvWriter, SoakMonitor
+from faults import SimulatedBackend, FaultInjector, active_faults, summarize_faults
+from harness_metrics import instrumented, POLL_LOOP_SECONDS, LAST_POLL_TIMESTAMP
+
+# Result column -> Triton statistics field, as reported by perf_analyzer's "Server:" section
+SERVER_STAT_FIELDS = {
+    "queue_us":          "queue",
+    "compute_input_us":  "compute_input",
+    "compute_infer_us":  "compute_infer",
+    "compute_output_us": "compute_output",
+}
+
+def make_inputs(batch_size: int = MODEL_BATCH_SIZE, rng=None):
+    """Random MODEL_INPUTS tensors of one request, like perf_analyzer's default random input data."""
+    rng = rng or np.random.default_rng()
+    inputs = []
+    for name, shape in MODEL_INPUTS.items():
+        tensor = grpcclient.InferInput(name, [batch_size] + list(shape), MODEL_INPUT_DTYPE)
+        tensor.set_data_from_numpy(rng.random([batch_size] + list(shape), dtype=np.float32))
+        inputs.append(tensor)
+    return inputs
+
+class PayloadBatches:
+    """
+    Requests cycling through the samples of a memory-mapped payload, starting at `offset` so that
+    logical clients do not all send the same batches. A batch's InferInputs are built when it is
+    requested, so a client holds one request's tensors rather than a copy of the whole payload.
+    """
+    def __init__(self, payload: dict, batch_size: int = MODEL_BATCH_SIZE, offset: int = 0):
+        self.payload = payload
+        self.batch_size = batch_size
+        self.offset = offset
+        self.n = len(next(iter(payload.values())))
+
+    def __len__(self) -> int:
+        return math.ceil(max(self.n, self.batch_size) / self.batch_size)
+
+    def __getitem__(self, i: int) -> list:
+        rows = (self.offset + i * self.batch_size + np.arange(self.batch_size)) % self.n
+        inputs = []
+        for name, samples in self.payload.items():
+            tensor = grpcclient.InferInput(name, [self.batch_size] + list(samples.shape[1:]), MODEL_INPUT_DTYPE)
+            tensor.set_data_from_numpy(np.ascontiguousarray(samples[rows]))
+            inputs.append(tensor)
+        return inputs
+
+async def server_statistics(url: str) -> dict:
+    """Cumulative {field: (count, ns)} of MODEL_NAME on the server behind url."""
+    client = aio_grpcclient.InferenceServerClient(url)
+    try:
+        stats = await client.get_inference_statistics(MODEL_NAME, as_json=True)
+    finally:
+        await client.close()
+    totals = {}
+    for model in stats.get("model_stats", []):
+        for field, duration in model.get("inference_stats", {}).items():
+            count, ns = totals.get(field, (0, 0))
+            # int64 fields are serialized as strings in the JSON form
+            totals[field] = (count + int(duration.get("count", 0)), ns + int(duration.get("ns", 0)))
+    return totals
+
+async def cluster_statistics(namespace: str = NAMESPACE) -> dict:
+    """
+    {pod name: server_statistics} of every running Triton pod, queried directly: through the
+    load-balanced endpoint each snapshot would come from whichever single server answered.
+    Pods that cannot be queried are left out.
+    """
+    pods = await asyncio.get_running_loop().run_in_executor(None, server_pod_ips, namespace)
+    pods = {name: ip for name, ip in pods.items() if ip}
+    results = await asyncio.gather(*(server_statistics(f"{ip}:{TRITON_GRPC_PORT}") for ip in pods.values()),
+                                   return_exceptions=True)
+    snapshot = {}
+    for name, result in zip(pods, results):
+        if isinstance(result, Exception):
+            print(f"[loadgen] Failed to get inference statistics of {name}: {result}")
+            continue
+        snapshot[name] = result
+    return snapshot
+
+def server_latency_breakdown(before: dict, after: dict) -> dict:
+    """
+    Per-request server-side times (us) between two cluster_statistics snapshots, in the
+    perf_analyzer columns. Counts are summed over the pods of the second snapshot; a pod that
+    started in between counts from zero, one that went away is left out.
+    """
+    def per_request_us(field):
+        count = ns = 0
+        for pod, totals in after.items():
+            previous = before.get(pod, {}).get(field, (0, 0))
+            count += totals.get(field, (0, 0))[0] - previous[0]
+            ns += totals.get(field, (0, 0))[1] - previous[1]
+        return ns / count / 1000.0 if count > 0 else None
+
+    rec = {col: per_request_us(field) for col, field in SERVER_STAT_FIELDS.items()}
+    success = per_request_us("success")
+    components = [value for value in rec.values() if value is not None]
+    rec["overhead_us"] = max(success - sum(components), 0.0) if success is not None else None
+    return rec
+
+class ClientErrorRate:
+    """Failed requests per second of the logical clients between successive calls (one poll interval)."""
+    def __init__(self):
+        self.errors = 0
+        self.t = time.monotonic()
+
+    def __call__(self, errors: int) -> float:
+        now = time.monotonic()
+        rate = (errors - self.errors) / (now - self.t) if now > self.t else None
+        self.errors, self.t = errors, now
+        return rate
+
+class LogicalClient:
+    """
+    One simulated perf_analyzer client: its own gRPC channel, `concurrency` requests in flight and,
+    if `rate` is set, requests paced at that many per second instead of back-to-back.
+    Inputs come from a payload (see payloads.py) when given, else random data. Without
+    keep_latencies only the current window's latencies are held (soak runs, see soak.py).
+    """
+    def __init__(self, url: str, index: int, request_count: int, concurrency: int = LOADGEN_CONCURRENCY,
+                 rate: float = None, batch_size: int = MODEL_BATCH_SIZE, payload: dict = None,
+                 keep_latencies: bool = True):
+        self.url = url
+        self.index = index
+        self.request_count = request_count
+        self.concurrency = concurrency
+        self.rate = rate
+        self.batch_size = batch_size
+        self.payload = payload
+        self.keep_latencies = keep_latencies
+        self.latencies_ns = []
+        self.completed = 0
+        self.latency_sum_ns = 0
+        self.errors = 0
+        self.sent = 0
+        self.window_latencies_ns = []  # drained by the stopping controller at the end of every window
+        self.stop = None
+        self.wall_s = None
+        self.started_at = None
+        self.finished_at = None
+        self.done = False
+
+    async def run(self):
+        client = aio_grpcclient.InferenceServerClient(self.url)
+        if self.payload is not None:
+            batches = PayloadBatches(self.payload, self.batch_size, offset=self.index * self.batch_size)
+        else:
+            batches = [make_inputs(self.batch_size, np.random.default_rng(self.index))]
+        start = time.perf_counter()
+        self.started_at = time.time()
+
+        async def worker():
+            while self.sent < self.request_count and not (self.stop and self.stop.is_set()):
+                i = self.sent
+                self.sent += 1
+                if self.rate:
+                    delay = start + i / self.rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                t0 = time.perf_counter_ns()
+                try:
+                    await client.infer(MODEL_NAME, batches[i % len(batches)], client_timeout=LOADGEN_TIMEOUT_S)
+                except InferenceServerException:
+                    self.errors += 1
+                    continue
+                latency_ns = time.perf_counter_ns() - t0
+                self.completed += 1
+                self.latency_sum_ns += latency_ns
+                if self.keep_latencies:
+                    self.latencies_ns.append(latency_ns)
+                self.window_latencies_ns.append(latency_ns)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            self.wall_s = time.perf_counter() - start
+            self.finished_at = time.time()
+            self.done = True
+            await client.close()
+
+    def record(self) -> dict:
+        """Client-side columns of the results schema."""
+        rec = {"pod_name": f"loadgen-{self.index}", "placement": "runner", "batch_size": self.batch_size,
+               "attempts": 1, "client_status": "ok" if self.latencies_ns else "errored"}
+        if not self.latencies_ns:
+            return rec
+        latencies_us = np.array(self.latencies_ns) / 1000.0
+        rec["throughput_ips"] = len(latencies_us) * self.batch_size / self.wall_s
+        rec["avg_latency_us"] = int(latencies_us.mean())
+        for p in (50, 90, 95, 99):
+            rec[f"p{p}_latency_us"] = int(np.percentile(latencies_us, p))
+        rec["avg_request_latency_us"] = rec["avg_latency_us"]
+        return rec
+
+    def window(self) -> dict:
+        """The whole run as one measurement window (without a stopping config there is no other)."""
+        rec = self.record()
+        return {"pod_name": rec["pod_name"], "window": 1,
+                "start": datetime.utcfromtimestamp(self.started_at).isoformat(),
+                "end": datetime.utcfromtimestamp(self.finished_at).isoformat(),
+                "throughput_ips": rec.get("throughput_ips"), "latency_us": rec.get("p99_latency_us"),
+                "latency_stat": "p99"}
+
+async def measure_until_precise(clients, stop, stopping: dict, batch_size: int, windows: list = None) -> dict:
+    """
+    Sequential stopping rule: every window_s, aggregate the throughput and p99 latency of the window
+    over all clients, and stop them once both 95% CIs (first window discarded as warm-up) are
+    within rel_ci, or max_seconds have passed. Each window is appended to `windows` if given.
+    """
+    window_s = stopping["window_s"]
+    start = window_start = time.perf_counter()
+    wall_start = time.time()
+    throughputs, p99s = [], []
+    while True:
+        await asyncio.sleep(max(0.0, window_start + window_s - time.perf_counter()))
+        now = time.perf_counter()
+        latencies = []
+        for c in clients:
+            latencies.extend(c.window_latencies_ns)
+            c.window_latencies_ns = []
+        wall_now = time.time()
+        if latencies:
+            throughputs.append(len(latencies) * batch_size / (now - window_start))
+            p99s.append(float(np.percentile(latencies, 99)) / 1000.0)
+            if windows is not None:
+                windows.append({"pod_name": "loadgen", "window": len(throughputs),
+                                "start": datetime.utcfromtimestamp(wall_start).isoformat(),
+                                "end": datetime.utcfromtimestamp(wall_now).isoformat(),
+                                "throughput_ips": throughputs[-1], "latency_us": int(p99s[-1]), "latency_stat": "p99"})
+        window_start, wall_start = now, wall_now
+        precision = window_precision(throughputs, p99s)
+        if is_precise(precision, stopping["rel_ci"]) or now - start >= stopping["max_seconds"]:
+            stop.set()
+            return precision
+
+async def run_load(url: str, n_clients: int, request_count: int, concurrency: int = LOADGEN_CONCURRENCY,
+                   rate: float = None, batch_size: int = MODEL_BATCH_SIZE, on_poll=None, payload_dir: str = None,
+                   stopping: dict = None, windows: list = None, per_pod: bool = False):
+    """
+    Run n_clients logical clients to completion and return one results row per client.
+    on_poll(running_clients, errors) is called from a worker thread every POLL_INTERVAL_SECONDS meanwhile,
+    errors being the failed requests of all clients so far.
+    With a stopping config, clients run until measure_until_precise stops them instead of for
+    request_count requests each. The measurement windows are appended to `windows` if given: the
+    stopping windows over all clients, else the whole run of every client. The server breakdown
+    sums the statistics of every Triton pod with per_pod (see cluster_statistics), else it comes
+    from the server behind url (a fake or a single server outside the cluster).
+    """
+    payload = load_payload(payload_dir) if payload_dir else None
+    if stopping:
+        request_count = math.inf
+    clients = [LogicalClient(url, i, request_count, concurrency, rate, batch_size, payload) for i in range(n_clients)]
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for c in clients:
+        c.stop = stop
+
+    async def poll():
+        while True:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            try:
+                await loop.run_in_executor(None, on_poll, sum(not c.done for c in clients), sum(c.errors for c in clients))
+            except Exception as e:
+                # A failed monitoring sample must not stop the polling for the rest of the run
+                print(f"[loadgen] poll failed: {e}")
+
+    async def statistics():
+        return await cluster_statistics() if per_pod else {url: await server_statistics(url)}
+
+    before = await statistics()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    poller = asyncio.create_task(poll()) if on_poll else None
+    controller = asyncio.create_task(measure_until_precise(clients, stop, stopping, batch_size, windows)) if stopping else None
+    try:
+        await asyncio.gather(*(c.run() for c in clients))
+    finally:
+        if poller is not None:
+            poller.cancel()
+    precision = await controller if controller is not None else {}
+    if windows is not None and controller is None:
+        windows.extend(c.window() for c in clients if c.latencies_ns)
+    # One event loop can use at most one core; close to that, the generator rather than the server
+    # bounds throughput
+    cpu_usage_cores = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+    server = server_latency_breakdown(before, await statistics())
+
+    rows = []
+    for c in clients:
+        rec = {"n_clients": n_clients, **c.record(), **server, **precision}
+        rec["cpu_usage_cores"] = cpu_usage_cores
+        rec["client_saturated"] = cpu_usage_cores >= CLIENT_CPU_SATURATION
+        rows.append(rec)
+    errors = sum(c.errors for c in clients)
+    if errors:
+        print(f"[loadgen] {errors} of {sum(c.sent for c in clients)} requests failed")
+    return rows
+
+@instrumented
+def run_loadgen_step(n_clients: int, mode: str, n_servers: int, live_metrics_writer=None,
+                     request_count: int = 5000, concurrency: int = LOADGEN_CONCURRENCY, rate: float = None,
+                     payload_dir: str = None, stopping: dict = None, windows_writer=None, on_start=None):
+    """
+    Drop-in replacement for run_client_job that generates the load from the runner process.
+    on_start() is called just before the clients start.
+    """
+    envoy_samples = []
+    gpu_samples   = []
+
+    error_rate = ClientErrorRate()
+
+    def on_poll(running_clients, errors):
+        poll_start = time.perf_counter()
+        sample_live_metrics(live_metrics_writer, mode, n_clients, n_servers, running_clients,
+                            envoy_samples, gpu_samples, client_failure_rate=error_rate(errors))
+        POLL_LOOP_SECONDS.observe(time.perf_counter() - poll_start)
+        LAST_POLL_TIMESTAMP.set_to_current_time()
+
+    load_start = time.time()
+    windows = []
+    if on_start is not None:
+        on_start()
+    rows = asyncio.run(run_load(endpoint_url(mode), n_clients, request_count, concurrency, rate,
+                                on_poll=on_poll, payload_dir=payload_dir, stopping=stopping, windows=windows,
+                                per_pod=True))
+    record_span("loadgen_run", load_start, time.time())
+    if windows_writer is not None:
+        # Clients run on the runner itself, so their clock needs no correction
+        for window in windows:
+            windows_writer.writerow({**window, "placement": "runner", "clock_offset_s": 0.0, "clock_rtt_s": 0.0})
+
+    envoy_overhead_avg, envoy_overhead_std = mean_std(envoy_samples)
+    gpu_util_avg, gpu_util_std = mean_std(gpu_samples)
+    for rec in rows:
+        rec["envoy_overhead_avg"] = envoy_overhead_avg
+        rec["envoy_overhead_std"] = envoy_overhead_std
+        rec["gpu_util_avg"] = gpu_util_avg
+        rec["gpu_util_std"] = gpu_util_std
+    if rows[0]["client_saturated"]:
+        print(f"[Mode={mode}, n_clients={n_clients}] WARNING: load generator CPU-saturated "
+              f"({rows[0]['cpu_usage_cores']:.2f} cores), throughput of this step is client-bound")
+
+    df = pd.DataFrame(rows)
+    return df.reindex(columns=[col for col in COLUMNS if col not in ['mode', 'n_servers']])
+
+async def run_soak(url: str, n_clients: int, soak: dict, monitor, windows_writer, summary_writer,
+                   concurrency: int = LOADGEN_CONCURRENCY, rate: float = None, batch_size: int = MODEL_BATCH_SIZE,
+                   on_poll=None, payload_dir: str = None):
+    """
+    Keep n_clients logical clients running for soak["duration_s"] (until SIGINT/SIGTERM if None).
+    Every window_s, the throughput and p99 latency over all clients are written to windows_writer
+    and fed to the monitor, whose rolling summary goes to summary_writer. Only the latencies of
+    the current window are held in memory. Returns the clients.
+    """
+    payload = load_payload(payload_dir) if payload_dir else None
+    clients = [LogicalClient(url, i, math.inf, concurrency, rate, batch_size, payload, keep_latencies=False)
+               for i in range(n_clients)]
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for c in clients:
+        c.stop = stop
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def poll():
+        while True:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            try:
+                await loop.run_in_executor(None, on_poll, sum(not c.done for c in clients), sum(c.errors for c in clients))
+            except Exception as e:
+                # A failed monitoring sample must not stop the polling for the rest of the run
+                print(f"[loadgen] poll failed: {e}")
+
+    async def measure():
+        window_s = soak["window_s"]
+        started = wall_start = time.time()
+        window_start = time.perf_counter()
+        n = 0
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), max(0.0, window_start + window_s - time.perf_counter()))
+            except asyncio.TimeoutError:
+                pass
+            now, wall_now = time.perf_counter(), time.time()
+            latencies = []
+            for c in clients:
+                latencies.extend(c.window_latencies_ns)
+                c.window_latencies_ns = []
+            if latencies:
+                n += 1
+                throughput = len(latencies) * batch_size / (now - window_start)
+                p99_us = float(np.percentile(latencies, 99)) / 1000.0
+                windows_writer.writerow({
+                    "pod_name": "loadgen", "placement": "runner", "window": n,
+                    "start": datetime.utcfromtimestamp(wall_start).isoformat(),
+                    "end": datetime.utcfromtimestamp(wall_now).isoformat(),
+                    "throughput_ips": throughput, "latency_us": int(p99_us), "latency_stat": "p99",
+                    "clock_offset_s": 0.0, "clock_rtt_s": 0.0,
+                })
+                summary_writer.writerow(monitor.add_window(wall_now, throughput, p99_us))
+                windows_writer.flush()
+                summary_writer.flush()
+            window_start, wall_start = now, wall_now
+            if soak["duration_s"] and wall_now - started >= soak["duration_s"]:
+                stop.set()
+
+    poller = asyncio.create_task(poll()) if on_poll else None
+    measurer = asyncio.create_task(measure())
+    try:
+        await asyncio.gather(*(c.run() for c in clients))
+    finally:
+        stop.set()
+        if poller is not None:
+            poller.cancel()
+        await measurer
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+    return clients
+
+class LastRowTap:
+    """Writer passing rows through to another one, keeping the last row written."""
+    def __init__(self, writer):
+        self.writer = writer
+        self.last = None
+
+    def writerow(self, row):
+        self.last = row
+        self.writer.writerow(row)
+
+    def flush(self):
+        self.writer.flush()
+
+@instrumented
+def run_soak_step(n_clients: int, mode: str, n_servers: int, soak: dict, prefix: str, dashboard=None,
+                  concurrency: int = LOADGEN_CONCURRENCY, rate: float = None, payload_dir: str = None,
+                  on_start=None):
+    """
+    Soak counterpart of run_loadgen_step: live metrics, windows and rolling summaries go to
+    <prefix>_live/_windows/_summary_partNNNN.csv files rotated by soak["rotate_s"] and
+    soak["rotate_bytes"]. The returned rows hold each client's throughput and mean latency over
+    the whole step, and the rolling p99 of the last windows. on_start() is called just before
+    the clients start.
+    """
+    monitor = SoakMonitor(soak)
+    rotation = (soak["rotate_s"], soak["rotate_bytes"], soak["keep_files"])
+    live_writer = RotatingCsvWriter(f"{prefix}_live", LIVE_METRICS_COLUMNS, *rotation)
+    windows_writer = RotatingCsvWriter(f"{prefix}_windows", WINDOW_COLUMNS, *rotation)
+    summary_writer = RotatingCsvWriter(f"{prefix}_summary", SOAK_SUMMARY_COLUMNS, *rotation)
+    # Server samples of the rolling windows only, for the step averages
+    max_samples = soak["rolling_windows"] * math.ceil(soak["window_s"] / POLL_INTERVAL_SECONDS)
+    envoy_samples = deque(maxlen=max_samples)
+    gpu_samples   = deque(maxlen=max_samples)
+    live_tap, summary_tap = LastRowTap(live_writer), LastRowTap(summary_writer)
+    live_output = dashboard.wrap(live_tap) if dashboard is not None else live_tap
+
+    error_rate = ClientErrorRate()
+
+    def on_poll(running_clients, errors):
+        poll_start = time.perf_counter()
+        live_tap.last = None
+        try:
+            sample_live_metrics(live_output, mode, n_clients, n_servers, running_clients, envoy_samples, gpu_samples,
+                                client_failure_rate=error_rate(errors))
+            live_writer.flush()
+            gpu_memory, cpu_memory = query_server_memory()
+        except requests.RequestException as e:
+            # A metrics outage must not end a day-long run
+            print(f"[soak] metrics query failed: {e}")
+            return
+        monitor.observe(live_tap.last["gpu_util"] if live_tap.last else None, gpu_memory, cpu_memory)
+        POLL_LOOP_SECONDS.observe(time.perf_counter() - poll_start)
+        LAST_POLL_TIMESTAMP.set_to_current_time()
+
+    soak_start = time.time()
+    if on_start is not None:
+        on_start()
+    try:
+        clients = asyncio.run(run_soak(endpoint_url(mode), n_clients, soak, monitor, windows_writer, summary_tap,
+                                       concurrency, rate, on_poll=on_poll, payload_dir=payload_dir))
+    finally:
+        for writer in (live_writer, windows_writer, summary_writer):
+            writer.close()
+    record_span("soak_run", soak_start, time.time())
+
+    envoy_overhead_avg, envoy_overhead_std = mean_std(list(envoy_samples))
+    gpu_util_avg, gpu_util_std = mean_std(list(gpu_samples))
+    summary = summary_tap.last or {}
+    rows = []
+    for c in clients:
+        rec = {"n_clients": n_clients, "pod_name": f"loadgen-{c.index}", "placement": "runner",
+               "batch_size": c.batch_size, "attempts": 1, "client_status": "ok" if c.completed else "errored"}
+        if c.completed:
+            rec["throughput_ips"] = c.completed * c.batch_size / c.wall_s
+            rec["avg_latency_us"] = int(c.latency_sum_ns / c.completed / 1000)
+            rec["avg_request_latency_us"] = rec["avg_latency_us"]
+            rec["p99_latency_us"] = int(summary["p99_latency_us"]) if summary else None
+        rec.update(envoy_overhead_avg=envoy_overhead_avg, envoy_overhead_std=envoy_overhead_std,
+                   gpu_util_avg=gpu_util_avg, gpu_util_std=gpu_util_std)
+        rows.append(rec)
+    duration = (time.time() - soak_start) / 3600
+    print(f"[Mode={mode}, n_clients={n_clients}] soak ran {duration:.2f} h over {monitor.n_windows} windows; "
+          f"drift: latency={monitor.drifting['latency']}, memory={monitor.drifting['memory']}")
+    df = pd.DataFrame(rows)
+    return df.reindex(columns=[col for col in COLUMNS if col not in ['mode', 'n_servers']])
+
+class FakeTritonGrpc:
+    """
+    Local stand-in for Triton's gRPC inference service: answers every request for any model with
+    zeros after `compute_us`, and keeps the statistics loadgen reads. Used to test the generator
+    and to measure its own ceiling without a cluster.
+    """
+    def __init__(self, port: int, compute_us: float = 0.0, output_shape=(2,)):
+        self.port = port
+        self.compute_us = compute_us
+        self.output_shape = tuple(output_shape)
+        self.requests = 0
+        self.inferences = 0
+        self.request_ns = 0
+        self.compute_ns = 0
+        # Set by faults.SimulatedBackend: proxy delay, compute slowdown while servers are missing,
+        # and a monotonic time before which requests fail
+        self.delay_us = 0.0
+        self.slowdown = 1.0
+        self.unavailable_until = 0.0
+        self.failures = 0
+        self.total_ns = 0  # including the proxy delay, like envoy's downstream request time
+
+    def statistics(self, model_name: str):
+        def duration(ns):
+            return service_pb2.StatisticDuration(count=self.requests, ns=ns)
+        return service_pb2.ModelStatistics(
+            name=model_name or MODEL_NAME, version="1",
+            inference_count=self.inferences, execution_count=self.requests,
+            inference_stats=service_pb2.InferStatistics(
+                success=duration(self.request_ns),
+                queue=duration(0),
+                compute_input=duration(0),
+                compute_infer=duration(self.compute_ns),
+                compute_output=duration(0),
+            ),
+        )
+
+    def servicer(self):
+        fake = self
+
+        class Servicer(service_pb2_grpc.GRPCInferenceServiceServicer):
+            async def ServerLive(self, request, context):
+                return service_pb2.ServerLiveResponse(live=True)
+
+            async def ServerReady(self, request, context):
+                return service_pb2.ServerReadyResponse(ready=True)
+
+            async def ModelReady(self, request, context):
+                return service_pb2.ModelReadyResponse(ready=True)
+
+            async def ModelInfer(self, request, context):
+                arrival = time.perf_counter_ns()
+                if fake.delay_us:
+                    await asyncio.sleep(fake.delay_us / 1e6)
+                if time.monotonic() < fake.unavailable_until:
+                    fake.failures += 1
+                    await context.abort(grpc.StatusCode.UNAVAILABLE, "server unavailable (simulated fault)")
+                start = time.perf_counter_ns()
+                batch_size = request.inputs[0].shape[0] if request.inputs else 1
+                if fake.compute_us:
+                    await asyncio.sleep(fake.compute_us * fake.slowdown / 1e6)
+                compute_end = time.perf_counter_ns()
+                output = np.zeros((batch_size,) + fake.output_shape, dtype=np.float32)
+                fake.requests += 1
+                fake.inferences += batch_size
+                fake.compute_ns += compute_end - start
+                fake.request_ns += time.perf_counter_ns() - start
+                fake.total_ns += time.perf_counter_ns() - arrival
+                return service_pb2.ModelInferResponse(
+                    model_name=request.model_name, model_version="1", id=request.id,
+                    outputs=[service_pb2.ModelInferResponse.InferOutputTensor(
+                        name="output__0", datatype="FP32", shape=list(output.shape))],
+                    raw_output_contents=[output.tobytes()],
+                )
+
+            async def ModelStatistics(self, request, context):
+                return service_pb2.ModelStatisticsResponse(model_stats=[fake.statistics(request.name)])
+
+        return Servicer()
+
+    async def serve(self):
+        server = grpc.aio.server()
+        service_pb2_grpc.add_GRPCInferenceServiceServicer_to_server(self.servicer(), server)
+        server.add_insecure_port(f"127.0.0.1:{self.port}")
+        await server.start()
+        try:
+            await server.wait_for_termination()
+        finally:
+            # Cancelled by the caller: without an explicit stop the server's threads keep
+            # asyncio.run from returning
+            await server.stop(None)
+
+def self_benchmark(port: int, client_counts, request_count: int, concurrency: int):
+    """
+    Throughput of the generator against a zero-latency fake server in a separate process:
+    the highest rate this engine can produce, above which results measure the client, not Triton.
+    """
+    server = subprocess.Popen([sys.executable, __file__, "--fake-server", str(port)])
+    url = f"127.0.0.1:{port}"
+    try:
+        time.sleep(2)
+        rows = []
+        for n_clients in client_counts:
+            results = pd.DataFrame(asyncio.run(run_load(url, n_clients, request_count, concurrency)))
+            rows.append({
+                "n_clients": n_clients,
+                "throughput_ips": results["throughput_ips"].sum(),
+                "requests_per_s": results["throughput_ips"].sum() / MODEL_BATCH_SIZE,
+                "avg_latency_us": results["avg_latency_us"].mean(),
+                "cpu_usage_cores": results["cpu_usage_cores"].iloc[0],
+            })
+        print(pd.DataFrame(rows).to_string(index=False))
+    finally:
+        server.terminate()
+        server.wait()
+
+async def simulate_faults(faults, n_clients: int, n_servers: int, request_count: int, concurrency: int,
+                          compute_us: float, port: int):
+    """
+    Run the faults of a step against a fake server standing in for n_servers servers (see
+    faults.SimulatedBackend). Returns the client rows, the live samples and the fault records.
+    """
+    fake = FakeTritonGrpc(port, compute_us)
+    backend = SimulatedBackend(fake, n_servers)
+    server = asyncio.create_task(fake.serve())
+    await asyncio.sleep(1)
+    injector = FaultInjector(faults, backend, step=0)
+    live = []
+    last = {"t": time.monotonic(), "failures": 0, "requests": 0, "total_ns": 0}
+
+    def on_poll(running_clients, errors):
+        now = time.monotonic()
+        requests = fake.requests - last["requests"]
+        live.append({
+            "timestamp": datetime.utcnow().isoformat(),
+            "running_clients": running_clients,
+            "running_servers": backend.server_count(),
+            "total_latency": (fake.total_ns - last["total_ns"]) / requests / 1e6 if requests else None,
+            "failure_rate": (fake.failures - last["failures"]) / (now - last["t"]),
+            "active_faults": active_faults(),
+        })
+        last.update(t=now, failures=fake.failures, requests=fake.requests, total_ns=fake.total_ns)
+
+    injector.start()
+    try:
+        rows = await run_load(f"127.0.0.1:{port}", n_clients, request_count, concurrency, on_poll=on_poll)
+    finally:
+        events = injector.stop()
+        server.cancel()
+    return rows, pd.DataFrame(live), pd.DataFrame(events)
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio Triton gRPC load generator")
+    parser.add_argument("--url", default=endpoint_url("supersonic"), help="Triton gRPC endpoint host:port")
+    parser.add_argument("--clients", type=int, default=1, help="logical clients")
+    parser.add_argument("--request-count", type=int, default=1000, help="requests per logical client")
+    parser.add_argument("--concurrency", type=int, default=LOADGEN_CONCURRENCY, help="in-flight requests per client")
+    parser.add_argument("--rate", type=float, help="requests per second per client (default: as fast as possible)")
+    parser.add_argument("--rel-ci", type=float,
+                        help="run until throughput and p99 CIs are within this relative width (ignores --request-count)")
+    parser.add_argument("--payload-dir", help="precomputed payload directory (see payloads.py)")
+    parser.add_argument("--fake-server", type=int, metavar="PORT", help="serve a fake Triton on PORT and exit on interrupt")
+    parser.add_argument("--compute-us", type=float, default=0.0, help="latency of the fake server")
+    parser.add_argument("--self-benchmark", type=int, metavar="PORT",
+                        help="measure the generator's own ceiling against a fake server on PORT")
+    parser.add_argument("--simulate-faults", metavar="JSON",
+                        help='faults of a step, e.g. \'[{"action": "kill_servers", "at_s": 10}]\', run against a fake server')
+    parser.add_argument("--servers", type=int, default=2, help="servers the fake server stands in for with --simulate-faults")
+    args = parser.parse_args()
+
+    if args.simulate_faults:
+        rows, live, events = asyncio.run(simulate_faults(json.loads(args.simulate_faults), args.clients, args.servers,
+                                                         args.request_count, args.concurrency, args.compute_us, 8101))
+        print(live.to_string(index=False))
+        print(summarize_faults(events, live).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+        print(f"{sum(row.get('throughput_ips', 0) for row in rows):.1f} infer/sec over {len(rows)} clients")
+    elif args.fake_server:
+        asyncio.run(FakeTritonGrpc(args.fake_server, args.compute_us).serve())
+    elif args.self_benchmark:
+        self_benchmark(args.self_benchmark, [1, 2, 4, 8, 16, 32], args.request_count, args.concurrency)
+    else:
+        rows = asyncio.run(run_load(args.url, args.clients, args.request_count, args.concurrency, args.rate,
+                                    payload_dir=args.payload_dir,
+                                    stopping=stopping_config({"rel_ci": args.rel_ci}) if args.rel_ci else None))
+        print(pd.DataFrame(rows).reindex(columns=[col for col in COLUMNS if col in rows[0]]).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 # Metrics and Prometheus querying functions for the benchmark
 import requests
 import numpy as np
-from config import PROMETHEUS_URL, DEPLOYMENT_NAME
+import triton_metrics
+from config import PROMETHEUS_URL, DEPLOYMENT_NAME, METRICS_SOURCE, MODEL_NAME
+from harness_metrics import instrumented
 
-def query_envoy_overhead() -> float or None:
+def query_params(query: str, at: float = None) -> dict:
+    """Prometheus query parameters; `at` (epoch seconds) pins the evaluation time, else it is the time of the request."""
+    return {"query": query} if at is None else {"query": query, "time": f"{at:.3f}"}
+
+@instrumented
+def query_envoy_overhead(at: float = None) -> float or None:
     query = (
         (
             'sum by (pod)('
@@ -19,7 +26,7 @@ def query_envoy_overhead() -> float or None:
             ')'
         )
     )
-    response = requests.get(PROMETHEUS_URL, params={"query": query}, verify=True)
+    response = requests.get(PROMETHEUS_URL, params=query_params(query, at), verify=True)
     response.raise_for_status()
     data = response.json().get("data", {}).get("result", [])
     values = [
@@ -33,9 +40,14 @@ def query_envoy_overhead() -> float or None:
     print(f"Prometheus envoy_overhead sample: {total}")
     return total
 
-def query_gpu_utilization() -> float or None:
+@instrumented
+def query_gpu_utilization(at: float = None) -> float or None:
+    if METRICS_SOURCE == "triton":
+        avg_util = triton_metrics.gpu_utilization()
+        print(f"Triton gpu_utilization sample: {avg_util}")
+        return avg_util
     query = 'avg by(gpu)(avg_over_time(nv_gpu_utilization[30s]))'
-    response = requests.get(PROMETHEUS_URL, params={"query": query}, verify=True)
+    response = requests.get(PROMETHEUS_URL, params=query_params(query, at), verify=True)
     response.raise_for_status()
     data = response.json().get("data", {}).get("result", [])
     values = [
@@ -49,7 +61,8 @@ def query_gpu_utilization() -> float or None:
     print(f"Prometheus gpu_utilization sample: {avg_util}")
     return avg_util
 
-def query_total_latency() -> float or None:
+@instrumented
+def query_total_latency(at: float = None) -> float or None:
     query = (
         (
             'sum by (pod)('
@@ -59,7 +72,7 @@ def query_total_latency() -> float or None:
             ')'
         )
     )
-    response = requests.get(PROMETHEUS_URL, params={"query": query}, verify=True)
+    response = requests.get(PROMETHEUS_URL, params=query_params(query, at), verify=True)
     response.raise_for_status()
     data = response.json().get("data", {}).get("result", [])
     values = [
@@ -71,4 +84,39 @@ def query_total_latency() -> float or None:
         return None
     total = sum(values)
     print(f"Prometheus total_latency sample: {total}")
-    return total 
\ No newline at end of file
+    return total
+
+@instrumented
+def query_failure_rate(at: float = None) -> float or None:
+    """
+    Failed requests per second: the failures Triton counted plus the requests Envoy saw fail
+    upstream (resets, 5xx, connection failures), which are all a killed server leaves behind.
+    The Envoy counters only exist in supersonic mode.
+    """
+    release = 'release="' + str(DEPLOYMENT_NAME) + '"'
+    queries = [
+        'sum(rate(nv_inference_request_failure{model="' + MODEL_NAME + '"}[30s]))',
+        'sum(rate(envoy_cluster_upstream_rq_xx{' + release + ',envoy_response_code_class="5"}[30s]))',
+    ] + ['sum(rate(envoy_cluster_upstream_' + counter + '{' + release + '}[30s]))'
+         for counter in ("rq_rx_reset", "rq_tx_reset", "rq_timeout", "rq_pending_failure_eject")]
+    total = None
+    for query in queries:
+        response = requests.get(PROMETHEUS_URL, params=query_params(query, at), verify=True)
+        response.raise_for_status()
+        data = response.json().get("data", {}).get("result", [])
+        values = [float(item["value"][1]) for item in data if item.get("value") and item["value"][1] != "NaN"]
+        if values:
+            total = (total or 0.0) + sum(values)
+    return total
+
+@instrumented
+def query_server_memory(at: float = None):
+    """(GPU, CPU) memory in bytes used by all Triton servers, each None if unavailable."""
+    totals = []
+    for metric in ("nv_gpu_memory_used_bytes", "nv_cpu_memory_used_bytes"):
+        response = requests.get(PROMETHEUS_URL, params=query_params(f"sum({metric})", at), verify=True)
+        response.raise_for_status()
+        data = response.json().get("data", {}).get("result", [])
+        values = [float(item["value"][1]) for item in data if item.get("value") and item["value"][1] != "NaN"]
+        totals.append(sum(values) if values else None)
+    return tuple(totals)
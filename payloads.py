@@ -0,0 +1,116 @@
+# Precomputed request payloads on the shared volume, generated once and reused by every client
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from config import MODEL_INPUTS, MODEL_INPUT_DTYPE, PAYLOADS, PAYLOAD_DIR
+
+INPUT_DATA_JSON = "input_data.json"  # perf_analyzer --input-data file
+NUMPY_DTYPES = {"FP32": np.float32, "FP16": np.float16, "INT32": np.int32, "INT64": np.int64}
+
+def spec_hash(spec: dict) -> str:
+    """Key of a payload: the spec, the model inputs it is generated for and the content of its sample file."""
+    digest = hashlib.sha256(json.dumps([spec, MODEL_INPUTS, MODEL_INPUT_DTYPE], sort_keys=True).encode())
+    if "npz" in spec:
+        with open(spec["npz"], "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def draw(dist: dict, size, rng):
+    """Samples of a {"dist": ..., params} spec; lengths use poisson/uniform, values normal/uniform."""
+    kind = dist.get("dist", "normal")
+    if kind == "normal":
+        return rng.normal(dist.get("mean", 0.0), dist.get("std", 1.0), size)
+    if kind == "uniform":
+        return rng.uniform(dist.get("low", 0.0), dist.get("high", 1.0), size)
+    if kind == "poisson":
+        return rng.poisson(dist["mean"], size)
+    if kind == "constant":
+        return np.full(size, dist["value"])
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+def generate(spec: dict) -> dict:
+    """
+    {input name: array of shape [n_samples, *shape]} following the spec.
+    Inputs listed in a "collections" group share a variable-length last axis: entries past the drawn
+    length are zero and the group's mask input is 1 only on the filled entries, like zero-padded
+    particles of a jet.
+    """
+    if "npz" in spec:
+        samples = np.load(spec["npz"])
+        missing = [name for name in MODEL_INPUTS if name not in samples]
+        if missing:
+            raise ValueError(f"{spec['npz']} has no arrays for inputs {missing}")
+        return {name: np.asarray(samples[name]) for name in MODEL_INPUTS}
+
+    rng = np.random.default_rng(spec.get("seed", 0))
+    n = spec.get("n_samples", 1024)
+    dtype = NUMPY_DTYPES[MODEL_INPUT_DTYPE]
+    values = spec.get("values", {"dist": "normal"})
+    arrays = {name: draw(values, [n] + list(shape), rng).astype(dtype) for name, shape in MODEL_INPUTS.items()}
+    for group_name, group in spec.get("collections", {}).items():
+        width = MODEL_INPUTS[group["inputs"][0]][-1]
+        lengths = np.clip(draw(group["length"], n, rng), 1, width).astype(int)
+        filled = (np.arange(width)[None, :] < lengths[:, None]).astype(dtype)  # [n, width]
+        for name in group["inputs"]:
+            if MODEL_INPUTS[name][-1] != width:
+                raise ValueError(f"Input {name} of collection {group_name!r} does not have length {width}")
+            arrays[name] *= filled[:, None, :]
+        if "mask" in group:
+            arrays[group["mask"]] = np.broadcast_to(filled[:, None, :], arrays[group["mask"]].shape).astype(dtype)
+    return arrays
+
+def write_payload(arrays: dict, out_dir: str):
+    """One .npy per input (memory-mapped by loadgen.py) and a base64 --input-data file for perf_analyzer."""
+    os.makedirs(out_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    n = len(next(iter(arrays.values())))
+    data = [
+        {name: {"b64": base64.b64encode(array[i].tobytes()).decode(), "shape": list(array.shape[1:])}
+         for name, array in arrays.items()}
+        for i in range(n)
+    ]
+    with open(os.path.join(out_dir, INPUT_DATA_JSON), "w") as f:
+        json.dump({"data": data}, f)
+
+def ensure_payload(name: str, root: str = PAYLOAD_DIR) -> str:
+    """Directory of the payload named in config.PAYLOADS, generating it on first use."""
+    if name not in PAYLOADS:
+        raise ValueError(f"Unknown payload {name!r}, expected one of {sorted(PAYLOADS)}")
+    spec = PAYLOADS[name]
+    out_dir = os.path.join(root, f"{name}-{spec_hash(spec)}")
+    if os.path.exists(os.path.join(out_dir, INPUT_DATA_JSON)):
+        return out_dir
+    # Built under a temporary name and renamed, so clients never see a partial payload
+    tmp_dir = f"{out_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    write_payload(generate(spec), tmp_dir)
+    try:
+        os.rename(tmp_dir, out_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir)  # generated concurrently by another runner
+    print(f"Generated payload {name} in {out_dir}")
+    return out_dir
+
+def load_payload(payload_dir: str) -> dict:
+    """Memory-mapped {input name: [n_samples, *shape]} arrays of a payload."""
+    return {name: np.load(os.path.join(payload_dir, f"{name}.npy"), mmap_mode="r") for name in MODEL_INPUTS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the request payloads defined in config.PAYLOADS")
+    parser.add_argument("names", nargs="*", help="payloads to generate (default: all)")
+    parser.add_argument("--root", default=PAYLOAD_DIR, help="shared payload directory")
+    args = parser.parse_args()
+    for name in args.names or sorted(PAYLOADS):
+        payload_dir = ensure_payload(name, args.root)
+        arrays = load_payload(payload_dir)
+        sizes = ", ".join(f"{key} {list(array.shape)}" for key, array in arrays.items())
+        print(f"{name}: {payload_dir} ({sizes})")
+
+if __name__ == "__main__":
+    main()
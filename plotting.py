@@ -11,6 +11,9 @@ import sys
 import warnings
 from matplotlib.lines import Line2D
 import matplotlib.ticker as mticker
+from analysis import (find_repetitions, align_live_to_steps, load_step_summaries, latency_breakdown, LATENCY_COMPONENTS,
+                      sequence_efficiency, GPU_HOUR_COST)
+from downsample import read_csv_chunks, decimated_series
 
 # Add logging
 import logging
@@ -64,6 +67,102 @@ def safe_read_csv(file_path):
         logger.error(f"Error reading file {file_path}: {e}")
         return None
 
+def plot_latency_breakdown(step_summaries, plots_dir):
+    """
+    Stacked bars of the latency components of every (sequence, n_servers, n_clients) combination,
+    averaged over repetitions. Also saves the underlying table as latency_breakdown.csv.
+    """
+    breakdown = latency_breakdown(step_summaries)
+    group_cols = ['sequence', 'mode', 'n_servers', 'n_clients']
+    component_cols = [col for col, _ in LATENCY_COMPONENTS]
+    table = breakdown.groupby(group_cols, sort=False)[['avg_latency_us'] + component_cols].mean().reset_index()
+    if 'client_saturated' in step_summaries.columns:
+        saturated = step_summaries.groupby(group_cols, sort=False)['client_saturated'].any().reset_index()
+        table = table.merge(saturated, on=group_cols, how='left')
+        table['client_saturated'] = table['client_saturated'].fillna(False).astype(bool)
+    else:
+        table['client_saturated'] = False
+    table_path = os.path.join(plots_dir, 'latency_breakdown.csv')
+    table.to_csv(table_path, index=False)
+    logger.info(f"Saved latency breakdown table to {table_path}")
+
+    labels = [
+        f"{SEQUENCE_LABELS.get(row['sequence'], row['sequence'])}\n{row['n_servers']} srv, {row['n_clients']} cl"
+        + (" (client-bound)" if row['client_saturated'] else "")
+        for _, row in table.iterrows()
+    ]
+    fig, ax = plt.subplots(figsize=(max(10, 0.9 * len(table)), 8))
+    bottom = pd.Series(0.0, index=table.index)
+    colors = ['tab:gray', 'tab:red', 'tab:orange', 'tab:blue', 'tab:green']
+    for (col, label), color in zip(LATENCY_COMPONENTS, colors):
+        values = table[col].fillna(0.0) / 1000.0
+        ax.bar(range(len(table)), values, bottom=bottom, color=color, label=label)
+        bottom += values
+    ax.scatter(range(len(table)), table['avg_latency_us'] / 1000.0, color='black', marker='_', s=300,
+               zorder=3, label='Client avg. latency')
+    ax.set_xticks(range(len(table)))
+    ax.set_xticklabels(labels, rotation=90, fontsize=12)
+    ax.set_ylabel('Latency, ms')
+    ymax = max(bottom.max(), (table['avg_latency_us'] / 1000.0).max())
+    ax.set_ylim(0, ymax * 1.6 if ymax > 0 else 1)
+    ax.legend(loc='upper left', fontsize=14, frameon=False)
+    ax.grid(True, axis='y', alpha=0.7, linewidth=1.2)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        plt.tight_layout()
+    plot_path = os.path.join(plots_dir, 'latency_breakdown.png')
+    plt.savefig(plot_path, dpi=300, bbox_inches='tight')
+    plt.savefig(os.path.splitext(plot_path)[0] + '.pdf', bbox_inches='tight')
+    logger.info(f"Saved latency breakdown plot to {plot_path}")
+    plt.close()
+
+def plot_cost_pareto(step_summaries, plots_dir):
+    """
+    p99 latency vs cost per million inferences of every sequence (fixed server counts and SuperSONIC),
+    with the Pareto front of the points no other sequence beats on both. Also saves the table as
+    cost_efficiency.csv.
+    """
+    table = sequence_efficiency(step_summaries)
+    table_path = os.path.join(plots_dir, 'cost_efficiency.csv')
+    table.to_csv(table_path, index=False)
+    logger.info(f"Saved cost/efficiency table to {table_path}")
+    for _, row in table.iterrows():
+        print(f"{row['sequence']}: {row['inferences_per_gpu_s']:.1f} inferences per GPU-second, "
+              f"{row['cost_per_million']:.3f} per million inferences")
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    tick_fontsize = ax.xaxis.get_ticklabels()[0].get_fontsize() if ax.xaxis.get_ticklabels() else 12
+    for _, row in table.iterrows():
+        color = 'tab:red' if row['mode'] == 'supersonic' else 'tab:blue'
+        ax.errorbar(row['cost_per_million'], row['p99_latency_us'] / 1000.0,
+                    xerr=row['cost_per_million_std'], yerr=row['p99_latency_us_std'] / 1000.0,
+                    fmt='o', color=color, capsize=5, markersize=8, linewidth=2)
+        ax.annotate(SEQUENCE_LABELS.get(row['sequence'], row['sequence']),
+                    (row['cost_per_million'], row['p99_latency_us'] / 1000.0),
+                    textcoords="offset points", xytext=DEFAULT_OFFSET, ha='left', fontsize=tick_fontsize*0.9,
+                    color=color)
+    front = table[table['pareto']].sort_values('cost_per_million')
+    ax.step(front['cost_per_million'], front['p99_latency_us'] / 1000.0, where='post',
+            color='gray', linestyle='--', linewidth=2)
+    legend_handles = [
+        Line2D([0], [0], color='tab:blue', linewidth=2, marker='o', markersize=8),
+        Line2D([0], [0], color='tab:red', linewidth=2, marker='o', markersize=8),
+        Line2D([0], [0], color='gray', linestyle='--', linewidth=2),
+    ]
+    ax.legend(legend_handles, ['Fixed number of Triton Inference Servers', 'SuperSONIC with load-based autoscaling',
+                               'Pareto front'], loc='upper right', fontsize=tick_fontsize*0.9)
+    ax.set_xlabel(f'Cost per million inferences (GPU-hour = {GPU_HOUR_COST:g})')
+    ax.set_ylabel('p99 Latency, ms')
+    ax.set_xlim(left=0)
+    ax.set_ylim(bottom=0)
+    ax.grid(True, alpha=0.7, linewidth=1.2)
+    plt.tight_layout()
+    plot_path = os.path.join(plots_dir, 'latency_vs_cost_pareto.png')
+    plt.savefig(plot_path, dpi=300, bbox_inches='tight')
+    plt.savefig(os.path.splitext(plot_path)[0] + '.pdf', bbox_inches='tight')
+    logger.info(f"Saved latency vs cost Pareto plot to {plot_path}")
+    plt.close()
+
 def plot_results(results_dir, keys):
     """
     Plot results from the benchmark runs.
@@ -83,24 +182,40 @@ def plot_results(results_dir, keys):
     logger.info(f"Created plots directory at {plots_dir}")
     
     all_data = []
+    all_step_summaries = []
     for key in keys:
         seq_dir = os.path.join(results_dir, key)
         if not os.path.exists(seq_dir):
             continue
-        # No rep_* subdirs, just files
-        rep_results = sorted(glob(os.path.join(seq_dir, 'results_rep*.csv')))
-        rep_live = sorted(glob(os.path.join(seq_dir, 'live_metrics_rep*.csv')))
+        # No rep_* subdirs, just files; pair them by repetition index rather than by sort order
         rep_averages = []
-        for results_csv, live_metrics_csv in zip(rep_results, rep_live):
-            df = safe_read_csv(results_csv)
-            df_live = safe_read_csv(live_metrics_csv)
-            if df is not None and not df.empty and df_live is not None and not df_live.empty:
+        for rep, files in find_repetitions(seq_dir).items():
+            df = safe_read_csv(files.get('results', ''))
+            df_steps = safe_read_csv(files.get('steps', ''))
+            live_rows, gpu_sum, gpu_count = 0, 0.0, 0
+            if 'live' in files:
+                # Live metrics of long runs are read in chunks rather than all at once
+                for chunk in read_csv_chunks(files['live'], usecols=['timestamp', 'gpu_util']):
+                    live_rows += len(chunk)
+                    if df_steps is not None:
+                        # Only count samples taken while a step was running, not during scaling in between
+                        chunk = align_live_to_steps(chunk, df_steps).dropna(subset=['step'])
+                    gpu_sum += chunk['gpu_util'].sum()
+                    gpu_count += chunk['gpu_util'].count()
+            if df is not None and not df.empty and live_rows:
                 rep_avg = {
                     'sequence': key,
                     'avg_latency_ms': df['avg_latency_us'].mean() / 1000.0,
-                    'gpu_util_percent': df_live['gpu_util'].mean() * 100
+                    'gpu_util_percent': gpu_sum / gpu_count * 100 if gpu_count else float('nan')
                 }
                 rep_averages.append(rep_avg)
+        step_summary = load_step_summaries(seq_dir)
+        if step_summary is not None:
+            step_summary['sequence'] = key
+            all_step_summaries.append(step_summary)
+            summary_path = os.path.join(plots_dir, f'step_summary_{key}.csv')
+            step_summary.to_csv(summary_path, index=False)
+            logger.info(f"Saved per-step summary to {summary_path}")
         if rep_averages:
             gpu_utils = [r['gpu_util_percent'] for r in rep_averages]
             print(f"Scatter plot GPU util values for {key}: {gpu_utils}")
@@ -127,21 +242,21 @@ def plot_results(results_dir, keys):
             'Total Latency, ms',
             'Avg. GPU utilization, %'
         ]
-        # Store all y data for headroom calculation
-        y_data = [[], [], [], []]
+        panel_columns = ['running_clients', 'running_servers', 'total_latency', 'gpu_util']
+        # Running maxima of the panels for the headroom calculation
+        y_max = [None, None, None, None]
         for live_metrics_csv in rep_live:
-            df = safe_read_csv(live_metrics_csv)
-            if df is not None:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                all_timestamps.append(df['timestamp'].min())
-                y_data[0].extend(df['running_clients'])
-                y_data[1].extend(df['running_servers'])
-                y_data[2].extend(df['total_latency'])
-                y_data[3].extend(df['gpu_util'] * 100)
-                axes[0].plot(df['timestamp'], df['running_clients'], color=colors[0], linewidth=4)
-                axes[1].plot(df['timestamp'], df['running_servers'], color=colors[1], linewidth=4)
-                axes[2].plot(df['timestamp'], df['total_latency'], color=colors[2], linewidth=4)
-                axes[3].plot(df['timestamp'], df['gpu_util'] * 100, color=colors[3], linewidth=4)
+            # Min/max decimated, so week-long runs plot a bounded number of points; the decimated
+            # series are cached next to the plots and only rows added since are read next time
+            cache_path = os.path.join(plots_dir, '.' + os.path.basename(live_metrics_csv).replace('.csv', f'_{key}.json'))
+            series = decimated_series(live_metrics_csv, panel_columns, cache_path=cache_path, scale={'gpu_util': 100})
+            for i, column in enumerate(panel_columns):
+                times, values = series[column].points()
+                if not len(times):
+                    continue
+                all_timestamps.append(pd.Timestamp(times[0]))
+                axes[i].plot(times, values, color=colors[i], linewidth=4)
+                y_max[i] = max(y_max[i], series[column].max()) if y_max[i] is not None else series[column].max()
         for ax in axes:
             ax.set_ylabel("")
         panel_bins = [3, 4, 3, 4]
@@ -152,8 +267,8 @@ def plot_results(results_dir, keys):
                 ax.legend([panel_labels[i]], loc='upper left', frameon=False)
             ax.yaxis.set_major_locator(mticker.MaxNLocator(nbins=panel_bins[i], prune=None))
         for i, ax in enumerate(axes):
-            if i < 3 and y_data[i]:
-                ymax = max(y_data[i])
+            if i < 3 and y_max[i] is not None:
+                ymax = y_max[i]
                 ax.set_ylim(0, ymax * 1.2 if ymax > 0 else 1)
             elif i == 3:
                 ax.set_ylim(0, 100)
@@ -180,6 +295,10 @@ def plot_results(results_dir, keys):
         logger.info(f"Saved time series plot to {plot_path}")
         plt.close()
 
+    if all_step_summaries:
+        plot_latency_breakdown(pd.concat(all_step_summaries, ignore_index=True), plots_dir)
+        plot_cost_pareto(pd.concat(all_step_summaries, ignore_index=True), plots_dir)
+
     if all_data:
         logger.info("Creating scatter plots")
         agg_df = pd.DataFrame(all_data)
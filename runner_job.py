@@ -0,0 +1,171 @@
+# Kubernetes Job running a harness entrypoint from a cached Python environment
+import os
+import hashlib
+import subprocess
+from glob import glob
+from kubernetes import client
+from config import NAMESPACE, RUNNER_IMAGE, RUNNER_VENV_ROOT
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REQUIREMENTS = os.path.join(HERE, "requirements.txt")
+
+def runner_files():
+    """
+    Everything the runner needs: all harness modules, experiment specs and the requirements they
+    are installed from. Specs are in experiments/ in a checkout, but next to the code inside a
+    runner pod (the deployer ships them on from there).
+    """
+    specs = [path for ext in ("*.yaml", "*.yml", "*.toml")
+             for path in glob(os.path.join(HERE, "experiments", ext)) + glob(os.path.join(HERE, ext))]
+    return sorted(glob(os.path.join(HERE, "*.py"))) + sorted(specs) + [REQUIREMENTS]
+
+def git_revision():
+    """Revision of the harness code: BENCHMARK_GIT_REV when shipped to the cluster, else the local checkout."""
+    if os.environ.get("BENCHMARK_GIT_REV"):
+        return os.environ["BENCHMARK_GIT_REV"]
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def requirements_hash():
+    with open(REQUIREMENTS, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+def bootstrap_script(entrypoint: str) -> str:
+    """
+    Shell script that copies the code from the ConfigMap and starts `entrypoint` without touching
+    the network when possible:
+    - a prebuilt image (see Dockerfile) already has these exact requirements installed;
+    - otherwise a virtualenv on the shared volume, keyed by the hash of requirements.txt, is reused;
+    - only the very first launch after a requirements change builds that virtualenv.
+    RUNNER_BOOTSTRAP_SECONDS tells the entrypoint how long this took.
+    """
+    req_hash = requirements_hash()
+    venv = f"{RUNNER_VENV_ROOT}/venv-{req_hash}"
+    return f"""
+set -e
+BOOTSTRAP_START=$(date +%s.%N)
+mkdir -p /benchmark
+cp /code/* /benchmark/
+cd /benchmark
+export PYTHONPATH=/benchmark:$PYTHONPATH
+if [ "$(cat /opt/runner-requirements.sha256 2>/dev/null)" = "{req_hash}" ]; then
+    PYTHON=python
+else
+    if [ ! -x {venv}/bin/python ]; then
+        echo "Building runner environment {venv}"
+        python -m venv {venv}.$HOSTNAME
+        {venv}.$HOSTNAME/bin/python -m pip install --no-cache-dir -q -r requirements.txt
+        mv -T {venv}.$HOSTNAME {venv} 2>/dev/null || rm -rf {venv}.$HOSTNAME
+    fi
+    PYTHON={venv}/bin/python
+fi
+export RUNNER_BOOTSTRAP_SECONDS=$($PYTHON -c "import time; print(round(time.time() - $BOOTSTRAP_START, 3))")
+echo "Runner bootstrap took $RUNNER_BOOTSTRAP_SECONDS s"
+exec $PYTHON {entrypoint}
+"""
+
+def apply_code_configmap(name: str, namespace: str = NAMESPACE, extra_files=()):
+    v1 = client.CoreV1Api()
+    data = {}
+    for path in runner_files() + list(extra_files):
+        with open(path, 'r') as f:
+            data[os.path.basename(path)] = f.read()
+    configmap = client.V1ConfigMap(
+        metadata=client.V1ObjectMeta(name=name, labels={"app": "sonic-benchmark"}),
+        data=data,
+    )
+    try:
+        v1.create_namespaced_config_map(namespace=namespace, body=configmap)
+    except client.exceptions.ApiException as e:
+        if e.status == 409:  # Already exists
+            v1.replace_namespaced_config_map(name=name, namespace=namespace, body=configmap)
+        else:
+            raise
+
+def create_runner_job(job_name: str, container_name: str, configmap_name: str, entrypoint: str,
+                      env: dict = None, namespace: str = NAMESPACE, extra_files=()):
+    """
+    Ship the code in a ConfigMap and (re)create a Job running `entrypoint` with it. extra_files
+    (e.g. a spec outside experiments/) are shipped too, flattened next to the code like the rest.
+    The revision of the shipped code is passed on as BENCHMARK_GIT_REV.
+    """
+    batch_v1 = client.BatchV1Api()
+    apply_code_configmap(configmap_name, namespace, extra_files)
+    env = {"BENCHMARK_GIT_REV": git_revision() or "", **(env or {})}
+    job = client.V1Job(
+        metadata=client.V1ObjectMeta(
+            name=job_name,
+            labels={"app": "sonic-benchmark"}
+        ),
+        spec=client.V1JobSpec(
+            template=client.V1PodTemplateSpec(
+                metadata=client.V1ObjectMeta(
+                    labels={"app": "sonic-benchmark"}
+                ),
+                spec=client.V1PodSpec(
+                    service_account_name="benchmark-sa",  # Use the new service account
+                    containers=[
+                        client.V1Container(
+                            name=container_name,
+                            image=RUNNER_IMAGE,
+                            command=["/bin/bash", "-c"],
+                            args=[bootstrap_script(entrypoint)],
+                            env=[
+                                client.V1EnvVar(name="POD_NAME", value_from=client.V1EnvVarSource(
+                                    field_ref=client.V1ObjectFieldSelector(field_path="metadata.name"))),
+                                client.V1EnvVar(name="POD_IP", value_from=client.V1EnvVarSource(
+                                    field_ref=client.V1ObjectFieldSelector(field_path="status.podIP"))),
+                            ] + [client.V1EnvVar(name=k, value=v) for k, v in env.items()],
+                            resources=client.V1ResourceRequirements(
+                                requests={
+                                    "memory": "2Gi",
+                                    "cpu": "1"
+                                },
+                                limits={
+                                    "memory": "4Gi",
+                                    "cpu": "2"
+                                }
+                            ),
+                            volume_mounts=[
+                                client.V1VolumeMount(
+                                    name="code",
+                                    mount_path="/code"
+                                ),
+                                client.V1VolumeMount(
+                                    name="af-shared-storage",
+                                    mount_path="/work"
+                                )
+                            ]
+                        )
+                    ],
+                    volumes=[
+                        client.V1Volume(
+                            name="code",
+                            config_map=client.V1ConfigMapVolumeSource(
+                                name=configmap_name
+                            )
+                        ),
+                        client.V1Volume(
+                            name="af-shared-storage",
+                            persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                                claim_name="af-shared-storage"
+                            )
+                        )
+                    ],
+                    restart_policy="Never"
+                )
+            )
+        )
+    )
+
+    try:
+        batch_v1.create_namespaced_job(namespace=namespace, body=job)
+    except client.exceptions.ApiException as e:
+        if e.status == 409:  # Already exists
+            batch_v1.delete_namespaced_job(name=job_name, namespace=namespace)
+            batch_v1.create_namespaced_job(namespace=namespace, body=job)
+        else:
+            raise
@@ -111,5 +111,58 @@ def create_service_account():
         else:
             raise
 
+    # Create ClusterRole: nodes are cluster-scoped, and the cordon_node fault (see faults.py) patches them
+    cluster_role = client.V1ClusterRole(
+        metadata=client.V1ObjectMeta(
+            name="benchmark-node-role"
+        ),
+        rules=[
+            client.V1PolicyRule(
+                api_groups=[""],
+                resources=["nodes"],
+                verbs=["get", "list", "patch"]
+            )
+        ]
+    )
+
+    try:
+        rbac_v1.create_cluster_role(body=cluster_role)
+        print("Created ClusterRole 'benchmark-node-role'")
+    except client.exceptions.ApiException as e:
+        if e.status == 409:  # Already exists
+            rbac_v1.replace_cluster_role(name="benchmark-node-role", body=cluster_role)
+            print("Updated ClusterRole 'benchmark-node-role'")
+        else:
+            raise
+
+    # Create ClusterRoleBinding
+    cluster_role_binding = client.V1ClusterRoleBinding(
+        metadata=client.V1ObjectMeta(
+            name="benchmark-node-role-binding"
+        ),
+        subjects=[
+            client.V1Subject(
+                kind="ServiceAccount",
+                name="benchmark-sa",
+                namespace="cms"
+            )
+        ],
+        role_ref=client.V1RoleRef(
+            api_group="rbac.authorization.k8s.io",
+            kind="ClusterRole",
+            name="benchmark-node-role"
+        )
+    )
+
+    try:
+        rbac_v1.create_cluster_role_binding(body=cluster_role_binding)
+        print("Created ClusterRoleBinding 'benchmark-node-role-binding'")
+    except client.exceptions.ApiException as e:
+        if e.status == 409:  # Already exists
+            rbac_v1.replace_cluster_role_binding(name="benchmark-node-role-binding", body=cluster_role_binding)
+            print("Updated ClusterRoleBinding 'benchmark-node-role-binding'")
+        else:
+            raise
+
 if __name__ == "__main__":
     create_service_account() 
\ No newline at end of file
@@ -0,0 +1,151 @@
+# Soak steps: steady load for hours or days with rotating output files, rolling summaries and drift detection
+import csv
+import os
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import SOAK_DEFAULTS, SOAK_HISTORY_POINTS
+
+def soak_config(soak) -> dict:
+    """exp["soak"] (True or a partial dict) merged over SOAK_DEFAULTS, or None for a regular step."""
+    if not soak:
+        return None
+    config = dict(SOAK_DEFAULTS)
+    if isinstance(soak, dict):
+        unknown = set(soak) - set(SOAK_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown soak options: {sorted(unknown)}")
+        config.update(soak)
+    for key, value in config.items():
+        if value is None and key == "duration_s":
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{key}: expected a positive number, got {value!r}")
+    for key in ("rolling_windows", "keep_files", "drift_min_points"):
+        config[key] = int(config[key])
+    return config
+
+class RotatingCsvWriter:
+    """
+    csv.DictWriter over a series of files <prefix>_partNNNN.csv: a new file is started once the
+    current one is rotate_s old or rotate_bytes large, and only the newest keep_files are kept.
+    """
+    def __init__(self, prefix: str, fieldnames, rotate_s: float, rotate_bytes: int, keep_files: int):
+        self.prefix = prefix
+        self.fieldnames = fieldnames
+        self.rotate_s = rotate_s
+        self.rotate_bytes = rotate_bytes
+        self.paths = deque()
+        self.keep_files = keep_files
+        self.part = 0
+        self.file = None
+        self._open()
+
+    def _open(self):
+        if self.file is not None:
+            self.file.close()
+        path = f"{self.prefix}_part{self.part:04d}.csv"
+        self.part += 1
+        self.file = open(path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames)
+        self.writer.writeheader()
+        self.opened = time.monotonic()
+        self.paths.append(path)
+        while len(self.paths) > self.keep_files:
+            os.remove(self.paths.popleft())
+
+    def writerow(self, row: dict):
+        if time.monotonic() - self.opened >= self.rotate_s or self.file.tell() >= self.rotate_bytes:
+            self._open()
+        self.writer.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def drift_per_hour(seconds, values) -> float:
+    """
+    Least-squares slope of a series per hour, relative to its mean (0.05: grows 5% of its level
+    per hour). None with fewer than 3 points or a zero mean.
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(values)
+    seconds, values = seconds[keep], values[keep]
+    if len(values) < 3 or np.ptp(seconds) == 0 or values.mean() == 0:
+        return None
+    slope = np.polyfit(seconds - seconds[0], values, 1)[0]
+    return float(slope * 3600 / abs(values.mean()))
+
+def _mean(values) -> float:
+    values = [v for v in values if v is not None and not np.isnan(v)]
+    return float(np.mean(values)) if values else None
+
+class SoakMonitor:
+    """
+    Rolling summaries of a soak step over its last rolling_windows measurement windows, and drift
+    detection: the relative per-hour slopes of p99 latency and server memory over those windows
+    (short term) and over SOAK_HISTORY_POINTS past rolling means (long term, for slow leaks).
+    Memory does not grow with the duration of the step.
+    """
+    def __init__(self, config: dict):
+        self.config = config
+        self.windows = deque(maxlen=config["rolling_windows"])
+        self.history = deque(maxlen=SOAK_HISTORY_POINTS)
+        self.samples = []  # server samples of the current window, (gpu_util, gpu_memory, cpu_memory)
+        self.n_windows = 0
+        self.drifting = {"latency": False, "memory": False}
+
+    def observe(self, gpu_util=None, gpu_memory=None, cpu_memory=None):
+        """One server-side sample, attributed to the window in progress (called from the poll thread)."""
+        self.samples.append((gpu_util, gpu_memory, cpu_memory))
+
+    def _drift(self, points) -> tuple:
+        if len(points) < 3:
+            return None, None
+        seconds = [p["t"] for p in points]
+        latency = drift_per_hour(seconds, [p["p99_latency_us"] for p in points])
+        memory = [drift_per_hour(seconds, [p[key] for p in points]) for key in ("gpu_memory_bytes", "cpu_memory_bytes")]
+        memory = [m for m in memory if m is not None]
+        return latency, max(memory) if memory else None
+
+    def add_window(self, end: float, throughput_ips: float, p99_latency_us: float) -> dict:
+        """Record a finished window (end in epoch seconds) and return the rolling summary row."""
+        samples, self.samples = self.samples, []
+        self.windows.append({
+            "t": end, "throughput_ips": throughput_ips, "p99_latency_us": p99_latency_us,
+            "gpu_util": _mean(s[0] for s in samples),
+            "gpu_memory_bytes": _mean(s[1] for s in samples),
+            "cpu_memory_bytes": _mean(s[2] for s in samples),
+        })
+        self.n_windows += 1
+        rolling = {key: _mean(w[key] for w in self.windows) for key in self.windows[0]}
+        if self.n_windows % self.config["rolling_windows"] == 0:
+            self.history.append(rolling)
+        short = self._drift(self.windows) if len(self.windows) >= self.config["drift_min_points"] else (None, None)
+        long = self._drift(self.history)
+        flags = {}
+        for i, (kind, threshold) in enumerate((("latency", self.config["latency_drift_per_hour"]),
+                                              ("memory", self.config["memory_drift_per_hour"]))):
+            flags[kind] = any(d is not None and d > threshold for d in (short[i], long[i]))
+            if flags[kind] and not self.drifting[kind]:
+                worst = max(d for d in (short[i], long[i]) if d is not None)
+                print(f"[soak] WARNING: {kind} drift of {worst:+.1%} per hour (threshold {threshold:.1%})")
+            self.drifting[kind] = flags[kind]
+        return {
+            "end": datetime.utcfromtimestamp(end).isoformat(),
+            "windows": len(self.windows),
+            "throughput_ips": rolling["throughput_ips"],
+            # Median rather than mean, so a single slow window does not move the rolling p99
+            "p99_latency_us": float(np.median([w["p99_latency_us"] for w in self.windows])),
+            "gpu_util": rolling["gpu_util"],
+            "gpu_memory_bytes": rolling["gpu_memory_bytes"],
+            "cpu_memory_bytes": rolling["cpu_memory_bytes"],
+            "latency_drift_per_hour": short[0], "memory_drift_per_hour": short[1],
+            "long_latency_drift_per_hour": long[0], "long_memory_drift_per_hour": long[1],
+            "latency_drift": flags["latency"], "memory_drift": flags["memory"],
+        }
@@ -0,0 +1,170 @@
+# Execution order of sequence repetitions that minimizes server scale transitions
+import json
+import os
+import pandas as pd
+from config import TIMINGS_CSV
+
+PLAN_JSON = "plan.json"
+HELD_KARP_MAX = 12  # exact search up to this many units, heuristic above
+
+def step_reset(step: dict, optimized: bool) -> bool:
+    """
+    Whether servers are scaled to zero before a step. A step asking for a cold start is always
+    reset; the optimized order resets nowhere else, otherwise restart_servers (default True) applies.
+    """
+    if step.get("cold_start", False):
+        return True
+    return not optimized and step.get("restart_servers", True)
+
+class TransitionCost:
+    """Expected scale_down/scale_up seconds between deployment states (mode, n_servers), from a PhaseModel."""
+    def __init__(self, model):
+        self.model = model
+
+    def step(self, state, step: dict, reset: bool) -> float:
+        mode, n_servers = step["mode"], step["n_servers"]
+        if reset:
+            return self.model.median("scale_down") + self.model.median("scale_up_cold", mode=mode, n_servers=n_servers)
+        if state is None or n_servers > state[1]:
+            # New pods have to load the model
+            return self.model.median("scale_up_cold", mode=mode, n_servers=n_servers)
+        return self.model.median("scale_up_warm", mode=mode, n_servers=n_servers)
+
+    def unit(self, state, steps, optimized: bool):
+        """Cost of running all steps of a unit from `state`, and the state it leaves behind."""
+        total = 0.0
+        for step in steps:
+            total += self.step(state, step, step_reset(step, optimized))
+            state = (step["mode"], step["n_servers"])
+        return total, state
+
+    def order(self, units, sequences: dict, optimized: bool) -> float:
+        total, state = 0.0, None
+        for key, _ in units:
+            cost, state = self.unit(state, sequences[key], optimized)
+            total += cost
+        return total
+
+def held_karp(n: int, start_cost, edge_cost):
+    """Exact cheapest open path visiting all n nodes (asymmetric costs), O(2^n n^2)."""
+    full = 1 << n
+    best = [[float("inf")] * n for _ in range(full)]
+    parent = [[-1] * n for _ in range(full)]
+    for j in range(n):
+        best[1 << j][j] = start_cost[j]
+    for mask in range(1, full):
+        for j in range(n):
+            cost = best[mask][j]
+            if cost == float("inf"):
+                continue
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                nxt = mask | (1 << k)
+                if cost + edge_cost[j][k] < best[nxt][k]:
+                    best[nxt][k] = cost + edge_cost[j][k]
+                    parent[nxt][k] = j
+    last = min(range(n), key=lambda j: best[full - 1][j])
+    path, mask = [], full - 1
+    while last != -1:
+        path.append(last)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return path[::-1]
+
+def nearest_neighbor_2opt(n: int, start_cost, edge_cost):
+    """
+    Greedy path improved by segment reversals (2-opt) and single-unit moves (or-opt) until neither
+    helps. With asymmetric costs a reversal also flips its inner edges, so moves are scored on the
+    whole path.
+    """
+    def path_cost(path):
+        return start_cost[path[0]] + sum(edge_cost[a][b] for a, b in zip(path, path[1:]))
+
+    remaining = set(range(n))
+    current = min(remaining, key=lambda j: start_cost[j])
+    path = [current]
+    remaining.remove(current)
+    while remaining:
+        current = min(remaining, key=lambda j: (edge_cost[current][j], j))
+        path.append(current)
+        remaining.remove(current)
+
+    best_cost = path_cost(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                candidate = path[:i] + path[i:j + 1][::-1] + path[j + 1:]
+                cost = path_cost(candidate)
+                if cost < best_cost - 1e-9:
+                    path, best_cost, improved = candidate, cost, True
+        for i in range(n):
+            rest = path[:i] + path[i + 1:]
+            for j in range(n):
+                candidate = rest[:j] + [path[i]] + rest[j:]
+                cost = path_cost(candidate)
+                if cost < best_cost - 1e-9:
+                    path, best_cost, improved = candidate, cost, True
+                    break
+    return path
+
+def plan_order(units, sequences: dict, model) -> dict:
+    """
+    Order the (sequence, repetition) units to minimize the expected scale transition time. Steps
+    inside a unit keep their order; only the entry transition of each unit depends on its
+    predecessor, which makes this an asymmetric open-path TSP over the units.
+    """
+    costs = TransitionCost(model)
+    entry = [sequences[key][0] for key, _ in units]
+    internal, exits = [], []
+    for key, _ in units:
+        # Cost of the steps after the first, which does not depend on the order
+        state = (sequences[key][0]["mode"], sequences[key][0]["n_servers"])
+        cost, state = costs.unit(state, sequences[key][1:], optimized=True)
+        internal.append(cost)
+        exits.append(state)
+    n = len(units)
+    start_cost = [costs.step(None, entry[j], step_reset(entry[j], True)) + internal[j] for j in range(n)]
+    edge_cost = [[costs.step(exits[i], entry[j], step_reset(entry[j], True)) + internal[j] for j in range(n)]
+                 for i in range(n)]
+    if n <= HELD_KARP_MAX:
+        path, method = held_karp(n, start_cost, edge_cost), "held_karp"
+    else:
+        path, method = nearest_neighbor_2opt(n, start_cost, edge_cost), "nearest_neighbor_2opt"
+    order = [units[j] for j in path]
+    return {
+        "method": method,
+        "baseline_order": [list(unit) for unit in units],
+        "order": [list(unit) for unit in order],
+        # The spec order under the same reset policy, so the savings are those of the order alone
+        "projected_baseline_s": costs.order(units, sequences, optimized=True),
+        "projected_optimized_s": costs.order(order, sequences, optimized=True),
+        # The spec order as it runs without optimize_order, resetting where restart_servers asks
+        "projected_restarts_s": costs.order(units, sequences, optimized=False),
+    }
+
+def save_plan(run_dir: str, plan: dict):
+    with open(os.path.join(run_dir, PLAN_JSON), "w") as f:
+        json.dump(plan, f, indent=2)
+
+def print_plan(plan: dict):
+    saved = plan["projected_baseline_s"] - plan["projected_optimized_s"]
+    print(f"Execution order ({plan['method']}): " + ", ".join(f"{key}#{rep}" for key, rep in plan["order"]))
+    print(f"Projected scale transitions: {plan['projected_baseline_s'] / 60:.1f} min in spec order, "
+          f"{plan['projected_optimized_s'] / 60:.1f} min optimized ({saved / 60:.1f} min saved); "
+          f"{plan['projected_restarts_s'] / 60:.1f} min in spec order with its server restarts")
+
+def report_savings(run_dir: str, plan: dict):
+    """Compare the traced scale transition time of the run with the projections, and store it in plan.json."""
+    path = os.path.join(run_dir, TIMINGS_CSV)
+    if not os.path.exists(path):
+        return
+    timings = pd.read_csv(path)
+    actual = float(timings.loc[timings["phase"].isin(["scale_down", "scale_up"]), "duration_s"].sum())
+    plan["actual_transition_s"] = actual
+    plan["actual_savings_s"] = plan["projected_baseline_s"] - actual
+    save_plan(run_dir, plan)
+    print(f"Scale transitions took {actual / 60:.1f} min (projected {plan['projected_optimized_s'] / 60:.1f} min); "
+          f"{plan['actual_savings_s'] / 60:.1f} min saved against the projected spec-order "
+          f"{plan['projected_baseline_s'] / 60:.1f} min")
@@ -0,0 +1,65 @@
+# Adaptive stopping: measure in time windows until throughput and p99 latency are precise enough
+import math
+import re
+import numpy as np
+from config import STOPPING_DEFAULTS
+
+# perf_analyzer prints one line per measurement window in verbose mode (-v): the latency is the
+# average, or the --percentile it is asked for
+PASS_PATTERN = re.compile(r"Pass \[(\d+)\] throughput: ([\d.]+) infer/sec\. (Avg|p99) latency: (\d+) usec")
+
+# Two-sided 95% Student t quantiles by degrees of freedom; the normal value beyond the table
+T_975 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def stopping_config(stopping) -> dict:
+    """exp["stopping"] (True or a partial dict) merged over STOPPING_DEFAULTS, or None for fixed request_count."""
+    if not stopping:
+        return None
+    config = dict(STOPPING_DEFAULTS)
+    if isinstance(stopping, dict):
+        unknown = set(stopping) - set(STOPPING_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown stopping options: {sorted(unknown)}")
+        config.update(stopping)
+    return config
+
+def relative_ci(values) -> float:
+    """Half-width of the 95% confidence interval of the mean of `values`, relative to the mean."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2 or values.mean() == 0:
+        return None
+    t = T_975[len(values) - 2] if len(values) - 1 <= len(T_975) else 1.96
+    return float(t * values.std(ddof=1) / math.sqrt(len(values)) / abs(values.mean()))
+
+def window_precision(throughputs, p99s, warmup: int = 1) -> dict:
+    """Achieved precision over per-window measurements, discarding the first `warmup` windows."""
+    throughputs, p99s = list(throughputs)[warmup:], list(p99s)[warmup:]
+    return {
+        "n_trials": len(throughputs),
+        "throughput_ci_rel": relative_ci(throughputs),
+        "p99_ci_rel": relative_ci(p99s),
+    }
+
+def is_precise(precision: dict, rel_ci: float, min_trials: int = 3) -> bool:
+    return (precision["n_trials"] >= min_trials
+            and precision["throughput_ci_rel"] is not None and precision["throughput_ci_rel"] <= rel_ci
+            and precision["p99_ci_rel"] is not None and precision["p99_ci_rel"] <= rel_ci)
+
+def perf_analyzer_flags(config: dict) -> str:
+    """
+    perf_analyzer options replacing --request-count: fixed-length windows repeated until the last
+    three agree within rel_ci (its stability criterion, on p99 latency), at most max_seconds.
+    """
+    window_ms = int(config["window_s"] * 1000)
+    max_trials = max(3, math.ceil(config["max_seconds"] / config["window_s"]))
+    return (f"--measurement-mode time_windows --measurement-interval {window_ms} "
+            f"--stability-percentage {config['rel_ci'] * 100:g} --max-trials {max_trials} --percentile=99")
+
+def parse_passes(log_text: str) -> dict:
+    """Precision achieved by a perf_analyzer pod, from its per-window "Pass [n]" lines."""
+    passes = [p for p in PASS_PATTERN.findall(log_text) if p[2] == "p99"]
+    if not passes:
+        return {"n_trials": None, "throughput_ci_rel": None, "p99_ci_rel": None}
+    return window_precision([float(tp) for _, tp, _, _ in passes], [float(p99) for _, _, _, p99 in passes])
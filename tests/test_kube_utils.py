@@ -0,0 +1,40 @@
+import pytest
+import kube_utils
+from config import SUPERSONIC_MIN_REPLICAS
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """Deployment replicas and ready servers, one state per poll; the last one repeats."""
+    states = []
+
+    def poll(key):
+        state = states[0] if len(states) == 1 else states.pop(0)
+        return state[key]
+
+    monkeypatch.setattr(kube_utils, "deployment_replicas", lambda name, namespace: poll("replicas"))
+    monkeypatch.setattr(kube_utils, "ready_servers", lambda namespace: [f"triton-{i}" for i in range(poll("ready"))])
+    monkeypatch.setattr(kube_utils.time, "sleep", lambda seconds: None)
+    return states
+
+def test_bare_triton_needs_exactly_the_requested_servers():
+    assert kube_utils.servers_settled("bare_triton", 2, 2, 2)
+    assert not kube_utils.servers_settled("bare_triton", 2, 3, 3)  # scale-down still in progress
+    assert not kube_utils.servers_settled("bare_triton", 2, 2, 1)
+
+def test_supersonic_leaves_the_count_to_keda():
+    assert kube_utils.servers_settled("supersonic", 1, 10, 10)
+    assert kube_utils.servers_settled("supersonic", 4, 10, SUPERSONIC_MIN_REPLICAS)
+    assert not kube_utils.servers_settled("supersonic", 4, 10, 0)
+
+def test_bare_triton_waits_for_the_surplus_to_go(cluster):
+    cluster.extend([{"replicas": 3, "ready": 3}, {"replicas": 3, "ready": 3}, {"replicas": 1, "ready": 1}])
+    assert kube_utils.wait_for_ready_servers(1, mode="bare_triton") == ["triton-0"]
+    assert len(cluster) == 1
+
+def test_supersonic_does_not_wait_for_keda_to_scale_down(cluster):
+    cluster.append({"replicas": 10, "ready": 10})
+    assert len(kube_utils.wait_for_ready_servers(1, mode="supersonic")) == 10
+
+def test_supersonic_waits_for_a_ready_server(cluster):
+    cluster.extend([{"replicas": 1, "ready": 0}, {"replicas": 1, "ready": 1}])
+    assert kube_utils.wait_for_ready_servers(1, mode="supersonic") == ["triton-0"]
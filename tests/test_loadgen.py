@@ -0,0 +1,39 @@
+import asyncio
+import socket
+import pytest
+
+pytest.importorskip("tritonclient.grpc.aio")
+import loadgen
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_run_load_against_fake_server_keeps_polling_after_a_failed_poll(monkeypatch):
+    monkeypatch.setattr(loadgen, "POLL_INTERVAL_SECONDS", 0.02)
+    polls = []
+
+    def on_poll(running_clients, errors):
+        polls.append((running_clients, errors))
+        if len(polls) == 1:
+            raise RuntimeError("monitoring unavailable")
+
+    async def main():
+        port = free_port()
+        fake = loadgen.FakeTritonGrpc(port, compute_us=5000)
+        server = asyncio.create_task(fake.serve())
+        await asyncio.sleep(0.5)
+        try:
+            rows = await loadgen.run_load(f"127.0.0.1:{port}", 2, 30, concurrency=1, on_poll=on_poll)
+        finally:
+            server.cancel()
+        return rows, fake
+
+    rows, fake = asyncio.run(main())
+    assert len(rows) == 2
+    assert all(row["client_status"] == "ok" for row in rows)
+    assert fake.requests == 2 * 30
+    # 30 sequential requests of >= 5 ms each span several poll intervals
+    assert len(polls) >= 3
+    assert all(errors == 0 for _, errors in polls)
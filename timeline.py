@@ -0,0 +1,149 @@
+# One time-ordered view of a repetition: client measurement windows, server metrics, phases and faults
+import argparse
+import os
+import sys
+import pandas as pd
+from analysis import find_repetitions, align_live_to_steps
+from config import TIMINGS_CSV
+
+# Server-side columns attached to every client window by align_windows
+LIVE_SERVER_COLUMNS = ["running_clients", "running_servers", "envoy_overhead", "gpu_util", "total_latency",
+                       "failure_rate", "active_faults"]
+TRITON_SERVER_COLUMNS = ["triton_request_rate", "triton_failure_rate", "triton_queue_us", "triton_compute_infer_us",
+                         "triton_gpu_util"]
+
+def load_events(path, source, steps, prefix=""):
+    """A per-repetition CSV as timeline rows, attributed to steps by time, or None if missing or empty."""
+    if path is None:
+        return None
+    df = pd.read_csv(path)
+    if df.empty:
+        return None
+    if prefix:
+        df = df.rename(columns={col: prefix + col for col in df.columns if col != "timestamp"})
+    if steps is not None and "step" not in df.columns:
+        df = align_live_to_steps(df, steps)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["source"] = source
+    return df
+
+def load_windows(path, steps):
+    """Client measurement windows, stamped with their start and their end in end_timestamp."""
+    if path is None:
+        return None
+    windows = pd.read_csv(path)
+    if windows.empty:
+        return None
+    windows = windows.rename(columns={"start": "timestamp", "end": "end_timestamp", "pod_name": "name"})
+    windows = windows.dropna(subset=["end_timestamp"])
+    windows["end_timestamp"] = pd.to_datetime(windows["end_timestamp"])
+    # Windows whose start is unknown (no launch time in the log) are placed at their end
+    windows["timestamp"] = pd.to_datetime(windows["timestamp"]).fillna(windows["end_timestamp"])
+    if steps is not None:
+        windows = align_live_to_steps(windows, steps)
+    windows["source"] = "client"
+    return windows
+
+def load_phases(run_dir, sequence, rep):
+    """Phase spans of this repetition from the run's timings.csv."""
+    path = os.path.join(run_dir, TIMINGS_CSV)
+    if not os.path.exists(path):
+        return None
+    timings = pd.read_csv(path)
+    timings = timings[(timings["sequence"] == sequence) & (timings["repetition"] == rep)]
+    if timings.empty:
+        return None
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(timings["start"]), "end_timestamp": pd.to_datetime(timings["end"]),
+        "source": "phase", "name": timings["phase"], "step": timings["step"],
+    })
+
+def load_faults(path):
+    if path is None:
+        return None
+    df = pd.read_csv(path)
+    if df.empty:
+        return None
+    end = pd.to_datetime(df["reverted"]).fillna(pd.to_datetime(df["recovered"]))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(df["applied"]), "end_timestamp": end, "source": "fault",
+        "name": df["fault"], "step": df["step"], "action": df["action"], "target": df["target"],
+        "recovery_s": df["recovery_s"],
+    })
+
+def build_timeline(seq_dir, rep):
+    """
+    Every timed record of one repetition in a single table sorted by time: client windows
+    (source "client", on the runner's clock), live samples ("live"), direct Triton scrapes
+    ("triton", columns prefixed triton_), phase spans ("phase") and faults ("fault").
+    Spans carry their end in end_timestamp. None if the repetition has no files.
+    """
+    files = find_repetitions(seq_dir).get(rep)
+    if files is None:
+        return None
+    steps = pd.read_csv(files["steps"]) if "steps" in files else None
+    parts = [
+        load_windows(files.get("windows"), steps),
+        load_events(files.get("live"), "live", steps),
+        load_events(files.get("triton"), "triton", steps, prefix="triton_"),
+        load_phases(os.path.dirname(os.path.abspath(seq_dir)), os.path.basename(os.path.abspath(seq_dir)), rep),
+        load_faults(files.get("faults")),
+    ]
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    timeline = pd.concat(parts, ignore_index=True, sort=False)
+    timeline = timeline.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    leading = ["timestamp", "end_timestamp", "source", "step", "name"]
+    return timeline[[col for col in leading if col in timeline.columns]
+                    + [col for col in timeline.columns if col not in leading]]
+
+def align_windows(timeline):
+    """
+    Client windows with the server metrics sampled nearest to their midpoint, so a client's
+    latency in a window can be read against the number of servers and the GPU load at the time.
+    """
+    windows = timeline[timeline["source"] == "client"].copy()
+    if windows.empty:
+        return windows
+    windows["midpoint"] = windows["timestamp"] + (windows["end_timestamp"] - windows["timestamp"]) / 2
+    windows = windows.sort_values("midpoint")
+    windows = windows.dropna(axis=1, how="all")
+    for source, columns in (("live", LIVE_SERVER_COLUMNS), ("triton", TRITON_SERVER_COLUMNS)):
+        samples = timeline[timeline["source"] == source]
+        columns = [col for col in columns if col in samples.columns]
+        if samples.empty or not columns:
+            continue
+        samples = samples[["timestamp"] + columns].rename(columns={"timestamp": f"{source}_timestamp"})
+        windows = pd.merge_asof(windows.drop(columns=[c for c in columns if c in windows.columns]), samples,
+                                left_on="midpoint", right_on=f"{source}_timestamp", direction="nearest")
+    return windows.sort_values(["timestamp", "name"]).reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge client measurement windows and server metrics into one timeline")
+    parser.add_argument("seq_dir", help="sequence directory of a run (multiseq_YYYYMMDD_HHMMSS/<sequence>)")
+    parser.add_argument("--output", help="directory for timeline_repN.csv and windows_aligned_repN.csv (default: seq_dir)")
+    args = parser.parse_args()
+
+    out_dir = args.output or args.seq_dir
+    reps = find_repetitions(args.seq_dir)
+    if not reps:
+        print(f"No repetitions in {args.seq_dir}")
+        sys.exit(1)
+    for rep in reps:
+        timeline = build_timeline(args.seq_dir, rep)
+        if timeline is None:
+            continue
+        timeline.to_csv(os.path.join(out_dir, f"timeline_rep{rep}.csv"), index=False)
+        windows = align_windows(timeline)
+        if not windows.empty:
+            windows.to_csv(os.path.join(out_dir, f"windows_aligned_rep{rep}.csv"), index=False)
+        counts = timeline["source"].value_counts().to_dict()
+        line = f"Repetition {rep}: " + ", ".join(f"{n} {source}" for source, n in sorted(counts.items()))
+        if "clock_rtt_s" in windows.columns and windows["clock_rtt_s"].notna().any():
+            line += (f"; client clocks within ±{windows['clock_rtt_s'].max() / 2 * 1000:.1f} ms of the runner "
+                     f"(offsets up to {windows['clock_offset_s'].abs().max() * 1000:.1f} ms corrected)")
+        print(line)
+
+if __name__ == "__main__":
+    main()
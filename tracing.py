@@ -0,0 +1,83 @@
+# Phase-level timing of experiment steps
+import csv
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from config import TIMINGS_CSV, TIMING_COLUMNS
+
+# Module-level trace state: the open timings file and the step currently running
+_trace = {"file": None, "writer": None, "context": {}}
+
+def start_trace(run_dir):
+    """Open (or append to) the timings file of a run. Spans recorded before this are dropped."""
+    path = os.path.join(run_dir, TIMINGS_CSV)
+    new_file = not os.path.exists(path)
+    _trace["file"] = open(path, "a", newline="")
+    _trace["writer"] = csv.DictWriter(_trace["file"], fieldnames=TIMING_COLUMNS)
+    if new_file:
+        _trace["writer"].writeheader()
+    return path
+
+def stop_trace():
+    if _trace["file"] is not None:
+        _trace["file"].close()
+    _trace["file"] = None
+    _trace["writer"] = None
+    _trace["context"] = {}
+
+def set_context(**context):
+    """Attach step parameters (sequence, repetition, step, mode, ...) to every following span."""
+    _trace["context"] = context
+
+def record_span(phase: str, start: float, end: float):
+    """Record a phase whose boundaries were observed elsewhere (unix timestamps)."""
+    if _trace["writer"] is None:
+        return
+    row = {col: _trace["context"].get(col) for col in TIMING_COLUMNS}
+    row.update({
+        "phase": phase,
+        "start": datetime.utcfromtimestamp(start).isoformat(),
+        "end": datetime.utcfromtimestamp(end).isoformat(),
+        "duration_s": round(end - start, 3),
+    })
+    _trace["writer"].writerow(row)
+    _trace["file"].flush()
+
+@contextmanager
+def span(phase: str):
+    """Time the enclosed block as one phase of the current step."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        record_span(phase, start, time.time())
+
+def summarize_timings(df):
+    """Total, mean and share of wall time per phase."""
+    summary = df.groupby("phase")["duration_s"].agg(["count", "sum", "mean", "median", "max"])
+    summary = summary.rename(columns={"sum": "total_s", "mean": "mean_s", "median": "median_s", "max": "max_s"})
+    summary["share"] = summary["total_s"] / summary["total_s"].sum()
+    return summary.sort_values("total_s", ascending=False)
+
+def report_timings(run_dir):
+    """Print where the wall time of a run went and save the table next to the timings file."""
+    path = os.path.join(run_dir, TIMINGS_CSV)
+    if not os.path.exists(path):
+        print(f"No timings recorded in {run_dir}")
+        return None
+    df = pd.read_csv(path)
+    if df.empty:
+        print(f"No timings recorded in {run_dir}")
+        return None
+    summary = summarize_timings(df)
+    summary.to_csv(os.path.join(run_dir, "timings_summary.csv"))
+    print(f"Phase timings for {run_dir} ({df['duration_s'].sum() / 3600:.2f} h traced):")
+    print(summary.to_string(float_format=lambda x: f"{x:.2f}"))
+    return summary
+
+if __name__ == "__main__":
+    for run_dir in sys.argv[1:]:
+        report_timings(run_dir)
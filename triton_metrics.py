@@ -0,0 +1,255 @@
+# Direct scraping of Triton's :8002/metrics endpoints, bypassing Prometheus
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from kubernetes import client
+from config import (NAMESPACE, TRITON_METRICS_PORT, TRITON_SCRAPE_INTERVAL,
+                    TRITON_DISCOVERY_INTERVAL, TRITON_METRICS_COLUMNS)
+from kube_utils import server_pod_ips
+
+# Counters summed over models/versions of every server; deltas are taken between scrapes
+TRITON_COUNTERS = [
+    "nv_inference_request_success",
+    "nv_inference_request_failure",
+    "nv_inference_count",
+    "nv_inference_request_duration_us",
+    "nv_inference_queue_duration_us",
+    "nv_inference_compute_input_duration_us",
+    "nv_inference_compute_infer_duration_us",
+    "nv_inference_compute_output_duration_us",
+]
+TRITON_GAUGES = ["nv_gpu_utilization"]
+
+SAMPLE_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)")
+
+def parse_metrics(text):
+    """Parse the Prometheus text format: counters are summed over labels, gauges are averaged."""
+    counters = {name: 0.0 for name in TRITON_COUNTERS}
+    gauges = {name: [] for name in TRITON_GAUGES}
+    for line in text.splitlines():
+        m = SAMPLE_LINE.match(line)
+        if not m:
+            continue
+        name, value = m.group(1), float(m.group(3))
+        if name in counters:
+            counters[name] += value
+        elif name in gauges:
+            gauges[name].append(value)
+    gauges = {name: (float(np.mean(v)) if v else None) for name, v in gauges.items()}
+    return counters, gauges
+
+def discover_targets(namespace=NAMESPACE, port=TRITON_METRICS_PORT):
+    """
+    Metrics endpoints of the running Triton pods, listed by label through the API server.
+    Unlike resolving a Service, this finds every pod in both the headless and LoadBalancer modes.
+    """
+    try:
+        pods = server_pod_ips(namespace)
+    except client.exceptions.ApiException as e:
+        print(f"Failed to list Triton pods: {e.reason}")
+        return []
+    return sorted(f"http://{ip}:{port}/metrics" for ip in pods.values() if ip)
+
+class TritonScraper:
+    """
+    Scrapes every target concurrently and turns counters into per-interval rates and
+    per-request averages. Keeps the previous scrape of each target, so servers that
+    appear or restart (counter reset) between scrapes are handled.
+    """
+    def __init__(self, targets=None, timeout: float = 2.0):
+        self.targets = list(targets or [])
+        self.timeout = timeout
+        self.previous = {}
+        self.executor = ThreadPoolExecutor(max_workers=16)
+
+    def _scrape(self, target):
+        try:
+            response = requests.get(target, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Failed to scrape {target}: {e}")
+            return target, None
+        return target, parse_metrics(response.text)
+
+    def sample(self):
+        """Scrape all targets once. Returns a row with TRITON_METRICS_COLUMNS, or None on the first call."""
+        now = time.time()
+        deltas = {name: 0.0 for name in TRITON_COUNTERS}
+        gpu_utils = []
+        elapsed = []
+        current = {}
+        for target, parsed in self.executor.map(self._scrape, self.targets):
+            if parsed is None:
+                continue
+            counters, gauges = parsed
+            current[target] = (now, counters)
+            if gauges["nv_gpu_utilization"] is not None:
+                gpu_utils.append(gauges["nv_gpu_utilization"])
+            if target not in self.previous:
+                continue
+            prev_time, prev_counters = self.previous[target]
+            elapsed.append(now - prev_time)
+            for name in TRITON_COUNTERS:
+                delta = counters[name] - prev_counters[name]
+                deltas[name] += delta if delta >= 0 else counters[name]  # counter reset after a restart
+        self.previous = current
+        if not elapsed:
+            return None
+
+        interval = float(np.mean(elapsed))
+        requests_done = deltas["nv_inference_request_success"]
+        def per_request(name):
+            return deltas[name] / requests_done if requests_done > 0 else None
+        return {
+            "timestamp": datetime.utcfromtimestamp(now).isoformat(),
+            "n_targets": len(current),
+            "interval_s": interval,
+            "request_rate": requests_done / interval,
+            "failure_rate": deltas["nv_inference_request_failure"] / interval,
+            "inference_rate": deltas["nv_inference_count"] / interval,
+            "request_us": per_request("nv_inference_request_duration_us"),
+            "queue_us": per_request("nv_inference_queue_duration_us"),
+            "compute_input_us": per_request("nv_inference_compute_input_duration_us"),
+            "compute_infer_us": per_request("nv_inference_compute_infer_duration_us"),
+            "compute_output_us": per_request("nv_inference_compute_output_duration_us"),
+            "gpu_util": float(np.mean(gpu_utils)) if gpu_utils else None,
+        }
+
+class TritonMetricsPoller:
+    """
+    Background thread sampling a TritonScraper every `interval` seconds. Rows are written to
+    `writer` (a csv.DictWriter with TRITON_METRICS_COLUMNS) and buffered until the harness
+    collects them with drain().
+    """
+    def __init__(self, writer=None, targets=None, interval: float = TRITON_SCRAPE_INTERVAL):
+        self.writer = writer
+        self.static_targets = targets
+        self.interval = interval
+        self.scraper = TritonScraper(targets)
+        self.pending = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _run(self):
+        last_discovery = 0.0
+        while not self.stop_event.is_set():
+            started = time.time()
+            if self.static_targets is None and started - last_discovery >= TRITON_DISCOVERY_INTERVAL:
+                self.scraper.targets = discover_targets()
+                last_discovery = started
+            row = self.scraper.sample()
+            if row is not None:
+                if self.writer is not None:
+                    self.writer.writerow(row)
+                with self.lock:
+                    self.pending.append(row)
+            self.stop_event.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def drain(self):
+        """Return and forget the rows sampled since the previous call."""
+        with self.lock:
+            rows, self.pending = self.pending, []
+        return rows
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+# The poller of the repetition currently running, used by metrics.query_gpu_utilization
+_active = {"poller": None}
+
+def start_poller(writer=None, targets=None):
+    poller = TritonMetricsPoller(writer=writer, targets=targets)
+    poller.start()
+    _active["poller"] = poller
+    return poller
+
+def stop_poller():
+    if _active["poller"] is not None:
+        _active["poller"].stop()
+    _active["poller"] = None
+
+def gpu_utilization():
+    """Mean GPU utilization over the scrapes since the previous call, or None if there were none."""
+    if _active["poller"] is None:
+        return None
+    values = [row["gpu_util"] for row in _active["poller"].drain() if row["gpu_util"] is not None]
+    return float(np.mean(values)) if values else None
+
+class FakeTritonMetrics:
+    """
+    Local stand-in for a Triton metrics endpoint, serving counters that grow at a fixed
+    request rate. Used to exercise the scraper without a cluster.
+    """
+    def __init__(self, port: int, request_rate: float = 100.0, queue_us: float = 50.0,
+                 compute_infer_us: float = 2000.0, gpu_util: float = 0.5):
+        self.port = port
+        self.request_rate = request_rate
+        self.queue_us = queue_us
+        self.compute_infer_us = compute_infer_us
+        self.gpu_util = gpu_util
+        self.started = time.time()
+        self.server = None
+
+    def render(self):
+        n = self.request_rate * (time.time() - self.started)
+        labels = '{model="particlenet_AK4_PT",version="1"}'
+        return "\n".join([
+            "# TYPE nv_inference_request_success counter",
+            f"nv_inference_request_success{labels} {n:.0f}",
+            f"nv_inference_request_failure{labels} 0",
+            f"nv_inference_count{labels} {n * 100:.0f}",
+            f"nv_inference_request_duration_us{labels} {n * (self.queue_us + self.compute_infer_us):.0f}",
+            f"nv_inference_queue_duration_us{labels} {n * self.queue_us:.0f}",
+            f"nv_inference_compute_input_duration_us{labels} 0",
+            f"nv_inference_compute_infer_duration_us{labels} {n * self.compute_infer_us:.0f}",
+            f"nv_inference_compute_output_duration_us{labels} 0",
+            "# TYPE nv_gpu_utilization gauge",
+            f'nv_gpu_utilization{{gpu_uuid="GPU-fake"}} {self.gpu_util}',
+        ]) + "\n"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = fake.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.port}/metrics"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+if __name__ == "__main__":
+    # Self-check against local fake endpoints: python triton_metrics.py [n_servers]
+    n_fake = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    fakes = [FakeTritonMetrics(TRITON_METRICS_PORT + 100 + i, request_rate=100.0 * (i + 1)) for i in range(n_fake)]
+    scraper = TritonScraper([fake.start() for fake in fakes])
+    for _ in range(6):
+        row = scraper.sample()
+        if row is not None:
+            print({col: row[col] for col in TRITON_METRICS_COLUMNS})
+        time.sleep(TRITON_SCRAPE_INTERVAL)